@@ -5,6 +5,7 @@ from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from config import Config
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 import cloudinary
 
 db = SQLAlchemy()
@@ -17,6 +18,10 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # --- Client address from trusted proxies (rate limits key on it) ---
+    if app.config.get('PROXY_FIX_X_FOR'):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     # --- Initialize Cloudinary ---
     if app.config.get('CLOUDINARY_CLOUD_NAME'): # Only configure if keys are set
         cloudinary.config(
@@ -36,6 +41,19 @@ def create_app(config_class=Config):
     bcrypt.init_app(app)
     jwt.init_app(app)
 
+    from . import availability, search_cache, query_budget, storage, media_jobs, paystack, webhooks, passwords, identity, revocation, ratelimit
+    availability.init_app(app)
+    search_cache.init_app(app)
+    query_budget.init_app(app)
+    storage.init_app(app)
+    media_jobs.init_app(app)
+    paystack.init_app(app)
+    webhooks.init_app(app)
+    passwords.init_app(app)
+    identity.init_app(app, jwt)
+    revocation.init_app(app, jwt)
+    ratelimit.init_app(app) # Before the blueprints: rejected requests never reach a view
+
     # --- Register Blueprints ---
     from .routes import api_bp
     app.register_blueprint(api_bp)
@@ -46,4 +64,15 @@ def create_app(config_class=Config):
 
     from . import models
 
+    from .commands import register_commands
+    register_commands(app)
+
+    # --- Background threads (serving processes only) ---
+    from .workers import starts_at_boot
+    if starts_at_boot(app):
+        app.extensions['availability_index'].start(app)
+        # Pick up queued work left by a previous process (crash, deploy) without waiting for a notify()
+        app.extensions['media_workers'].start()
+        app.extensions['webhook_workers'].start()
+
     return app
\ No newline at end of file
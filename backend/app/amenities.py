@@ -0,0 +1,125 @@
+"""
+Amenity and power-backup filtering through a normalized tag index.
+
+Property.amenities (JSON list) and Property.power_backup_details (free text) remain what
+we display. On every write the listing's tags are mirrored into the Amenity dictionary
+and the property_amenity association, so ?amenities=WiFi,Pool becomes an indexed AND
+over (amenity_id, property_id) instead of a scan over JSON.
+"""
+import re
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import Amenity, Property, property_amenity
+
+AMENITY = 'amenity'
+POWER_BACKUP = 'power_backup'
+
+# Power backup details are free text ("Generator 7pm-7am, 24/7 Inverter"); we index the
+# sources mentioned in it. Keys are what clients filter on, values are spellings we match.
+POWER_BACKUP_SOURCES = {
+    'generator': ('generator', 'gen set', 'genset'),
+    'inverter': ('inverter',),
+    'solar': ('solar',),
+    'phcn': ('phcn', 'nepa', 'grid'),
+    '24/7': ('24/7', '24hrs', '24 hrs', '24 hours'),
+}
+
+
+def normalize(name):
+    return re.sub(r'\s+', ' ', name.strip()).lower()
+
+
+# A spelling must stand as whole words ('grid' but not 'gridlock'), and is skipped when its
+# clause negates it just before: "No generator", "without an inverter", "off-grid".
+_SPELLING_PATTERNS = {
+    source: [re.compile(r'(?<![a-z0-9])' + re.escape(spelling) + r'(?![a-z0-9])') for spelling in spellings]
+    for source, spellings in POWER_BACKUP_SOURCES.items()
+}
+_CLAUSE_BREAK = re.compile(r'[,;.:()\n]|\bbut\b')
+_NEGATED = re.compile(r'(?:\b(?:no|not|without)\s+(?:[\w-]+\s+){0,2}|\boff-)$')
+
+
+def _mentions(text, pattern):
+    for match in pattern.finditer(text):
+        clause = _CLAUSE_BREAK.split(text[:match.start()])[-1]
+        if not _NEGATED.search(clause):
+            return True
+    return False
+
+
+def power_backup_sources(details):
+    text = normalize(details or '')
+    return [source for source, patterns in _SPELLING_PATTERNS.items()
+            if any(_mentions(text, pattern) for pattern in patterns)]
+
+
+def parse_tag_list(value):
+    """ 'WiFi, Pool' -> ['wifi', 'pool'] (deduplicated, order kept). """
+    slugs = []
+    for part in (value or '').split(','):
+        slug = normalize(part)
+        if slug and slug not in slugs:
+            slugs.append(slug)
+    return slugs
+
+
+def _get_or_create(kind, name):
+    slug = normalize(name)
+    amenity = Amenity.query.filter_by(kind=kind, slug=slug).first()
+    if amenity:
+        return amenity
+    try:
+        with db.session.begin_nested(): # Savepoint: another request may insert the same tag concurrently
+            amenity = Amenity(kind=kind, slug=slug, name=name.strip()[:80])
+            db.session.add(amenity)
+    except IntegrityError:
+        amenity = Amenity.query.filter_by(kind=kind, slug=slug).one()
+    return amenity
+
+
+def sync_property_tags(prop):
+    """ Rebuilds prop.tags from its amenities list and power backup details. Caller commits. """
+    tags = {}
+    for name in prop.amenities or []:
+        if normalize(name):
+            tags[(AMENITY, normalize(name))] = name
+    for source in power_backup_sources(prop.power_backup_details):
+        tags[(POWER_BACKUP, source)] = source
+    prop.tags = [_get_or_create(kind, name) for (kind, _), name in tags.items()]
+
+
+def filter_by_tags(query, kind, slugs):
+    """ Keeps properties that have ALL of the given tags. """
+    if not slugs:
+        return query
+    amenity_ids = [row.id for row in Amenity.query.with_entities(Amenity.id).filter(
+        Amenity.kind == kind, Amenity.slug.in_(slugs)
+    )]
+    if len(amenity_ids) < len(slugs):
+        # At least one tag no listing has ever used: nothing can match
+        return query.filter(db.false())
+
+    matching = select(property_amenity.c.property_id).where(
+        property_amenity.c.amenity_id.in_(amenity_ids)
+    ).group_by(property_amenity.c.property_id).having(
+        func.count(property_amenity.c.amenity_id) == len(amenity_ids)
+    )
+    return query.filter(Property.id.in_(matching))
+
+
+def reindex_all(batch_size=500):
+    """ Rebuilds the tag index for every property; returns how many were processed. """
+    processed = 0
+    last_id = 0
+    while True:
+        batch = Property.query.filter(Property.id > last_id).order_by(Property.id).limit(batch_size).all()
+        if not batch:
+            return processed
+        for prop in batch:
+            sync_property_tags(prop)
+        db.session.commit()
+        processed += len(batch)
+        last_id = batch[-1].id
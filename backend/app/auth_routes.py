@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify, abort
 from .models import User, db # Import User model
-from . import db, bcrypt # Import db and bcrypt from __init__
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from . import db, events, passwords, revocation # Import db from __init__
+from .passwords import HashingBusy
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt, get_jwt_identity, current_user
 import re # For basic email validation
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -9,6 +10,13 @@ auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 # Basic email regex pattern
 EMAIL_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
 
+
+def _hashing_busy(e):
+    """ 503 for a full password hashing queue (see app/passwords.py). """
+    response = jsonify({"message": str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503 # Service Unavailable
+
 @auth_bp.route('/register', methods=['POST'])
 def register_user():
     data = request.get_json()
@@ -57,6 +65,9 @@ def register_user():
             "user_type": new_user.user_type
         }
         return jsonify({"message": "User registered successfully", "user": user_data}), 201 # 201 Created
+    except HashingBusy as e:
+        db.session.rollback()
+        return _hashing_busy(e)
     except Exception as e:
         db.session.rollback() # Rollback in case of error during commit
         print(f"Error during registration: {e}") # Log error
@@ -78,7 +89,20 @@ def login_user():
     user = User.query.filter_by(email=email).first()
 
     # Check if user exists and password is correct
-    if user and user.check_password(password):
+    try:
+        password_ok = bool(user) and user.check_password(password)
+    except HashingBusy as e:
+        return _hashing_busy(e)
+
+    if password_ok:
+        if passwords.needs_rehash(user.password_hash):
+            # Hash made at an older BCRYPT_LOG_ROUNDS: upgrade it while we have the password
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback() # The old hash still works; try again next login
+                print(f"Could not rehash password for user {user.id}: {e}")
         print(f"DEBUG: Creating token with identity: {user.id}, Type: {type(user.id)}")
         identity_str = str(user.id)
         # Create JWT tokens
@@ -109,27 +133,15 @@ def login_user():
 @jwt_required()
 def get_profile():
     """ Gets the profile information for the currently logged-in user. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str) # Convert identity back to int
-    except (ValueError, TypeError):
-         abort(401, description="Invalid user identity in token.")
-
-    user = User.query.get_or_404(current_user_id)
-    return jsonify(user.to_dict())
+    return jsonify(current_user.to_dict()) # Loaded (and cached) by app/identity.py
 
 
 @auth_bp.route('/profile', methods=['PATCH']) # PATCH is suitable for partial updates
 @jwt_required()
 def update_profile():
     """ Updates profile information for the currently logged-in user. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-         abort(401, description="Invalid user identity in token.")
-
-    user = User.query.get_or_404(current_user_id)
+    current_user_id = current_user.id
+    user = User.query.get_or_404(current_user_id) # The row itself: current_user is a read-only projection
     data = request.get_json()
 
     if not data:
@@ -151,6 +163,7 @@ def update_profile():
 
     try:
         db.session.commit()
+        events.user_changed(current_user_id)
         return jsonify({
             "message": "Profile updated successfully.",
             "user": user.to_dict() # Return updated user info
@@ -171,13 +184,28 @@ def refresh_access():
     new_access_token = create_access_token(identity=current_user_id_str)
     return jsonify(access_token=new_access_token), 200
 
-# --- Optional: Implement Logout/Blocklisting later ---
-# A simple logout endpoint might just return success, relying on frontend to clear tokens.
-# A more secure logout invalidates refresh tokens using a blocklist (more complex setup).
-# @auth_bp.route('/logout', methods=['POST'])
-# @jwt_required() # Could require access or refresh token depending on strategy
-# def logout_user():
-#     # Add token JTI (JWT ID) to blocklist here if implementing
-#     return jsonify({"message": "Logout successful (token cleared client-side)"}), 200
+# --- Logout Routes (see app/revocation.py) ---
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False) # Send the refresh token; an access token is accepted too
+def logout_user():
+    """ Revokes the token sent with the request. """
+    try:
+        revocation.revoke_token(get_jwt())
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error revoking token for user {current_user.id}: {e}")
+        return jsonify({"message": "Logout failed due to server error"}), 500
+    return jsonify({"message": "Logout successful"}), 200
+
 
-# Add /refresh and /logout routes later if needed
\ No newline at end of file
+@auth_bp.route('/logout-all', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout_all_devices():
+    """ Revokes every access and refresh token issued to the current user so far. """
+    try:
+        revocation.revoke_all(current_user.id)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error revoking all tokens for user {current_user.id}: {e}")
+        return jsonify({"message": "Logout failed due to server error"}), 500
+    return jsonify({"message": "Logged out from all devices"}), 200
\ No newline at end of file
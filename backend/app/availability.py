@@ -0,0 +1,220 @@
+"""
+In-memory availability index for date-range search.
+
+Keeps one bitmap per property over a rolling horizon starting today: bit i is set when
+the night of (origin + i) is covered by a confirmed booking. A date search then becomes a
+single AND of each property's bitmap with the requested range mask, instead of a
+NOT IN (SELECT ... FROM booking ...) subquery over the whole booking table.
+
+Bitmaps are plain Python ints (arbitrary length, AND in C), so no NumPy dependency.
+The index lives per process. A background thread, started with the app, builds it and
+rebuilds it every AVAILABILITY_INDEX_MAX_AGE seconds so that changes made by other
+workers show up; requests never build it themselves. The booking status routes patch it
+in place, and a patch made while a rebuild is loading is replayed onto the new bitmaps
+under the same lock the rebuild swaps them in with, so it is not lost. Reloading a single
+property checks a per-property version instead: if the property was patched while its
+rows were loading, the rows may predate that patch, so they are loaded again.
+
+Search falls back to the SQL subquery whenever the index cannot answer: before the first
+build, when a rebuild is overdue, outside the horizon, or when more than
+AVAILABILITY_MAX_EXCLUDED properties are booked (a bind list that long costs more than
+the subquery).
+"""
+import threading
+import time
+from datetime import date, timedelta
+
+from flask import current_app
+
+from . import db
+from .models import Booking
+
+
+class AvailabilityIndex:
+    def __init__(self, horizon_days=365, max_age=60, max_excluded=500):
+        self.horizon_days = horizon_days
+        self.max_age = max_age
+        self.max_excluded = max_excluded
+        self._lock = threading.Lock()
+        self._bitmaps = {} # property_id -> int bitmap
+        self._origin = None # date of bit 0
+        self._built_at = None # time.monotonic() of last full rebuild
+        self._pending = None # Updates made while a rebuild is loading; None when not rebuilding
+        self._versions = {} # property_id -> number of updates so far; lets a reload spot one it raced
+        self._thread = None
+        self._stopping = threading.Event()
+
+    # --- Bit helpers ---
+    def _range_mask(self, start, end):
+        """ Mask for the nights start..end-1 clipped to the horizon, or 0 if outside it. """
+        first = max((start - self._origin).days, 0)
+        last = min((end - self._origin).days, self.horizon_days)
+        if last <= first:
+            return 0
+        return ((1 << (last - first)) - 1) << first
+
+    def _is_usable(self):
+        # Twice the rebuild interval: one slow or failed rebuild does not disable the index
+        return (
+            self._built_at is not None
+            and self._origin == date.today()
+            and time.monotonic() - self._built_at <= 2 * self.max_age
+        )
+
+    # --- Building ---
+    def rebuild(self):
+        """ Rebuilds every bitmap from confirmed bookings that touch the horizon. """
+        origin = date.today()
+        horizon_end = origin + timedelta(days=self.horizon_days)
+        with self._lock:
+            self._pending = [] # Record updates from here on; the query below may miss them
+        try:
+            rows = db.session.query(
+                Booking.property_id, Booking.check_in_date, Booking.check_out_date
+            ).filter(
+                Booking.status == 'confirmed',
+                Booking.check_in_date < horizon_end,
+                Booking.check_out_date > origin
+            ).all()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            self._origin = origin
+            bitmaps = {}
+            for property_id, check_in, check_out in rows:
+                bitmaps[property_id] = bitmaps.get(property_id, 0) | self._range_mask(check_in, check_out)
+            self._bitmaps = bitmaps
+            for update in self._pending:
+                self._apply(*update)
+            self._pending = None
+            self._built_at = time.monotonic()
+        print(f"Availability index rebuilt: {len(rows)} bookings across {len(bitmaps)} properties.")
+
+    def _run(self, app):
+        with app.app_context():
+            while not self._stopping.is_set():
+                try:
+                    self.rebuild()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Availability index rebuild failed, keeping the previous one: {e}")
+                finally:
+                    db.session.remove()
+                self._stopping.wait(self.max_age)
+
+    def start(self, app):
+        """ Builds the index on a background thread now and every max_age seconds after. """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, args=(app,), name='availability-index', daemon=True)
+            self._thread.start()
+        print("Started the availability index thread.")
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- Incremental updates ---
+    def _apply(self, kind, property_id, value):
+        """ Applies one update to the current bitmaps; the caller holds the lock. """
+        if kind == 'booked':
+            mask = self._range_mask(*value)
+            if mask:
+                self._bitmaps[property_id] = self._bitmaps.get(property_id, 0) | mask
+            return
+        bits = 0
+        for check_in, check_out in (value if kind == 'reloaded' else ()):
+            bits |= self._range_mask(check_in, check_out)
+        if bits:
+            self._bitmaps[property_id] = bits
+        else:
+            self._bitmaps.pop(property_id, None)
+
+    def _record(self, kind, property_id, value=None):
+        """ Records and applies one update; the caller holds the lock. """
+        self._versions[property_id] = self._versions.get(property_id, 0) + 1
+        if self._pending is not None:
+            self._pending.append((kind, property_id, value)) # Replayed onto the rebuilt bitmaps
+        if self._built_at is not None:
+            self._apply(kind, property_id, value)
+
+    def _update(self, kind, property_id, value=None):
+        with self._lock:
+            self._record(kind, property_id, value)
+
+    def _is_tracking(self):
+        return self._built_at is not None or self._pending is not None
+
+    def mark_booked(self, property_id, check_in, check_out):
+        """ A booking became confirmed: set its nights. """
+        self._update('booked', property_id, (check_in, check_out))
+
+    def refresh_property(self, property_id, attempts=3):
+        """
+        Reloads one property's bitmap from the database. Used when a booking stops being
+        confirmed: clearing its bits blindly could also clear nights of another booking.
+
+        The rows are read outside the lock, so a booking confirmed meanwhile may be missing
+        from them; writing them over its mark would show its nights as free. If the
+        property's version moved while reading, the rows are read again. When that keeps
+        happening the current bits are left alone: at worst a freed night stays booked
+        until the next rebuild, which only hides a listing rather than double-booking it.
+        """
+        if not self._is_tracking():
+            return # Not built yet; the first build will load it from the database
+        for _ in range(attempts):
+            with self._lock:
+                version = self._versions.get(property_id, 0)
+            origin = date.today()
+            rows = db.session.query(Booking.check_in_date, Booking.check_out_date).filter(
+                Booking.property_id == property_id,
+                Booking.status == 'confirmed',
+                Booking.check_in_date < origin + timedelta(days=self.horizon_days + 1), # +1: a rebuild may move the origin
+                Booking.check_out_date > origin
+            ).all()
+            with self._lock:
+                if self._versions.get(property_id, 0) == version:
+                    self._record('reloaded', property_id, rows)
+                    return
+        print(f"Availability index: property {property_id} kept changing during reload; left for the next rebuild.")
+
+    def remove_property(self, property_id):
+        self._update('removed', property_id)
+
+    # --- Queries ---
+    def booked_property_ids(self, check_in, check_out):
+        """
+        Returns the ids of properties with at least one booked night in [check_in, check_out),
+        or None if the index cannot answer (caller falls back to SQL).
+        """
+        with self._lock:
+            if not self._is_usable():
+                return None
+            origin, bitmaps = self._origin, self._bitmaps
+            mask = self._range_mask(check_in, check_out)
+            horizon_end = origin + timedelta(days=self.horizon_days)
+            if check_in < origin or check_out > horizon_end:
+                return None
+            booked = [property_id for property_id, bits in bitmaps.items() if bits & mask]
+        if len(booked) > self.max_excluded:
+            return None
+        return booked
+
+
+def init_app(app):
+    app.extensions['availability_index'] = AvailabilityIndex(
+        horizon_days=app.config.get('AVAILABILITY_HORIZON_DAYS', 365),
+        max_age=app.config.get('AVAILABILITY_INDEX_MAX_AGE', 60),
+        max_excluded=app.config.get('AVAILABILITY_MAX_EXCLUDED', 500),
+    )
+
+
+def get_availability_index():
+    return current_app.extensions['availability_index']
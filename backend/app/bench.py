@@ -0,0 +1,536 @@
+"""
+Load benchmarks, run with `flask bench <name>`.
+
+Each benchmark runs in its own app against a scratch database: a temporary SQLite file by
+default, or --database-url pointing at an EMPTY database (e.g. a throwaway PostgreSQL
+schema) to measure a real server. The tables are dropped afterwards. Requests go through
+the Flask test client from worker threads, so the numbers include routing, auth and
+serialization but no network.
+"""
+import os
+import random
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import inspect, text
+
+
+@contextmanager
+def scratch_app(database_url=None, **overrides):
+    """ Yields a fresh app with empty tables; refuses to touch a database that already has them. """
+    from config import Config
+    from . import create_app, db
+
+    tmpdir = None
+    if not database_url:
+        tmpdir = tempfile.mkdtemp(prefix='shortlet-bench-')
+        database_url = 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        # Writers queue on SQLite's lock; give them longer than the 5s default before "database is locked"
+        SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}} if database_url.startswith('sqlite') else {}
+        JWT_SECRET_KEY = secrets.token_hex(16)
+        BCRYPT_LOG_ROUNDS = 4
+        SEARCH_CACHE_TTL = 0
+        RATELIMIT_ENABLED = False # Every simulated client shares one address
+        BACKGROUND_THREADS = False
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        if inspect(db.engine).has_table('property'):
+            raise ValueError(f"{database_url} already has tables; benchmarks need an empty scratch database.")
+        db.create_all()
+    try:
+        yield app
+    finally:
+        app.extensions['media_workers'].stop() # Background threads must not outlive the tables
+        app.extensions['webhook_workers'].stop()
+        app.extensions['availability_index'].stop()
+        app.extensions['media_storage'].shutdown()
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def run_workers(app, workers, tasks, handle):
+    """
+    Runs handle(client, task) for every task across `workers` threads, each with its own
+    test client. Returns (results in completion order, elapsed seconds).
+    """
+    queue = list(tasks)
+    lock = threading.Lock()
+    results = []
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if not queue:
+                    return
+                task = queue.pop()
+            result = handle(client, task)
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+# --- Booking confirmation under contention ---
+def _seed_confirm(db, properties, bookings_per_property, seed):
+    """ One host, one guest, and heavily overlapping pending bookings on every property. """
+    from .models import User, Property, Booking
+
+    host = User(email='host@bench.test', first_name='Bench', last_name='Host', user_type='host')
+    guest = User(email='guest@bench.test', first_name='Bench', last_name='Guest', user_type='guest')
+    host.set_password('password')
+    guest.set_password('password')
+    db.session.add_all([host, guest])
+    props = [Property(host=host, title=f'Bench flat {i}', address='1 Bench Road', city='Lagos', state='Lagos',
+                      price_per_night=10000, max_guests=2, num_bedrooms=1, num_bathrooms=1)
+             for i in range(properties)]
+    db.session.add_all(props)
+    db.session.flush()
+
+    rng = random.Random(seed)
+    first_night = date.today() + timedelta(days=1)
+    for prop in props:
+        for _ in range(bookings_per_property):
+            check_in = first_night + timedelta(days=rng.randrange(60))
+            nights = rng.randint(1, 5)
+            db.session.add(Booking(guest=guest, property_id=prop.id, check_in_date=check_in,
+                                   check_out_date=check_in + timedelta(days=nights), num_guests=1,
+                                   total_price=10000 * nights, status='pending', payment_status='unpaid'))
+    db.session.commit()
+    return host.id
+
+
+def count_overlaps(db):
+    """ Pairs of confirmed bookings of the same property whose nights overlap. Must be 0. """
+    return db.session.execute(text("""
+        SELECT COUNT(*) FROM booking a JOIN booking b
+          ON a.property_id = b.property_id AND a.id < b.id
+         AND a.check_in_date < b.check_out_date AND b.check_in_date < a.check_out_date
+        WHERE a.status = 'confirmed' AND b.status = 'confirmed'
+    """)).scalar()
+
+
+def bench_confirm(worker_counts=(1, 2, 4, 8), properties=20, bookings_per_property=30,
+                  database_url=None, seed=42):
+    """
+    For each worker count: seeds overlapping pending bookings, confirms all of them
+    concurrently in random order, and checks that no two confirmed bookings overlap.
+    Returns a list of result dicts, one per worker count.
+    """
+    from flask_jwt_extended import create_access_token
+    from . import db
+    from .models import Booking
+
+    report = []
+    for workers in worker_counts:
+        with scratch_app(database_url) as app:
+            with app.app_context():
+                host_id = _seed_confirm(db, properties, bookings_per_property, seed)
+                headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(host_id))}
+                booking_ids = [row.id for row in db.session.query(Booking.id)]
+            random.Random(seed).shuffle(booking_ids)
+
+            def confirm(client, booking_id):
+                return client.patch(f'/api/host/bookings/{booking_id}/confirm', headers=headers).status_code
+
+            statuses, elapsed = run_workers(app, workers, booking_ids, confirm)
+            with app.app_context():
+                overlaps = count_overlaps(db)
+            report.append({
+                'workers': workers,
+                'attempts': len(statuses),
+                'confirmed': statuses.count(200),
+                'conflicts': statuses.count(409),
+                'errors': len(statuses) - statuses.count(200) - statuses.count(409),
+                'seconds': round(elapsed, 3),
+                'per_second': round(len(statuses) / elapsed, 1) if elapsed else None,
+                'overlaps': overlaps,
+            })
+    return report
+
+
+# --- Paystack webhook bursts ---
+def bench_webhooks(workers=8, bookings=200, duplicates=2, database_url=None, seed=42):
+    """
+    Posts a signed charge.success webhook for every booking, each one 1 + `duplicates`
+    times, from `workers` concurrent senders, in random order. Reports acknowledgement
+    latency and how long the inbox took to drain. Raises RuntimeError unless every booking
+    ends up paid exactly once, with one stored event per booking.
+    """
+    import hashlib
+    import hmac
+    import json
+    from . import db
+    from .models import Booking, Property, User, WebhookEvent
+
+    secret = 'sk_test_' + secrets.token_hex(8)
+    with scratch_app(database_url, PAYSTACK_SECRET_KEY=secret, WEBHOOK_POLL_INTERVAL=0.05) as app:
+        with app.app_context():
+            host = User(email='host@bench.test', first_name='Bench', last_name='Host', user_type='host')
+            guest = User(email='guest@bench.test', first_name='Bench', last_name='Guest', user_type='guest')
+            host.set_password('password')
+            guest.set_password('password')
+            prop = Property(host=host, title='Bench flat', address='1 Bench Road', city='Lagos', state='Lagos',
+                            price_per_night=10000, max_guests=2, num_bedrooms=1, num_bathrooms=1)
+            db.session.add_all([host, guest, prop])
+            first_night = date.today() + timedelta(days=1)
+            for i in range(bookings):
+                check_in = first_night + timedelta(days=i)
+                db.session.add(Booking(guest=guest, property=prop, check_in_date=check_in,
+                                       check_out_date=check_in + timedelta(days=1), num_guests=1, total_price=10000,
+                                       status='confirmed', payment_status='unpaid', paystack_reference=f'bench_{i}'))
+            db.session.commit()
+
+        bodies = []
+        for i in range(bookings):
+            body = json.dumps({'event': 'charge.success', 'data': {
+                'reference': f'bench_{i}', 'amount': 1000000, 'status': 'success',
+            }}).encode()
+            bodies.extend([body] * (1 + duplicates))
+        random.Random(seed).shuffle(bodies)
+
+        def send(client, body):
+            signature = hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+            started = time.perf_counter()
+            status = client.post('/api/payment/webhook', data=body, content_type='application/json',
+                                 headers={'x-paystack-signature': signature}).status_code
+            return status, time.perf_counter() - started
+
+        results, elapsed = run_workers(app, workers, bodies, send)
+        drain_started = time.perf_counter()
+        with app.app_context():
+            deadline = time.monotonic() + 120
+            while WebhookEvent.query.filter(WebhookEvent.status.in_(('pending', 'processing'))).count():
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Timed out waiting for the webhook inbox to drain.")
+                db.session.remove()
+                time.sleep(0.05)
+            drain_seconds = time.perf_counter() - drain_started
+            paid = Booking.query.filter_by(payment_status='paid').count()
+            stored = WebhookEvent.query.count()
+            done = WebhookEvent.query.filter_by(status='done').count()
+
+    timings = sorted(seconds for _, seconds in results)
+    report = {
+        'webhooks': len(results),
+        'acknowledged': sum(1 for status, _ in results if status == 200),
+        'ack_p50_ms': round(timings[len(timings) // 2] * 1000, 1),
+        'ack_p95_ms': round(timings[int(len(timings) * 0.95)] * 1000, 1),
+        'send_seconds': round(elapsed, 3),
+        'drain_after_send_seconds': round(drain_seconds, 3),
+        'stored_events': stored,
+        'done_events': done,
+        'paid_bookings': paid,
+    }
+    if report['acknowledged'] != len(results) or stored != bookings or done != bookings or paid != bookings:
+        raise RuntimeError(f"Inconsistent result: {report}")
+    return report
+
+
+# --- Listing creation with photo uploads ---
+def _bench_photo(photo_kb):
+    """ A JPEG padded with random bytes to photo_kb (decoders ignore data after the image). """
+    import io
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(photo_kb * 1024)
+    buffer = io.BytesIO()
+    Image.linear_gradient('L').resize((1600, 1200)).convert('RGB').save(buffer, 'JPEG', quality=85)
+    image = buffer.getvalue()
+    return image + os.urandom(max(photo_kb * 1024 - len(image), 0))
+
+
+def bench_uploads(pool_sizes=(1, 4, 8), photos=15, photo_kb=200, latency=0.1, requests=5, database_url=None,
+                  background=False):
+    """
+    Creates listings with `photos` photos each against the local storage backend, which
+    sleeps `latency` seconds per upload to stand in for Cloudinary. Reports create_property
+    latency for each upload pool size. With background=True photos go through the media job
+    queue instead, the pool size is the number of worker threads, and the time until every
+    listing's photos are attached is reported as well. Every photo is distinct, so content
+    dedup does not skip any upload; with Pillow installed they are real JPEGs and the
+    thumbnail rendering is part of the measurement.
+    """
+    import io
+    from flask_jwt_extended import create_access_token
+    from . import db
+    from .models import Property, User
+
+    payload = _bench_photo(photo_kb)
+    counter = iter(range(10 ** 9))
+    report = []
+    for pool_size in pool_sizes:
+        media_root = tempfile.mkdtemp(prefix='shortlet-bench-media-')
+        try:
+            with scratch_app(database_url, MEDIA_STORAGE='local', MEDIA_ROOT=media_root,
+                             MEDIA_LOCAL_LATENCY=latency, MEDIA_UPLOAD_WORKERS=pool_size,
+                             MEDIA_ASYNC_UPLOADS=background, MEDIA_SPOOL_DIR=os.path.join(media_root, 'spool'),
+                             MEDIA_WORKER_THREADS=pool_size, MEDIA_WORKER_POLL_INTERVAL=0.05) as app:
+                with app.app_context():
+                    host = User(email='host@bench.test', first_name='Bench', last_name='Host', user_type='host')
+                    host.set_password('password')
+                    db.session.add(host)
+                    db.session.commit()
+                    headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(host.id))}
+
+                client = app.test_client()
+                timings = []
+                batch_started = time.perf_counter()
+                for i in range(requests):
+                    form = {'title': f'Bench flat {i}', 'address': '1 Bench Road', 'city': 'Lagos', 'state': 'Lagos',
+                            'price_per_night': '10000', 'max_guests': '2', 'num_bedrooms': '1', 'num_bathrooms': '1',
+                            'listing_photos': [(io.BytesIO(payload + b'%09d' % next(counter)), f'photo{n}.jpg')
+                                               for n in range(photos)]}
+                    started = time.perf_counter()
+                    response = client.post('/api/properties', data=form, headers=headers, content_type='multipart/form-data')
+                    timings.append(time.perf_counter() - started)
+                    if response.status_code not in (201, 202):
+                        raise RuntimeError(f"create_property returned {response.status_code}: {response.get_json()}")
+
+                ready_seconds = None
+                if background:
+                    deadline = time.monotonic() + photos * requests * latency * 2 + 60
+                    with app.app_context():
+                        while Property.query.filter_by(photos_status='processing').count():
+                            if time.monotonic() > deadline:
+                                raise RuntimeError("Timed out waiting for background photo processing.")
+                            db.session.remove()
+                            time.sleep(0.05)
+                        if Property.query.filter_by(photos_status='failed').count():
+                            raise RuntimeError("Some background photo jobs failed.")
+                    ready_seconds = round(time.perf_counter() - batch_started, 3)
+
+                timings.sort()
+                report.append({
+                    'pool_size': pool_size,
+                    'requests': requests,
+                    'median_seconds': round(timings[len(timings) // 2], 3),
+                    'max_seconds': round(timings[-1], 3),
+                    'sequential_estimate': round(photos * latency, 3),
+                    'all_ready_seconds': ready_seconds,
+                })
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+    return report
+
+
+# --- Paystack client against the local stub gateway ---
+def bench_paystack(calls=200, threads=8, latency=0.02, breaker_threshold=5, breaker_reset=1.0):
+    """
+    Drives PaystackClient against app/paystack_stub.py in three phases: healthy, a full
+    outage (every response a 500) and recovery once the breaker's reset timeout has passed
+    and a trial call went through. Reports
+    latency, how many calls were answered, how many requests actually reached the gateway
+    and how many TCP connections it saw. Fewer connections than calls means keep-alive
+    pooling works; few gateway requests during the outage means the breaker shed the load.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .paystack import CircuitBreaker, GatewayUnavailable, PaystackClient
+    from .paystack_stub import run_stub
+
+    report = []
+    with run_stub(latency=latency) as stub:
+        client = PaystackClient('sk_test_bench', base_url=stub.url, connect_timeout=1, read_timeout=5,
+                                retries=1, backoff=0.01, pool_size=threads,
+                                breaker=CircuitBreaker(threshold=breaker_threshold, reset_timeout=breaker_reset))
+        counter = iter(range(10 ** 9))
+        counter_lock = threading.Lock()
+
+        def call(_):
+            with counter_lock:
+                reference = f'bench_{next(counter)}'
+            started = time.perf_counter()
+            try:
+                client.initialize_transaction('guest@bench.test', 100000, reference)
+                ok = True
+            except GatewayUnavailable:
+                ok = False
+            return ok, time.perf_counter() - started
+
+        def phase(name):
+            requests_before, connections_before = stub.requests, stub.connections
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(call, range(calls)))
+            timings = sorted(seconds for _, seconds in results)
+            report.append({
+                'phase': name,
+                'calls': calls,
+                'ok': sum(ok for ok, _ in results),
+                'unavailable': sum(not ok for ok, _ in results),
+                'gateway_requests': stub.requests - requests_before,
+                'connections': stub.connections - connections_before,
+                'p50_ms': round(timings[len(timings) // 2] * 1000, 1),
+                'p95_ms': round(timings[int(len(timings) * 0.95)] * 1000, 1),
+                'breaker': client.breaker.state,
+            })
+
+        phase('healthy')
+        stub.failure_rate = 1.0
+        phase('outage')
+        stub.failure_rate = 0.0
+        time.sleep(breaker_reset)
+        call(None) # The half-open trial call; it closes the breaker again
+        phase('recovered')
+        client.session.close()
+    return report
+
+
+# --- Payment reconciliation against the local stub gateway ---
+def bench_reconcile(bookings=5000, batch_size=500, concurrency=8, rate=0, interrupt_after=2, database_url=None, seed=42):
+    """
+    Seeds unpaid bookings with Paystack references; the stub gateway reports 60% of them
+    paid, 25% abandoned and knows nothing about the rest. Runs the reconciliation, stops it
+    after `interrupt_after` batches, resumes from the checkpoint, and checks that exactly
+    the paid ones were applied and no reference was verified twice.
+    """
+    from . import db, reconcile
+    from .models import Booking, Property, User
+    from .paystack_stub import run_stub
+
+    rng = random.Random(seed)
+    nights_per_property = 100
+    expected_paid = 0
+    with run_stub() as stub:
+        with scratch_app(database_url, PAYSTACK_BASE_URL=stub.url, PAYSTACK_SECRET_KEY='sk_test_bench',
+                         PAYSTACK_POOL_SIZE=concurrency) as app:
+            with app.app_context():
+                host = User(email='host@bench.test', first_name='Bench', last_name='Host', user_type='host')
+                guest = User(email='guest@bench.test', first_name='Bench', last_name='Guest', user_type='guest')
+                host.set_password('password')
+                guest.set_password('password')
+                db.session.add_all([host, guest])
+                first_night = date.today() + timedelta(days=1)
+                props = [Property(host=host, title=f'Bench flat {i}', address='1 Bench Road', city='Lagos', state='Lagos',
+                                  price_per_night=10000, max_guests=2, num_bedrooms=1, num_bathrooms=1)
+                         for i in range(-(-bookings // nights_per_property))]
+                db.session.add_all(props)
+                for i in range(bookings):
+                    reference = f'bench_{i}'
+                    check_in = first_night + timedelta(days=i % nights_per_property)
+                    db.session.add(Booking(guest=guest, property=props[i // nights_per_property], check_in_date=check_in,
+                                           check_out_date=check_in + timedelta(days=1), num_guests=1, total_price=10000,
+                                           status='confirmed', payment_status='unpaid', paystack_reference=reference))
+                    roll = rng.random()
+                    if roll < 0.6:
+                        stub.set_transaction(reference, 'success', 1000000)
+                        expected_paid += 1
+                    elif roll < 0.85:
+                        stub.set_transaction(reference, 'abandoned', 1000000)
+                db.session.commit()
+
+                checkpoint = os.path.join(tempfile.mkdtemp(prefix='shortlet-bench-'), 'checkpoint.json')
+                started = time.perf_counter()
+                first = reconcile.reconcile_payments(checkpoint, batch_size, concurrency, rate, max_batches=interrupt_after)
+                resumed = reconcile.reconcile_payments(checkpoint, batch_size, concurrency, rate)
+                elapsed = time.perf_counter() - started
+                paid = Booking.query.filter_by(payment_status='paid').count()
+                shutil.rmtree(os.path.dirname(checkpoint), ignore_errors=True)
+
+    report = {
+        'bookings': bookings,
+        'batches_before_interrupt': first['batches'],
+        'batches_total': resumed['batches'],
+        'checked': resumed['checked'],
+        'paid': resumed['paid'],
+        'not_paid': resumed['not_paid'],
+        'not_found': resumed['not_found'],
+        'gateway_requests': stub.requests,
+        'seconds': round(elapsed, 3),
+        'per_second': round(bookings / elapsed, 1) if elapsed else None,
+    }
+    if paid != expected_paid or resumed['paid'] != expected_paid or stub.requests != bookings:
+        raise RuntimeError(f"Expected {expected_paid} paid bookings and {bookings} verify calls: {report}")
+    return report
+
+
+# --- Login throughput per bcrypt cost ---
+def bench_login(costs=(4, 8, 10, 12), logins=200, workers=16, users=20, hash_concurrency=None, database_url=None):
+    """
+    For each bcrypt cost: seeds users hashed at that cost and sends `logins` logins from
+    `workers` concurrent clients. Meanwhile one client keeps reading GET /api/properties, to
+    show how much the burst slows down a cheap endpoint. Also checks that a user with a hash
+    made at another cost is rehashed at this one on login.
+    """
+    from . import db, passwords
+    from .models import User
+
+    overrides = {}
+    if hash_concurrency:
+        overrides['PASSWORD_HASH_CONCURRENCY'] = hash_concurrency
+    report = []
+    for cost in costs:
+        with scratch_app(database_url, BCRYPT_LOG_ROUNDS=cost, **overrides) as app:
+            with app.app_context():
+                password_hash = passwords.hash_password('password') # One hash for everyone: seeding stays fast at any cost
+                db.session.add_all([User(email=f'user{i}@bench.test', first_name='Bench', last_name='User',
+                                         user_type='guest', password_hash=password_hash) for i in range(users)])
+                legacy_cost = 5 if cost == 4 else 4
+                legacy = User(email='legacy@bench.test', first_name='Bench', last_name='Legacy', user_type='guest',
+                              password_hash=passwords.bcrypt.generate_password_hash('password', legacy_cost).decode('utf-8'))
+                db.session.add(legacy)
+                db.session.commit()
+
+            client = app.test_client()
+            status = client.post('/api/auth/login', json={'email': 'legacy@bench.test', 'password': 'password'}).status_code
+            with app.app_context():
+                rehashed = status == 200 and passwords.hash_rounds(
+                    User.query.filter_by(email='legacy@bench.test').one().password_hash) == cost
+
+            reads = []
+            burst_over = threading.Event()
+
+            def reader():
+                read_client = app.test_client()
+                while not burst_over.is_set():
+                    started = time.perf_counter()
+                    read_client.get('/api/properties')
+                    reads.append(time.perf_counter() - started)
+
+            def login(client, i):
+                started = time.perf_counter()
+                status = client.post('/api/auth/login', json={'email': f'user{i % users}@bench.test',
+                                                              'password': 'password'}).status_code
+                return status, time.perf_counter() - started
+
+            read_thread = threading.Thread(target=reader)
+            read_thread.start()
+            results, elapsed = run_workers(app, workers, range(logins), login)
+            burst_over.set()
+            read_thread.join()
+
+        ok = sorted(seconds for status, seconds in results if status == 200)
+        reads.sort()
+        report.append({
+            'cost': cost,
+            'logins': len(results),
+            'ok': len(ok),
+            'busy': sum(1 for status, _ in results if status == 503),
+            'per_second': round(len(ok) / elapsed, 1) if elapsed else None,
+            'p50_ms': round(ok[len(ok) // 2] * 1000, 1) if ok else None,
+            'p95_ms': round(ok[int(len(ok) * 0.95)] * 1000, 1) if ok else None,
+            'read_p95_ms': round(reads[int(len(reads) * 0.95)] * 1000, 1) if reads else None,
+            'rehashed': rehashed,
+        })
+    return report
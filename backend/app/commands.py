@@ -0,0 +1,224 @@
+import os
+
+import click
+
+from . import bench
+from .amenities import reindex_all
+from . import ratings, rollups, media_jobs, webhooks, reconcile, revocation
+from .paystack_stub import StubGateway
+
+
+def register_commands(app):
+    """ Attaches the project's maintenance commands to the `flask` CLI. """
+
+    @app.cli.command('reindex-amenities')
+    def reindex_amenities_command():
+        """ Rebuild the amenity / power-backup filter index from every listing. """
+        count = reindex_all()
+        click.echo(f"Reindexed tags for {count} properties.")
+
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        """ Recompute every listing's rating aggregates from its reviews. """
+        count = ratings.rebuild_all()
+        click.echo(f"Rebuilt rating aggregates for {count} properties.")
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """ Recompute the host analytics daily rollup table from every booking. """
+        count = rollups.rebuild_all()
+        click.echo(f"Rebuilt daily rollups from {count} bookings.")
+
+    @app.cli.command('prune-revoked-tokens')
+    def prune_revoked_tokens_command():
+        """ Delete revoked tokens that have expired (run it daily, e.g. from cron). """
+        tokens, watermarks = revocation.prune()
+        click.echo(f"Pruned {tokens} expired revoked token(s) and {watermarks} stale logout-all marker(s).")
+
+    @app.cli.command('reconcile-payments')
+    @click.option('--batch-size', default=500, help='Bookings verified and applied per transaction.')
+    @click.option('--concurrency', default=8, help='Concurrent verify calls.')
+    @click.option('--rate', default=20.0, help='Maximum verify calls per second (0 = unlimited).')
+    @click.option('--checkpoint', default=None, help='Checkpoint file (default: reconcile_checkpoint.json in the instance folder).')
+    @click.option('--restart', is_flag=True, help='Ignore an unfinished checkpoint and start from the first booking.')
+    def reconcile_payments_command(batch_size, concurrency, rate, checkpoint, restart):
+        """ Ask Paystack about unpaid bookings that have a reference and apply the payments that went through. """
+        checkpoint = checkpoint or os.path.join(app.instance_path, 'reconcile_checkpoint.json')
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint)), exist_ok=True)
+        try:
+            totals = reconcile.reconcile_payments(checkpoint, batch_size, concurrency, rate, resume=not restart)
+        except reconcile.GatewayDown as e:
+            raise click.ClickException(str(e))
+        click.echo(', '.join(f"{name}: {totals[name]}" for name in reconcile.COUNTERS + ('batches',)))
+
+    @app.cli.command('media-worker')
+    @click.option('--once', is_flag=True, help='Process the jobs that are due now, then exit.')
+    def media_worker_command(once):
+        """ Process queued listing photos (runs until interrupted). """
+        if once:
+            click.echo(f"Processed {media_jobs.run_pending()} media job(s).")
+            return
+        click.echo("Media worker running; press Ctrl+C to stop.")
+        app.extensions['media_workers'].run_forever()
+
+    @app.cli.group('webhooks')
+    def webhooks_group():
+        """ Paystack webhook inbox (see app/webhooks.py). """
+
+    @webhooks_group.command('process')
+    @click.option('--once', is_flag=True, help='Drain the events that are due now, then exit.')
+    def webhooks_process_command(once):
+        """ Apply stored webhook events (runs until interrupted). """
+        if once:
+            click.echo(f"Processed {webhooks.run_pending()} webhook event(s).")
+            return
+        click.echo("Webhook processor running; press Ctrl+C to stop.")
+        app.extensions['webhook_workers'].run_forever()
+
+    @webhooks_group.command('status')
+    @click.option('--limit', default=50, help='Dead events to list.')
+    def webhooks_status_command(limit):
+        """ Show inbox counts by status and list dead-lettered events. """
+        counts = webhooks.status_counts()
+        click.echo(', '.join(f"{status}: {count}" for status, count in sorted(counts.items())) or "Inbox is empty.")
+        dead = webhooks.dead_letters(limit)
+        if dead:
+            click.echo(f"{'id':>6} {'event':<16} {'reference':<32} {'attempts':>8}  last error")
+            for event in dead:
+                click.echo(f"{event.id:>6} {event.event or '-':<16} {event.reference or '-':<32} {event.attempts:>8}  {event.outcome}")
+
+    @webhooks_group.command('retry')
+    @click.argument('event_ids', nargs=-1, type=int)
+    @click.option('--all-dead', is_flag=True, help='Requeue every dead event.')
+    def webhooks_retry_command(event_ids, all_dead):
+        """ Put dead-lettered events back in the queue. """
+        if not event_ids and not all_dead:
+            raise click.UsageError("Pass event ids or --all-dead.")
+        click.echo(f"Requeued {webhooks.requeue(list(event_ids) or None)} event(s).")
+
+    @app.cli.group('bench')
+    def bench_group():
+        """ Load benchmarks against a scratch database (see app/bench.py). """
+
+    @bench_group.command('confirm')
+    @click.option('--workers', default='1,2,4,8', help='Comma-separated worker thread counts to try.')
+    @click.option('--properties', default=20, help='Number of properties.')
+    @click.option('--bookings', default=30, help='Overlapping pending bookings per property.')
+    @click.option('--database-url', default=None, help='Empty scratch database to run against (default: temporary SQLite file).')
+    def bench_confirm_command(workers, properties, bookings, database_url):
+        """ Confirm overlapping bookings concurrently; report throughput and fail on any double booking. """
+        worker_counts = [int(n) for n in workers.split(',')]
+        try:
+            report = bench.bench_confirm(worker_counts, properties, bookings, database_url)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{'workers':>7} {'attempts':>8} {'confirmed':>9} {'conflicts':>9} {'errors':>6} {'seconds':>8} {'per sec':>8} {'overlaps':>8}")
+        for row in report:
+            click.echo(f"{row['workers']:>7} {row['attempts']:>8} {row['confirmed']:>9} {row['conflicts']:>9} "
+                       f"{row['errors']:>6} {row['seconds']:>8} {row['per_second']:>8} {row['overlaps']:>8}")
+        if any(row['overlaps'] or row['errors'] for row in report):
+            raise click.ClickException("Double bookings or errors detected.")
+        click.echo("No overlapping confirmed bookings.")
+
+    @bench_group.command('uploads')
+    @click.option('--pool-sizes', default='1,4,8', help='Comma-separated upload pool sizes to try.')
+    @click.option('--photos', default=15, help='Photos per listing.')
+    @click.option('--photo-kb', default=200, help='Size of each photo in KB.')
+    @click.option('--latency', default=0.1, help='Simulated seconds per upload (local storage backend).')
+    @click.option('--requests', 'num_requests', default=5, help='Listings to create per pool size.')
+    @click.option('--database-url', default=None, help='Empty scratch database to run against (default: temporary SQLite file).')
+    @click.option('--background', is_flag=True, help='Queue photos for media worker threads instead of uploading in the request.')
+    def bench_uploads_command(pool_sizes, photos, photo_kb, latency, num_requests, database_url, background):
+        """ Time create_property with many photos against the local storage backend. """
+        try:
+            report = bench.bench_uploads([int(n) for n in pool_sizes.split(',')], photos, photo_kb,
+                                         latency, num_requests, database_url, background)
+        except (ValueError, RuntimeError) as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{'pool':>5} {'requests':>8} {'median s':>9} {'max s':>7} {'sequential s':>13} {'all ready s':>12}")
+        for row in report:
+            ready = row['all_ready_seconds'] if row['all_ready_seconds'] is not None else '-'
+            click.echo(f"{row['pool_size']:>5} {row['requests']:>8} {row['median_seconds']:>9} "
+                       f"{row['max_seconds']:>7} {row['sequential_estimate']:>13} {ready:>12}")
+
+    @bench_group.command('webhooks')
+    @click.option('--workers', default=8, help='Concurrent webhook senders.')
+    @click.option('--bookings', default=200, help='Bookings to pay (one charge.success event each).')
+    @click.option('--duplicates', default=2, help='Extra copies of every event, as Paystack retries send.')
+    @click.option('--database-url', default=None, help='Empty scratch database to run against (default: temporary SQLite file).')
+    def bench_webhooks_command(workers, bookings, duplicates, database_url):
+        """ Burst signed webhooks at the inbox; report ack latency and drain time, fail on double processing. """
+        try:
+            report = bench.bench_webhooks(workers, bookings, duplicates, database_url)
+        except (ValueError, RuntimeError) as e:
+            raise click.ClickException(str(e))
+        for key, value in report.items():
+            click.echo(f"{key:>26}: {value}")
+
+    @bench_group.command('reconcile')
+    @click.option('--bookings', default=5000, help='Unpaid bookings with a Paystack reference.')
+    @click.option('--batch-size', default=500, help='Bookings per transaction.')
+    @click.option('--concurrency', default=8, help='Concurrent verify calls.')
+    @click.option('--rate', default=0.0, help='Maximum verify calls per second (0 = unlimited).')
+    @click.option('--database-url', default=None, help='Empty scratch database to run against (default: temporary SQLite file).')
+    def bench_reconcile_command(bookings, batch_size, concurrency, rate, database_url):
+        """ Reconcile payments against the stub gateway with an interruption and resume; fail on wrong results. """
+        try:
+            report = bench.bench_reconcile(bookings, batch_size, concurrency, rate, database_url=database_url)
+        except (ValueError, RuntimeError) as e:
+            raise click.ClickException(str(e))
+        for key, value in report.items():
+            click.echo(f"{key:>25}: {value}")
+
+    @bench_group.command('login')
+    @click.option('--costs', default='4,8,10,12', help='Comma-separated bcrypt costs (BCRYPT_LOG_ROUNDS) to try.')
+    @click.option('--logins', default=200, help='Logins per cost.')
+    @click.option('--workers', default=16, help='Concurrent clients.')
+    @click.option('--hash-concurrency', default=None, type=int, help='PASSWORD_HASH_CONCURRENCY (default: from config).')
+    @click.option('--database-url', default=None, help='Empty scratch database to run against (default: temporary SQLite file).')
+    def bench_login_command(costs, logins, workers, hash_concurrency, database_url):
+        """ Login throughput and latency at each bcrypt cost, with a reader running alongside. """
+        try:
+            report = bench.bench_login([int(n) for n in costs.split(',')], logins, workers,
+                                       hash_concurrency=hash_concurrency, database_url=database_url)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{'cost':>4} {'logins':>6} {'ok':>5} {'503':>5} {'per sec':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                   f"{'read p95 ms':>11} {'rehash':>6}")
+        for row in report:
+            click.echo(f"{row['cost']:>4} {row['logins']:>6} {row['ok']:>5} {row['busy']:>5} {row['per_second']:>8} "
+                       f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['read_p95_ms']:>11} {'ok' if row['rehashed'] else 'FAIL':>6}")
+        if not all(row['rehashed'] for row in report):
+            raise click.ClickException("A login did not rehash a password made at another cost.")
+
+    @bench_group.command('paystack')
+    @click.option('--calls', default=200, help='Calls per phase.')
+    @click.option('--threads', default=8, help='Concurrent callers.')
+    @click.option('--latency', default=0.02, help='Stub gateway latency in seconds.')
+    def bench_paystack_command(calls, threads, latency):
+        """ Exercise the Paystack client's pooling and circuit breaker against the local stub gateway. """
+        report = bench.bench_paystack(calls, threads, latency)
+        click.echo(f"{'phase':>10} {'calls':>6} {'ok':>5} {'503':>5} {'gateway reqs':>12} {'connections':>11} "
+                   f"{'p50 ms':>7} {'p95 ms':>7} {'breaker':>9}")
+        for row in report:
+            click.echo(f"{row['phase']:>10} {row['calls']:>6} {row['ok']:>5} {row['unavailable']:>5} "
+                       f"{row['gateway_requests']:>12} {row['connections']:>11} {row['p50_ms']:>7} "
+                       f"{row['p95_ms']:>7} {row['breaker']:>9}")
+
+    @app.cli.command('paystack-stub')
+    @click.option('--host', default='127.0.0.1')
+    @click.option('--port', default=8765)
+    @click.option('--latency', default=0.0, help='Seconds to wait before every response.')
+    @click.option('--failure-rate', default=0.0, help='Fraction of requests answered with a 500.')
+    @click.option('--auto-pay', is_flag=True, help='Report initialized transactions as paid.')
+    def paystack_stub_command(host, port, latency, failure_rate, auto_pay):
+        """ Serve a local stand-in for the Paystack API (set PAYSTACK_BASE_URL to its URL). """
+        server = StubGateway(host, port, latency=latency, failure_rate=failure_rate, auto_pay=auto_pay)
+        click.echo(f"Paystack stub listening on {server.url}; press Ctrl+C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
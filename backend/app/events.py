@@ -0,0 +1,34 @@
+"""
+Post-commit hooks for writes that derived data depends on.
+
+Routes call these after a successful db.session.commit() so the in-memory availability
+index, the search cache and the current-user cache follow the database.
+"""
+from .availability import get_availability_index
+from . import identity, search_cache
+
+
+def booking_status_changed(booking, previous_status):
+    if booking.status == previous_status:
+        return
+    index = get_availability_index()
+    if booking.status == 'confirmed':
+        index.mark_booked(booking.property_id, booking.check_in_date, booking.check_out_date)
+    elif previous_status == 'confirmed':
+        # Reload rather than clear bits: another confirmed booking may share nights
+        index.refresh_property(booking.property_id)
+    search_cache.invalidate_date_filtered()
+
+
+def listing_changed(*locations):
+    """ A listing was created or updated; locations are the (city, state) pairs it had. """
+    search_cache.invalidate_listing(*locations)
+
+
+def listing_deleted(property_id, city, state):
+    get_availability_index().remove_property(property_id)
+    search_cache.invalidate_listing((city, state))
+
+
+def user_changed(user_id):
+    identity.invalidate_user(user_id)
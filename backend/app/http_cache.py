@@ -0,0 +1,36 @@
+"""
+Conditional GET helpers.
+
+Routes compute a strong ETag from a few cheap columns (timestamps, counters), check
+If-None-Match, and only load and serialize the full representation when the client's
+copy is stale.
+"""
+import hashlib
+
+from flask import current_app, jsonify, request
+
+# Bump when a response shape changes so clients drop copies cached under the old one
+REPRESENTATION_VERSION = 1
+
+
+def make_etag(*parts):
+    raw = '|'.join(str(part) for part in (REPRESENTATION_VERSION,) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _with_cache_headers(response, etag):
+    response.set_etag(etag)
+    # Let browsers and shared caches keep the body but revalidate before each use
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def not_modified(etag):
+    """ Returns a bodyless 304 if the client already has this version, else None. """
+    if etag in request.if_none_match:
+        return _with_cache_headers(current_app.response_class(status=304), etag)
+    return None
+
+
+def json_with_etag(payload, etag):
+    return _with_cache_headers(jsonify(payload), etag)
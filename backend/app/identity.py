@@ -0,0 +1,69 @@
+"""
+The logged-in user for JWT-protected routes.
+
+Flask-JWT-Extended calls load_user for every request with a valid token. Views then read
+flask_jwt_extended.current_user instead of parsing get_jwt_identity() and querying the
+user table themselves. What they get is a CurrentUser: a read-only projection of the
+user's public fields, with the same to_dict() as User. Projections are kept in a
+per-worker TTLCache (USER_CACHE_SIZE entries for USER_CACHE_TTL seconds), so a user
+making many requests is looked up once rather than once per request.
+
+Views that change a user load the User row themselves and call events.user_changed()
+after committing, which drops the cached projection.
+"""
+from collections import namedtuple
+
+from flask import current_app, jsonify
+
+from . import db
+from .cache import TTLCache
+
+
+class CurrentUser(namedtuple('CurrentUser', 'id email first_name last_name user_type profile_pic_url created_at')):
+    __slots__ = ()
+
+    @classmethod
+    def from_model(cls, user):
+        return cls(**user.to_dict())
+
+    def to_dict(self):
+        return self._asdict()
+
+
+def get_user_cache():
+    return current_app.extensions['user_cache']
+
+
+def load_user(jwt_header, jwt_data):
+    """ user_lookup_loader: the CurrentUser for the token's identity, or None (-> 401). """
+    from .models import User
+
+    try:
+        user_id = int(jwt_data['sub'])
+    except (KeyError, ValueError, TypeError):
+        return None
+    cache = get_user_cache()
+    user = cache.get(user_id)
+    if user is None:
+        row = db.session.get(User, user_id)
+        if row is None:
+            return None # Deleted since the token was issued
+        user = CurrentUser.from_model(row)
+        cache.set(user_id, user)
+    return user
+
+
+def invalidate_user(user_id):
+    get_user_cache().pop(user_id)
+
+
+def init_app(app, jwt):
+    app.extensions['user_cache'] = TTLCache(
+        maxsize=app.config.get('USER_CACHE_SIZE', 4096),
+        ttl=app.config.get('USER_CACHE_TTL', 60),
+    )
+    jwt.user_lookup_loader(load_user)
+
+    @jwt.user_lookup_error_loader
+    def user_not_found(jwt_header, jwt_data):
+        return jsonify({"message": "User not found."}), 401
@@ -0,0 +1,229 @@
+"""
+Background processing of listing photos.
+
+create_property stages every uploaded file under MEDIA_SPOOL_DIR, queues one MediaJob row
+per photo and answers 202 straight away, so its latency no longer depends on how many
+photos there are or how slow Cloudinary is. Workers then store each staged file through
+app/storage.py (which skips photos stored before and renders card thumbnails) and attach
+the URLs to the property's listing_photos and listing_thumbnails, in upload order.
+GET /api/properties/<id>/photos reports progress.
+
+The queue is the media_job table; there is no broker. Workers run as threads inside every
+app process (MEDIA_WORKER_THREADS, started when the first job is queued) and/or as a
+separate process with `flask media-worker`. A worker claims a job with a conditional
+UPDATE, so any number of them can share the table. The claim is a lease: a job that is
+not finished within MEDIA_JOB_LEASE seconds, for example because its worker died, is
+picked up again. Failed uploads are retried with backoff, up to MEDIA_JOB_MAX_ATTEMPTS.
+"""
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+
+from . import db
+from .models import MediaJob, Property
+from .storage import UploadError, get_media_storage, thumbnail_entry
+from .workers import PollingWorkers
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None) # Stored naive, like the column
+
+
+# --- Enqueueing (request side) ---
+def _stage(file):
+    """ Copies an uploaded file into the spool directory in chunks; returns its path. """
+    spool = current_app.config['MEDIA_SPOOL_DIR']
+    os.makedirs(spool, exist_ok=True)
+    path = os.path.join(spool, f'{uuid.uuid4().hex}.upload')
+    file.stream.seek(0)
+    with open(path, 'wb') as out:
+        shutil.copyfileobj(file.stream, out, CHUNK_SIZE)
+    return path
+
+
+def _remove_staged(path):
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def enqueue_photos(prop, files):
+    """
+    Stages files and queues a job for each, marking the property as processing. Call before
+    committing the property; call notify() after the commit. Returns the staged paths so the
+    caller can discard them with discard_staged() if the commit fails.
+    """
+    paths = []
+    try:
+        for position, file in enumerate(files):
+            path = _stage(file)
+            paths.append(path)
+            prop.media_jobs.append(MediaJob(position=position, filename=file.filename,
+                                            staged_path=path, status='queued', run_after=_utcnow()))
+    except OSError:
+        discard_staged(paths)
+        raise
+    prop.photos_status = 'processing'
+    return paths
+
+
+def discard_staged(paths):
+    for path in paths:
+        _remove_staged(path)
+
+
+def discard_for_property(property_id):
+    """ Removes the spooled files of a property's unprocessed jobs (e.g. before deleting it). """
+    rows = db.session.query(MediaJob.staged_path).filter(
+        MediaJob.property_id == property_id, MediaJob.staged_path.isnot(None)
+    ).all()
+    discard_staged([path for path, in rows])
+
+
+def photo_progress(prop):
+    jobs = MediaJob.query.filter_by(property_id=prop.id).order_by(MediaJob.position).all()
+    counts = {status: sum(1 for job in jobs if job.status == status) for status in ('queued', 'processing', 'done', 'failed')}
+    return {
+        'property_id': prop.id,
+        'photos_status': prop.photos_status,
+        'total': len(jobs),
+        'done': counts['done'],
+        'failed': counts['failed'],
+        'pending': counts['queued'] + counts['processing'],
+        'listing_photos': prop.listing_photos or [],
+        'jobs': [job.to_dict() for job in jobs],
+    }
+
+
+# --- Processing (worker side) ---
+def _due():
+    now = _utcnow()
+    return or_(
+        and_(MediaJob.status == 'queued', MediaJob.run_after <= now),
+        and_(MediaJob.status == 'processing', MediaJob.locked_until < now), # Lease expired
+    )
+
+
+def claim_next():
+    """ Claims the oldest due job for this worker; returns (job_id, attempt) or None. """
+    lease = timedelta(seconds=current_app.config.get('MEDIA_JOB_LEASE', 300))
+    for _ in range(5): # Another worker may win the race for the same row; try the next one
+        job_id = db.session.query(MediaJob.id).filter(_due()).order_by(MediaJob.id).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        attempt = db.session.query(MediaJob.attempts).filter_by(id=job_id).scalar()
+        claimed = MediaJob.query.filter(MediaJob.id == job_id, MediaJob.attempts == attempt, _due()).update({
+            MediaJob.status: 'processing',
+            MediaJob.attempts: attempt + 1,
+            MediaJob.locked_until: _utcnow() + lease,
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return job_id, attempt + 1
+    return None
+
+
+def _refresh_property_photos(property_id):
+    """ Rebuilds listing_photos and listing_thumbnails from the finished jobs, under the property row lock. """
+    prop = db.session.query(Property).filter_by(id=property_id).with_for_update().first()
+    if prop is None:
+        return None
+    done = db.session.query(MediaJob.url, MediaJob.thumbnail).filter(
+        MediaJob.property_id == property_id, MediaJob.status == 'done'
+    ).order_by(MediaJob.position).all()
+    pending, failed = db.session.query(
+        func.count(MediaJob.id).filter(MediaJob.status.in_(('queued', 'processing'))),
+        func.count(MediaJob.id).filter(MediaJob.status == 'failed'),
+    ).filter(MediaJob.property_id == property_id).one()
+    prop.listing_photos = [url for url, _ in done]
+    prop.listing_thumbnails = [thumbnail or {'url': url, 'webp': None} for url, thumbnail in done]
+    if not pending:
+        prop.photos_status = 'failed' if failed else 'ready'
+    return prop.city, prop.state
+
+
+def process(job_id, attempt):
+    """ Uploads one claimed job and records the outcome. """
+    from . import events
+
+    job = db.session.get(MediaJob, job_id)
+    if job is None:
+        return
+    storage = get_media_storage()
+    staged_path, filename, property_id = job.staged_path, job.filename, job.property_id
+    db.session.rollback() # Don't hold a transaction open during the upload
+
+    # Only the worker holding this claim (same attempt number) may record a result
+    ours = and_(MediaJob.id == job_id, MediaJob.status == 'processing', MediaJob.attempts == attempt)
+    try:
+        with open(staged_path, 'rb') as stream:
+            asset = storage.upload_stream(stream, filename)
+    except (UploadError, OSError, TypeError) as e:
+        max_attempts = current_app.config.get('MEDIA_JOB_MAX_ATTEMPTS', 3)
+        if attempt < max_attempts and not isinstance(e, (OSError, TypeError)):
+            backoff = timedelta(seconds=current_app.config.get('MEDIA_JOB_RETRY_DELAY', 30) * 2 ** (attempt - 1))
+            MediaJob.query.filter(ours).update({
+                MediaJob.status: 'queued', MediaJob.run_after: _utcnow() + backoff, MediaJob.error: str(e)[:500],
+            }, synchronize_session=False)
+            db.session.commit()
+            print(f"Media job {job_id} failed (attempt {attempt}), retrying: {e}")
+            return
+        updated = MediaJob.query.filter(ours).update({
+            MediaJob.status: 'failed', MediaJob.staged_path: None, MediaJob.error: str(e)[:500],
+        }, synchronize_session=False)
+        location = _refresh_property_photos(property_id) if updated else None
+        db.session.commit()
+        if updated:
+            _remove_staged(staged_path)
+        print(f"Media job {job_id} failed permanently: {e}")
+    else:
+        updated = MediaJob.query.filter(ours).update({
+            MediaJob.status: 'done', MediaJob.url: asset.url, MediaJob.asset_id: asset.asset_id,
+            MediaJob.thumbnail: thumbnail_entry(asset), MediaJob.staged_path: None, MediaJob.error: None,
+        }, synchronize_session=False)
+        if updated:
+            storage.register([asset])
+        location = _refresh_property_photos(property_id) if updated else None
+        db.session.commit()
+        if not updated:
+            # Our lease ran out and another worker took over (or the listing was deleted)
+            if asset.is_new:
+                storage.delete_all([asset.asset_id])
+            return
+        _remove_staged(staged_path)
+
+    if location:
+        events.listing_changed(location)
+
+
+def run_pending(limit=None):
+    """ Processes due jobs until none are left (or limit is reached); returns how many ran. """
+    processed = 0
+    while limit is None or processed < limit:
+        claim = claim_next()
+        if claim is None:
+            return processed
+        process(*claim)
+        processed += 1
+    return processed
+
+
+# --- In-process worker threads ---
+def init_app(app):
+    app.extensions['media_workers'] = PollingWorkers(
+        app, 'media worker', lambda: run_pending(limit=10), 'MEDIA_WORKER_THREADS', 'MEDIA_WORKER_POLL_INTERVAL',
+    )
+
+
+def notify():
+    """ Wakes this process's workers (starting them on first use) after jobs were committed. """
+    current_app.extensions['media_workers'].notify()
@@ -1,7 +1,17 @@
-from . import db, bcrypt # Import db and bcrypt from the app/__init__.py
+from . import db, passwords # Import db from the app/__init__.py
+from datetime import datetime, timezone
 from sqlalchemy.sql import func # For default timestamps
 from sqlalchemy.dialects.postgresql import JSONB # If using PostgreSQL for JSON
 from sqlalchemy import JSON, Text # Standard JSON type, works for SQLite too
+from sqlalchemy.dialects import sqlite
+
+# Timestamps are filled server-side (CURRENT_TIMESTAMP), which SQLite stores without
+# fractional seconds. Bind parameters must use the same text format, otherwise keyset
+# comparisons like created_at < :cursor are off for rows created in the same second.
+Timestamp = db.DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    'sqlite'
+)
 
 
 class User(db.Model):
@@ -13,18 +23,21 @@ class User(db.Model):
     # 'guest' or 'host' - consider using an Enum later if needed
     user_type = db.Column(db.String(10), nullable=False, default='host')
     profile_pic_url = db.Column(db.String(255), nullable=True)
-    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    created_at = db.Column(Timestamp, server_default=func.now())
+    # Naive UTC; tokens issued before it are revoked (logout from all devices). See app/revocation.py
+    tokens_valid_after = db.Column(db.DateTime, nullable=True, index=True)
 
     # Relationships (defined later if needed for easier querying, but conceptually here)
     properties = db.relationship('Property', backref='host', lazy=True) # Properties hosted by this user
     bookings = db.relationship('Booking', backref='guest', lazy=True) # Bookings made by this user
     reviews = db.relationship('Review', backref='author', lazy=True) # Reviews written by this user
 
+    # Both count against the per-process hashing limit and may raise passwords.HashingBusy
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return passwords.check_password(self.password_hash, password)
 
     def to_dict(self):
         """Serializes User object to a dictionary, excluding password."""
@@ -42,7 +55,50 @@ class User(db.Model):
         return f'<User {self.email}>'
     
 
+# Inverted index behind amenity / power-backup filtering: which tags each property has.
+# The JSON columns on Property stay the display source; this is kept in sync on write.
+property_amenity = db.Table(
+    'property_amenity',
+    db.Column('property_id', db.Integer, db.ForeignKey('property.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('amenity_id', db.Integer, db.ForeignKey('amenity.id'), primary_key=True),
+    # Lookups start from the tag ("all properties with Pool")
+    db.Index('ix_property_amenity_amenity_id', 'amenity_id', 'property_id'),
+)
+
+
+class Amenity(db.Model):
+    """ Normalized tag dictionary: an amenity ("wifi") or a power backup source ("generator"). """
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'slug', name='uq_amenity_kind_slug'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='amenity') # 'amenity' or 'power_backup'
+    slug = db.Column(db.String(80), nullable=False) # Lower-cased, whitespace-collapsed name used for matching
+    name = db.Column(db.String(80), nullable=False) # Display name as first entered
+
+    def to_dict(self):
+        return {'id': self.id, 'kind': self.kind, 'slug': self.slug, 'name': self.name}
+
+    def __repr__(self):
+        return f'<Amenity {self.kind}:{self.slug}>'
+
+
 class Property(db.Model):
+    __table_args__ = (
+        # Newest-first listing pages and "my listings" (keyset on created_at, id)
+        db.Index('ix_property_created_at_id', 'created_at', 'id'),
+        db.Index('ix_property_host_id_created_at', 'host_id', 'created_at', 'id'),
+        # Range filters on the search page
+        db.Index('ix_property_price_per_night', 'price_per_night'),
+        db.Index('ix_property_num_bedrooms', 'num_bedrooms'),
+        db.Index('ix_property_max_guests', 'max_guests'),
+        # Map viewport (bbox) and radius searches: grid cell first, exact coordinates second (see app/geo.py)
+        db.Index('ix_property_geo_cell', 'geo_cell'),
+        # sort=rating (keyset on rating_avg, id)
+        db.Index('ix_property_rating_avg_id', 'rating_avg', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     host_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # Link to the User who is the host
     title = db.Column(db.String(150), nullable=False)
@@ -63,45 +119,133 @@ class Property(db.Model):
 
     latitude = db.Column(db.Float, nullable=True) # For map integration
     longitude = db.Column(db.Float, nullable=True)
+    geo_cell = db.Column(db.Integer, nullable=True) # Grid cell of (latitude, longitude), kept in step by app/geo.py
 
     # Store image URLs as a JSON list e.g., ["url1.jpg", "url2.png"]
     listing_photos = db.Column(JSON, nullable=True)
+    # Card-size versions of listing_photos, same order: [{"url": jpeg, "webp": webp or null}]. See app/storage.py.
+    listing_thumbnails = db.Column(JSON, nullable=True)
 
-    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+    created_at = db.Column(Timestamp, server_default=func.now())
+    # Set in Python with microseconds: it feeds the detail page ETag, and CURRENT_TIMESTAMP on
+    # SQLite only has whole seconds, so two edits in one second would share a version.
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=lambda: datetime.now(timezone.utc))
+    # Incremented whenever a booking for this property changes status; versions booked-dates
+    booking_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Review aggregates, maintained by app/ratings.py. rating_avg is 0 until the first review.
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_avg = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    rating_1 = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Reviews per star
+    rating_2 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5 = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # 'processing' while uploaded photos are still being stored in the background, then 'ready'
+    # (or 'failed' if some photos could not be stored). See app/media_jobs.py.
+    photos_status = db.Column(db.String(20), nullable=False, default='ready', server_default='ready')
 
     # Relationships
     bookings = db.relationship('Booking', backref='property', lazy=True, cascade="all, delete-orphan")
     reviews = db.relationship('Review', backref='property', lazy=True, cascade="all, delete-orphan")
+    tags = db.relationship('Amenity', secondary=property_amenity, lazy=True) # Maintained by app/amenities.py
+    daily_stats = db.relationship('PropertyDailyStats', lazy=True, cascade="all, delete-orphan") # app/rollups.py
+    media_jobs = db.relationship('MediaJob', lazy=True, cascade="all, delete-orphan") # app/media_jobs.py
 
-    def to_dict(self): # Basic serialization helper
-         return {
-            'id': self.id,
-            'host_id': self.host_id,
-            'title': self.title,
-            'description': self.description,
-            'address': self.address,
-            'city': self.city,
-            'state': self.state,
-            'price_per_night': self.price_per_night,
-            'max_guests': self.max_guests,
-            'num_bedrooms': self.num_bedrooms,
-            'num_bathrooms': self.num_bathrooms,
-            'amenities': self.amenities or [],
-            'power_backup_details': self.power_backup_details,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'listing_photos': self.listing_photos or [],
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            # Add host info or average review rating here later if needed
-        }
+    @staticmethod
+    def bump_booking_version(property_id):
+        """
+        Marks this property's booked dates as changed. Doubles as the per-property booking lock:
+        the UPDATE row-locks the property until commit (on SQLite it takes the database write
+        lock), so call it BEFORE checking for overlaps and changes to one property serialize
+        while other properties proceed in parallel.
+        """
+        Property.query.filter_by(id=property_id).update(
+            # Assigning updated_at to itself keeps its onupdate from firing: the listing did not change
+            {Property.booking_version: Property.booking_version + 1, Property.updated_at: Property.updated_at},
+            synchronize_session=False
+        )
+
+    # Field name -> serializer. The order here is the order of the "full" profile.
+    SERIALIZERS = {
+        'id': lambda p: p.id,
+        'host_id': lambda p: p.host_id,
+        'title': lambda p: p.title,
+        'description': lambda p: p.description,
+        'address': lambda p: p.address,
+        'city': lambda p: p.city,
+        'state': lambda p: p.state,
+        'price_per_night': lambda p: p.price_per_night,
+        'max_guests': lambda p: p.max_guests,
+        'num_bedrooms': lambda p: p.num_bedrooms,
+        'num_bathrooms': lambda p: p.num_bathrooms,
+        'amenities': lambda p: p.amenities or [],
+        'power_backup_details': lambda p: p.power_backup_details,
+        'latitude': lambda p: p.latitude,
+        'longitude': lambda p: p.longitude,
+        'listing_photos': lambda p: p.listing_photos or [],
+        # Listings stored before thumbnails existed fall back to the full-size photos
+        'listing_thumbnails': lambda p: p.listing_thumbnails or [{'url': url, 'webp': None} for url in p.listing_photos or []],
+        'photos_status': lambda p: p.photos_status,
+        'created_at': lambda p: p.created_at.isoformat() if p.created_at else None,
+        'updated_at': lambda p: p.updated_at.isoformat() if p.updated_at else None,
+        'rating_avg': lambda p: round(p.rating_avg, 2) if p.rating_count else None,
+        'rating_count': lambda p: p.rating_count,
+        'rating_histogram': lambda p: {str(star): getattr(p, f'rating_{star}') for star in range(1, 6)},
+    }
+    # Fields that are not a single column of the same name
+    FIELD_COLUMNS = {
+        'rating_avg': ('rating_avg', 'rating_count'),
+        'listing_thumbnails': ('listing_thumbnails', 'listing_photos'),
+        'rating_histogram': ('rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'),
+    }
+    # Named field sets for ?fields=. "card" is what the listing grid and map actually render.
+    FIELD_PROFILES = {
+        'card': ('id', 'title', 'city', 'state', 'price_per_night', 'max_guests', 'num_bedrooms',
+                 'num_bathrooms', 'listing_thumbnails', 'latitude', 'longitude', 'rating_avg', 'rating_count'),
+        'full': tuple(SERIALIZERS),
+    }
+
+    @classmethod
+    def resolve_fields(cls, value):
+        """ Turns a profile name or a comma-separated field list into a tuple of field names. Raises ValueError. """
+        if value in cls.FIELD_PROFILES:
+            return cls.FIELD_PROFILES[value]
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        if not names:
+            raise ValueError("fields must not be empty.")
+        unknown = [name for name in names if name not in cls.SERIALIZERS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+        # id always comes first; clients key their lists on it
+        return ('id',) + tuple(dict.fromkeys(name for name in names if name != 'id'))
+
+    @classmethod
+    def load_only_columns(cls, fields):
+        """ Column attributes to load for the given fields. """
+        names = dict.fromkeys(column for name in fields for column in cls.FIELD_COLUMNS.get(name, (name,)))
+        return [getattr(cls, name) for name in names]
+
+    def to_dict(self, fields=None): # Basic serialization helper; fields=None means every field
+        fields = fields or Property.SERIALIZERS
+        return {name: Property.SERIALIZERS[name](self) for name in fields}
 
     def __repr__(self):
         return f'<Property {self.title}>'
     
 
 class Booking(db.Model):
+    __table_args__ = (
+        # Overlap checks for one property (create/confirm booking, booked-dates)
+        db.Index('ix_booking_property_status_dates', 'property_id', 'status', 'check_in_date', 'check_out_date'),
+        # Availability search across all properties; property_id last so the index covers the subquery
+        db.Index('ix_booking_status_dates_property', 'status', 'check_in_date', 'check_out_date', 'property_id'),
+        # "My bookings" pages (keyset on check_in_date, id)
+        db.Index('ix_booking_guest_id_check_in', 'guest_id', 'check_in_date', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     guest_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
@@ -113,7 +257,7 @@ class Booking(db.Model):
     status = db.Column(db.String(20), nullable=False, default='pending') # e.g., pending, confirmed, cancelled, completed
     payment_status = db.Column(db.String(20), nullable=False, default='unpaid') # e.g., unpaid, paid, refunded
     paystack_reference = db.Column(db.String(100), nullable=True, unique=True)
-    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    created_at = db.Column(Timestamp, server_default=func.now())
 
     def to_dict(self, include_property=False, include_guest=False):
         data = {
@@ -151,12 +295,18 @@ class Booking(db.Model):
     
 
 class Review(db.Model):
+    __table_args__ = (
+        db.Index('ix_review_property_id_created_at', 'property_id', 'created_at'),
+        # Duplicate-review check in create_review
+        db.Index('ix_review_guest_id_property_id', 'guest_id', 'property_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     guest_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
     rating = db.Column(db.Integer, nullable=False) # e.g., 1 to 5
     comment = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    created_at = db.Column(Timestamp, server_default=func.now())
 
     # Add relationship back to User if not already there (from User model's backref)
     # If 'author' backref exists in User model's reviews relationship, this isn't strictly needed
@@ -181,4 +331,132 @@ class Review(db.Model):
         return data
 
     def __repr__(self):
-        return f'<Review {self.id} by User {self.guest_id} for Property {self.property_id}>'
\ No newline at end of file
+        return f'<Review {self.id} by User {self.guest_id} for Property {self.property_id}>'
+
+
+class PropertyDailyStats(db.Model):
+    """
+    Per-property, per-day booking rollup behind the host analytics endpoint, maintained by
+    app/rollups.py. Night-based columns (booked_nights, revenue, paid_revenue) are counted on
+    each night of a confirmed stay; booking counts and lead time on the check-in day.
+    """
+    __tablename__ = 'property_daily_stats'
+
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    booked_nights = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default='0') # Nightly share of confirmed bookings
+    paid_revenue = db.Column(db.Float, nullable=False, default=0, server_default='0') # ... of those also paid
+    pending_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    confirmed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    cancelled_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    lead_time_days = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Summed over confirmed bookings
+
+    def __repr__(self):
+        return f'<PropertyDailyStats {self.property_id} {self.day}>'
+
+
+class MediaJob(db.Model):
+    """ One uploaded listing photo waiting to be (or already) moved to media storage. """
+    __tablename__ = 'media_job'
+    __table_args__ = (
+        # Workers claim the oldest due job
+        db.Index('ix_media_job_status_run_after', 'status', 'run_after', 'id'),
+        db.Index('ix_media_job_property_id_position', 'property_id', 'position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False) # Order of the photo in the upload
+    filename = db.Column(db.String(255), nullable=False)
+    staged_path = db.Column(db.String(500), nullable=True) # Spooled upload; removed once processed
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, processing, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False) # Naive UTC; retries are pushed back
+    locked_until = db.Column(db.DateTime, nullable=True) # Lease of the worker processing it
+    url = db.Column(db.String(500), nullable=True)
+    asset_id = db.Column(db.String(255), nullable=True)
+    thumbnail = db.Column(JSON, nullable=True) # listing_thumbnails item, see storage.thumbnail_entry
+    error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(Timestamp, server_default=func.now())
+
+    def to_dict(self):
+        return {
+            'position': self.position,
+            'filename': self.filename,
+            'status': self.status,
+            'attempts': self.attempts,
+            'url': self.url,
+            'error': self.error,
+        }
+
+    def __repr__(self):
+        return f'<MediaJob {self.id} for Property {self.property_id} ({self.status})>'
+
+
+class MediaAsset(db.Model):
+    """ A stored photo, keyed by the SHA-256 of its bytes, so identical uploads are stored once. """
+    __tablename__ = 'media_asset'
+
+    backend = db.Column(db.String(20), primary_key=True) # 'cloudinary' or 'local'
+    key = db.Column(db.String(64), primary_key=True) # hex SHA-256
+    url = db.Column(db.String(500), nullable=False)
+    asset_id = db.Column(db.String(255), nullable=False)
+    thumbnail_url = db.Column(db.String(500), nullable=True) # Card-size JPEG, None if it could not be rendered
+    thumbnail_webp_url = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(Timestamp, server_default=func.now())
+
+    def __repr__(self):
+        return f'<MediaAsset {self.backend}:{self.key[:12]}>'
+
+
+class WebhookEvent(db.Model):
+    """ A verified Paystack webhook, stored before it is applied. See app/webhooks.py. """
+    __tablename__ = 'webhook_event'
+    __table_args__ = (
+        # The processor claims the oldest due events
+        db.Index('ix_webhook_event_status_run_after', 'status', 'run_after', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dedup_key = db.Column(db.String(200), nullable=False, unique=True) # event:reference; Paystack re-sends the same event
+    event = db.Column(db.String(64), nullable=True) # e.g. charge.success
+    reference = db.Column(db.String(100), nullable=True, index=True)
+    payload = db.Column(Text, nullable=False) # Raw verified body
+    status = db.Column(db.String(20), nullable=False, default='pending') # pending, processing, done, ignored, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False) # Naive UTC; retries are pushed back
+    locked_until = db.Column(db.DateTime, nullable=True) # Lease of the processor holding it
+    lease_token = db.Column(db.String(32), nullable=True)
+    outcome = db.Column(db.String(500), nullable=True) # What processing did, or the last error
+    received_at = db.Column(Timestamp, server_default=func.now())
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event': self.event,
+            'reference': self.reference,
+            'status': self.status,
+            'attempts': self.attempts,
+            'outcome': self.outcome,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
+        }
+
+    def __repr__(self):
+        return f'<WebhookEvent {self.id} {self.event} {self.reference} ({self.status})>'
+
+
+class RevokedToken(db.Model):
+    """ A logged-out JWT, kept until it would have expired anyway. See app/revocation.py. """
+    __tablename__ = 'revoked_token'
+
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    token_type = db.Column(db.String(10), nullable=False) # access or refresh
+    expires_at = db.Column(db.DateTime, nullable=False, index=True) # Naive UTC; pruned after this
+    revoked_at = db.Column(db.DateTime, nullable=False, index=True) # Naive UTC; workers sync on it
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti} ({self.token_type}) user {self.user_id}>'
@@ -0,0 +1,100 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import abort, request
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    """ Packs the sort-key values of the last row into an opaque, URL-safe cursor. """
+    packed = []
+    for value in values:
+        if isinstance(value, (datetime, date)):
+            packed.append({'t': 'dt' if isinstance(value, datetime) else 'd', 'v': value.isoformat()})
+        else:
+            packed.append({'v': value})
+    raw = json.dumps(packed, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, expected_len):
+    """ Reverses encode_cursor. Raises ValueError for anything we did not produce. """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        packed = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+    if not isinstance(packed, list) or len(packed) != expected_len:
+        raise ValueError("Cursor does not match this listing.")
+
+    values = []
+    for item in packed:
+        if not isinstance(item, dict) or 'v' not in item:
+            raise ValueError("Malformed cursor.")
+        if item.get('t') == 'dt':
+            values.append(datetime.fromisoformat(item['v']))
+        elif item.get('t') == 'd':
+            values.append(date.fromisoformat(item['v']))
+        elif isinstance(item['v'], (str, int, float)) or item['v'] is None:
+            values.append(item['v'])
+        else:
+            raise ValueError("Malformed cursor.") # Lists and objects would reach the SQL comparison
+    return values
+
+
+def get_page_args():
+    """ Reads ?limit= and ?cursor= from the request, aborting with 400 on bad input. """
+    limit_str = request.args.get('limit')
+    limit = DEFAULT_PAGE_SIZE
+    if limit_str:
+        try:
+            limit = int(limit_str)
+        except ValueError:
+            abort(400, description="limit must be an integer.")
+        if limit <= 0:
+            abort(400, description="limit must be positive.")
+    return min(limit, MAX_PAGE_SIZE), request.args.get('cursor') or None
+
+
+def keyset_paginate(query, sort_keys, limit, cursor=None):
+    """
+    Applies keyset (seek) pagination to a query.
+
+    sort_keys is a list of (column, value_getter) pairs sorted descending, or
+    (column, value_getter, 'asc') for ascending keys; the last key must be unique
+    (normally the primary key) so rows never tie. Instead of OFFSET we filter on
+    "strictly after the last row of the previous page", so every page costs the same
+    index range scan as page one.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    columns = [key[0] for key in sort_keys]
+    getters = [key[1] for key in sort_keys]
+    ascending = [len(key) > 2 and key[2] == 'asc' for key in sort_keys]
+
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        # (a, b, c) < (va, vb, vc) spelled out as nested OR/AND, which every backend can
+        # turn into an index range (row-value comparison is not portable).
+        condition = None
+        for i in reversed(range(len(columns))):
+            term = columns[i] > values[i] if ascending[i] else columns[i] < values[i]
+            if condition is not None:
+                term = or_(term, and_(columns[i] == values[i], condition))
+            condition = term
+        query = query.filter(condition)
+
+    query = query.order_by(*[col.asc() if asc else col.desc() for col, asc in zip(columns, ascending)])
+    # Fetch one extra row to know whether another page exists without a COUNT(*).
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getter(last) for getter in getters])
+    return rows, next_cursor
@@ -0,0 +1,86 @@
+"""
+Per-process admission control for password hashing.
+
+bcrypt is deliberately slow. If every request thread ran it at once, a burst of logins or
+sign-ups would keep all CPUs busy and cheap read endpoints would wait behind them. So at
+most PASSWORD_HASH_CONCURRENCY hashes or checks run at the same time in a worker process.
+They run on the request's own thread (bcrypt releases the GIL while it works). A request
+that finds every slot taken gets HashingBusy straight away, and the auth routes answer 503
+with Retry-After instead of piling up work they cannot finish in time.
+
+The limit counts threads within one process. Under a threaded server (gunicorn gthread,
+waitress, `flask run`) it caps the CPU a login burst can take. A sync worker serves one
+request at a time and never reaches it; there the number of worker processes is the cap.
+
+The cost factor is BCRYPT_LOG_ROUNDS. When a user logs in with a hash made at a different
+cost, the login route rehashes the password at the current cost (needs_rehash), so
+changing the setting takes effect as users come back.
+"""
+import threading
+
+from flask import current_app
+
+from . import bcrypt
+
+
+class HashingBusy(Exception):
+    """ Every hashing slot in this process is taken; retry_after is a hint in seconds. """
+
+    def __init__(self, retry_after=1):
+        super().__init__("Too many sign-in requests right now. Please try again shortly.")
+        self.retry_after = retry_after
+
+
+class HashingLimiter:
+    def __init__(self, concurrency=2):
+        self.slots = threading.BoundedSemaphore(concurrency) # Hashes in flight across this process's threads
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args):
+        """ Runs fn(*args) on the calling thread if a slot is free; raises HashingBusy if not. """
+        if not self.slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        try:
+            return fn(*args)
+        finally:
+            self.slots.release()
+
+
+def _limiter():
+    return current_app.extensions['password_hashing']
+
+
+def target_rounds():
+    return current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+
+
+def hash_password(password):
+    """ Returns a bcrypt hash of password at the configured cost. """
+    return _limiter().run(bcrypt.generate_password_hash, password, target_rounds()).decode('utf-8')
+
+
+def check_password(password_hash, password):
+    if not password_hash:
+        return False
+    return _limiter().run(bcrypt.check_password_hash, password_hash, password)
+
+
+def hash_rounds(password_hash):
+    """ The cost factor a bcrypt hash was made with ('$2b$12$...' -> 12), or None. """
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def needs_rehash(password_hash):
+    return hash_rounds(password_hash) != target_rounds()
+
+
+def init_app(app):
+    app.extensions['password_hashing'] = HashingLimiter(
+        concurrency=app.config.get('PASSWORD_HASH_CONCURRENCY', 2),
+    )
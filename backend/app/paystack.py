@@ -0,0 +1,233 @@
+"""
+Paystack API client.
+
+One client per app (app.extensions['paystack']), sharing a pooled requests.Session so
+calls reuse keep-alive connections instead of paying for a TLS handshake each time.
+Every call has a connect and a read timeout. Calls that are safe to repeat
+(verify_transaction) are retried with jittered exponential backoff. initialize_transaction
+is only retried when the request never reached Paystack.
+
+A circuit breaker sits in front of the gateway: after PAYSTACK_BREAKER_THRESHOLD calls in
+a row fail (timeouts, connection errors, 5xx), calls fail fast with GatewayUnavailable for
+PAYSTACK_BREAKER_RESET seconds. After that, a single trial call is let through. Routes turn
+GatewayUnavailable into a 503 with Retry-After, instead of tying up a worker on a gateway
+that is down.
+
+Latency and error counts per operation are kept in memory and served by
+GET /api/payments/gateway/stats. PAYSTACK_BASE_URL can point the client at the local stub
+in app/paystack_stub.py.
+"""
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+
+class PaystackError(Exception):
+    """ Paystack answered, but refused the request (4xx, or "status": false). """
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GatewayUnavailable(PaystackError):
+    """ Paystack could not be reached or is failing; retry_after is a hint in seconds. """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message, status_code=503)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """ closed -> open after `threshold` consecutive failures -> half-open (one trial call) after `reset_timeout`. """
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open' # Let this one call find out whether the gateway recovered
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                if self.state != 'open':
+                    print(f"Paystack circuit breaker opened after {self.failures} failure(s).")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def retry_after(self):
+        with self._lock:
+            if self.state != 'open':
+                return 0
+            return max(int(self.reset_timeout - (time.monotonic() - self.opened_at)) + 1, 1)
+
+
+class LatencyMetrics:
+    """ Per-operation call counts and latencies over the last `window` calls. """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def _entry(self, operation):
+        return self._operations.setdefault(operation, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'short_circuited': 0, 'latencies': deque(maxlen=self.window),
+        })
+
+    def record(self, operation, seconds, error=False):
+        with self._lock:
+            entry = self._entry(operation)
+            entry['calls'] += 1
+            entry['errors'] += bool(error)
+            entry['latencies'].append(seconds)
+
+    def count(self, operation, name):
+        with self._lock:
+            self._entry(operation)[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for operation, entry in self._operations.items():
+                latencies = sorted(entry['latencies'])
+                def percentile(p):
+                    return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 1) if latencies else None
+                result[operation] = {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'retries': entry['retries'],
+                    'short_circuited': entry['short_circuited'],
+                    'p50_ms': percentile(0.5),
+                    'p95_ms': percentile(0.95),
+                    'max_ms': round(latencies[-1] * 1000, 1) if latencies else None,
+                }
+            return result
+
+
+class PaystackClient:
+    def __init__(self, secret_key, base_url='https://api.paystack.co', connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.25, pool_size=10, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = LatencyMetrics()
+        self.session = requests.Session()
+        # No adapter-level retries: _request decides what is safe to repeat
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {secret_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter, so clients that failed together do not retry together
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def _request(self, operation, method, path, payload=None, idempotent=False):
+        """ Returns the decoded response body. Raises GatewayUnavailable or PaystackError. """
+        if not self.breaker.allow():
+            self.metrics.count(operation, 'short_circuited')
+            raise GatewayUnavailable("Payment gateway is temporarily unavailable.", retry_after=self.breaker.retry_after())
+
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, self.base_url + path, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                self.metrics.record(operation, time.monotonic() - started, error=True)
+                # A request that never connected was not seen by Paystack, so it is safe to repeat
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                failure = f"{type(e).__name__}: {e}"
+            else:
+                self.metrics.record(operation, time.monotonic() - started, error=response.status_code >= 500)
+                if response.status_code < 500 and response.status_code != 429:
+                    self.breaker.record_success() # Paystack answered; a 4xx is the request's fault, not the gateway's
+                    return self._decode(response)
+                retryable = idempotent or response.status_code == 429 # 429: rejected before processing
+                failure = f"HTTP {response.status_code}"
+
+            if retryable and attempt < self.retries:
+                self.metrics.count(operation, 'retries')
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+            self.breaker.record_failure()
+            print(f"Paystack {operation} failed after {attempt + 1} attempt(s): {failure}")
+            raise GatewayUnavailable("Payment gateway is temporarily unavailable.", retry_after=self.breaker.retry_after() or None)
+
+    @staticmethod
+    def _decode(response):
+        try:
+            body = response.json()
+        except ValueError:
+            raise PaystackError(f"Unexpected response from Paystack (HTTP {response.status_code}).", response.status_code)
+        if response.status_code >= 400 or not body.get('status'):
+            raise PaystackError(body.get('message') or f"Paystack returned HTTP {response.status_code}.", response.status_code)
+        return body
+
+    # --- API calls ---
+    def initialize_transaction(self, email, amount, reference, metadata=None):
+        """ Starts a payment; amount is in kobo. Returns Paystack's data (authorization_url, access_code, reference). """
+        payload = {'email': email, 'amount': amount, 'reference': reference, 'metadata': metadata or {}}
+        # Not idempotent: Paystack rejects a second initialize with the same reference
+        return self._request('initialize', 'POST', '/transaction/initialize', payload)['data']
+
+    def verify_transaction(self, reference):
+        """ Returns Paystack's data for a transaction (status, amount, reference, ...). """
+        return self._request('verify', 'GET', f'/transaction/verify/{requests.utils.quote(reference, safe="")}',
+                             idempotent=True)['data']
+
+    def stats(self):
+        return {
+            'base_url': self.base_url,
+            'breaker': {'state': self.breaker.state, 'consecutive_failures': self.breaker.failures,
+                        'retry_after_seconds': self.breaker.retry_after()},
+            'operations': self.metrics.snapshot(),
+        }
+
+
+def init_app(app):
+    app.extensions['paystack'] = PaystackClient(
+        app.config.get('PAYSTACK_SECRET_KEY'),
+        base_url=app.config.get('PAYSTACK_BASE_URL', 'https://api.paystack.co'),
+        connect_timeout=app.config.get('PAYSTACK_CONNECT_TIMEOUT', 3.05),
+        read_timeout=app.config.get('PAYSTACK_READ_TIMEOUT', 10),
+        retries=app.config.get('PAYSTACK_RETRIES', 2),
+        pool_size=app.config.get('PAYSTACK_POOL_SIZE', 10),
+        breaker=CircuitBreaker(
+            threshold=app.config.get('PAYSTACK_BREAKER_THRESHOLD', 5),
+            reset_timeout=app.config.get('PAYSTACK_BREAKER_RESET', 30),
+        ),
+    )
+
+
+def get_paystack():
+    return current_app.extensions['paystack']
@@ -0,0 +1,132 @@
+"""
+A local stand-in for the parts of the Paystack API this app uses, for benchmarks and manual
+testing without network access or real keys. It implements:
+
+- POST /transaction/initialize
+- GET /transaction/verify/<reference>
+
+Run it with `flask paystack-stub` and point PAYSTACK_BASE_URL at it. Benchmarks start it
+in-process with run_stub().
+
+`latency` delays every response. `failure_rate` answers that fraction of requests with a
+500. `transactions` maps a reference to {'status', 'amount'}, which is what verify reports.
+Initialized transactions start as 'abandoned' unless `auto_pay` is set. Tests can change
+any of these attributes while the server runs.
+"""
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERIFY_PATH = re.compile(r'^/transaction/verify/(?P<reference>[^/?]+)$')
+
+
+class StubGateway(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, auto_pay=False):
+        super().__init__((host, port), StubHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.auto_pay = auto_pay
+        self.transactions = {}
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def set_transaction(self, reference, status, amount):
+        with self._lock:
+            self.transactions[reference] = {'status': status, 'amount': amount}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # Keep-alive, like the real API
+    disable_nagle_algorithm = True # Headers and body go out in separate writes
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass # Quiet; the benchmarks print their own summary
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _preamble(self):
+        """ Applies latency/failure injection and auth; returns False if a response was already sent. """
+        with self.server._lock:
+            self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.failure_rate:
+            self._send(500, {'status': False, 'message': 'Stub gateway failure'})
+            return False
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._send(401, {'status': False, 'message': 'Invalid key'})
+            return False
+        return True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self._preamble():
+            return
+        if self.path != '/transaction/initialize':
+            return self._send(404, {'status': False, 'message': 'Not found'})
+        payload = json.loads(body or b'{}')
+        reference = payload.get('reference')
+        if not reference or not payload.get('email') or not payload.get('amount'):
+            return self._send(400, {'status': False, 'message': 'email, amount and reference are required'})
+        with self.server._lock:
+            if reference in self.server.transactions:
+                return self._send(400, {'status': False, 'message': 'Duplicate Transaction Reference'})
+            self.server.transactions[reference] = {
+                'status': 'success' if self.server.auto_pay else 'abandoned', 'amount': payload['amount'],
+            }
+        self._send(200, {'status': True, 'message': 'Authorization URL created', 'data': {
+            'authorization_url': f'{self.server.url}/checkout/{reference}',
+            'access_code': f'stub_{reference}',
+            'reference': reference,
+        }})
+
+    def do_GET(self):
+        if not self._preamble():
+            return
+        match = VERIFY_PATH.match(self.path)
+        if not match:
+            return self._send(404, {'status': False, 'message': 'Not found'})
+        reference = match.group('reference')
+        with self.server._lock:
+            transaction = self.server.transactions.get(reference)
+        if transaction is None:
+            return self._send(400, {'status': False, 'message': 'Transaction reference not found'})
+        self._send(200, {'status': True, 'message': 'Verification successful', 'data': {
+            'reference': reference, 'status': transaction['status'], 'amount': transaction['amount'], 'currency': 'NGN',
+        }})
+
+
+@contextmanager
+def run_stub(**options):
+    """ Runs a StubGateway on a free local port in a background thread. """
+    server = StubGateway(**options)
+    thread = threading.Thread(target=server.serve_forever, name='paystack-stub', daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,57 @@
+"""
+Per-request SQL query counting.
+
+Every statement executed while a request is handled is counted in flask.g. With
+QUERY_COUNT_HEADER on, the count is sent back as an X-Query-Count header. Views decorated
+with @query_budget(n) complain when they run more than n queries: they raise
+QueryBudgetExceeded under TESTING so a regression fails loudly, and print a warning
+otherwise. tests/test_query_budgets.py calls every budgeted endpoint at two data sizes.
+"""
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BUDGETS = {} # endpoint function name -> max queries per request
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def init_app(app):
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config.get('QUERY_COUNT_HEADER'):
+            response.headers['X-Query-Count'] = str(g.get('query_count', 0))
+        return response
+
+
+def query_budget(limit):
+    """ Caps the number of SQL statements a view may run, whatever the size of its result. """
+    def decorator(view):
+        BUDGETS[view.__name__] = limit
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            before = g.get('query_count', 0) # Not the view's: e.g. the current-user lookup for @jwt_required
+            response = view(*args, **kwargs)
+            used = g.get('query_count', 0) - before
+            if used > limit:
+                message = f"{request.endpoint} ran {used} queries (budget {limit})."
+                if current_app.config.get('TESTING'):
+                    raise QueryBudgetExceeded(message)
+                print(f"Warning: {message}")
+            return response
+        return wrapper
+    return decorator
+
@@ -0,0 +1,202 @@
+"""
+Request rate limiting with token buckets.
+
+Each client gets a bucket per rule. The bucket holds up to `limit` tokens, refills at
+limit/period tokens per second, and every request takes one token. A request that finds
+the bucket empty is answered 429 with Retry-After. The check runs in a before_request
+hook, before the view and its JWT decorators run, so a rejected request does no database
+work.
+
+Rules are set in RATELIMITS, keyed by endpoint ('auth.login_user') or blueprint ('api'):
+
+    RATELIMITS = {'api': '300/minute', 'auth.login_user': '10/minute', 'api.get_media': None}
+
+The most specific rule applies, and None exempts an endpoint. Clients are identified by
+the user id in a valid JWT when there is one (decoded without any database lookup), and
+by IP address otherwise. Behind a reverse proxy, PROXY_FIX_X_FOR makes that the client's
+address rather than the proxy's (see create_app).
+
+Buckets live in one of two backends, chosen with RATELIMIT_BACKEND:
+- 'sqlite' (the default) keeps them in a small SQLite file (RATELIMIT_SQLITE_PATH, by
+  default in the instance folder). All gunicorn workers on a host share it, with no Redis
+  needed.
+- 'memory' keeps them in a dict in each worker process, so each worker limits on its own
+  and N workers let N times the limit through. Only for a single worker process.
+If the backend fails, requests are let through rather than rejected.
+"""
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+RULE_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+PRUNE_EVERY = 1000 # Calls between sweeps of buckets that have refilled completely
+
+
+class Rule:
+    """ '10/minute' or '100/5minutes': a bucket of 10 tokens refilling at 10 per minute. """
+
+    def __init__(self, text):
+        match = RULE_PATTERN.match(text)
+        if not match:
+            raise ValueError(f"Invalid rate limit {text!r}; expected e.g. '10/minute' or '100/5minutes'.")
+        self.text = text.strip()
+        self.limit = int(match.group(1))
+        self.period = int(match.group(2) or 1) * PERIODS[match.group(3)]
+        self.rate = self.limit / self.period # tokens per second
+
+
+def _take(tokens, updated, now, rule):
+    """ Token bucket step: returns (tokens left, allowed, seconds until a token is available). """
+    tokens = min(rule.limit, tokens + (now - updated) * rule.rate)
+    if tokens >= 1:
+        return tokens - 1, True, 0
+    return tokens, False, (1 - tokens) / rule.rate
+
+
+class MemoryBackend:
+    """ Buckets in this process only; at most `max_keys`, least recently used dropped first. """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def hit(self, key, rule):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rule.limit, now))
+            tokens, allowed, retry_after = _take(tokens, updated, now, rule)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False) # Dropping a bucket only forgives that client
+        return allowed, retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """ Buckets in a SQLite file shared by every worker process on the host. """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL") # Readers never wait; writers queue briefly
+            conn.execute("CREATE TABLE IF NOT EXISTS bucket ("
+                         "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_bucket_full_at ON bucket (full_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None) # Transactions managed below
+        conn.execute("PRAGMA synchronous=NORMAL") # Losing the last buckets in a power cut is harmless
+        return conn
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def hit(self, key, rule):
+        now = time.time() # Wall clock: shared between processes
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE") # Take the write lock before reading, so workers cannot interleave
+        try:
+            row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+            tokens, allowed, retry_after = _take(*(row or (rule.limit, now)), now, rule)
+            full_at = now + (rule.limit - tokens) / rule.rate
+            conn.execute("INSERT OR REPLACE INTO bucket (key, tokens, updated, full_at) VALUES (?, ?, ?, ?)",
+                         (key, tokens, now, full_at))
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM bucket WHERE full_at < ?", (now,)) # A full bucket is the same as none
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def reset(self):
+        self.conn.execute("DELETE FROM bucket")
+
+
+class RateLimiter:
+    def __init__(self, backend, rules, enabled=True):
+        self.backend = backend
+        self.rules = {scope: Rule(text) if text else None for scope, text in rules.items()}
+        self.enabled = enabled
+        self.rejected = 0
+
+    def rule_for(self, endpoint):
+        """ (scope, Rule) for an endpoint: its own rule, else its blueprint's; Rule None = no limit. """
+        if endpoint in self.rules:
+            return endpoint, self.rules[endpoint]
+        blueprint = endpoint.rpartition('.')[0]
+        if blueprint and blueprint in self.rules:
+            return blueprint, self.rules[blueprint]
+        return None, None
+
+    def check(self):
+        """ before_request hook: returns a 429 response, or None to let the request through. """
+        if not self.enabled or request.endpoint is None or request.method == 'OPTIONS':
+            return None
+        scope, rule = self.rule_for(request.endpoint)
+        if rule is None:
+            return None
+        try:
+            allowed, retry_after = self.backend.hit(f'{scope}|{client_key()}', rule)
+        except Exception as e:
+            print(f"Rate limiter error, letting the request through: {e}")
+            return None
+        if allowed:
+            return None
+        self.rejected += 1
+        retry_after = max(math.ceil(retry_after), 1)
+        response = jsonify({"message": f"Too many requests. Please try again in {retry_after} seconds."})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+
+
+def client_key():
+    """ 'user:<id>' for a request with a valid JWT, else 'ip:<address>'. """
+    from flask_jwt_extended import decode_token
+
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        try:
+            # Signature and expiry only: no blocklist or user lookup, so no database work
+            return f"user:{decode_token(auth_header[7:])['sub']}"
+        except Exception:
+            pass # Invalid or expired: the view will reject it; limit by address meanwhile
+    return f"ip:{request.remote_addr}"
+
+
+def get_rate_limiter():
+    return current_app.extensions['rate_limiter']
+
+
+def init_app(app):
+    backend_name = app.config.get('RATELIMIT_BACKEND', 'sqlite')
+    if backend_name == 'sqlite':
+        backend = SQLiteBackend(app.config.get('RATELIMIT_SQLITE_PATH') or
+                                os.path.join(app.instance_path, 'ratelimit.sqlite'))
+    elif backend_name == 'memory':
+        backend = MemoryBackend()
+    else:
+        raise ValueError(f"Unknown RATELIMIT_BACKEND {backend_name!r}; use 'memory' or 'sqlite'.")
+    limiter = RateLimiter(backend, app.config.get('RATELIMITS', {}), enabled=app.config.get('RATELIMIT_ENABLED', True))
+    app.extensions['rate_limiter'] = limiter
+    app.before_request(limiter.check)
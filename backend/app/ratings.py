@@ -0,0 +1,66 @@
+"""
+Review aggregates kept on Property.
+
+rating_sum, rating_count and one counter per star (rating_1 .. rating_5) are updated in
+the same transaction that inserts a review, with a single UPDATE that increments them in
+SQL, so concurrent reviews cannot lose each other's counts. rating_avg is stored too so
+that sort=rating can walk an index. rebuild_all() recomputes everything from the review
+table and is the repair path if the counters ever drift.
+"""
+from sqlalchemy import func
+
+from . import db
+from .models import Property, Review
+
+STARS = range(1, 6)
+
+
+def star_column(rating):
+    return getattr(Property, f'rating_{rating}')
+
+
+def record_review(property_id, rating):
+    """ Adds one rating to the property's aggregates. Call before committing the new review. """
+    star = star_column(rating)
+    Property.query.filter_by(id=property_id).update({
+        Property.rating_sum: Property.rating_sum + rating,
+        Property.rating_count: Property.rating_count + 1,
+        star: star + 1,
+        # The right-hand side sees the old values, so this is the average after the insert
+        Property.rating_avg: (Property.rating_sum + rating) * 1.0 / (Property.rating_count + 1),
+    }, synchronize_session=False)
+
+
+def rebuild_all(batch_size=500):
+    """ Recomputes the aggregates of every property from its reviews; returns how many were processed. """
+    processed = 0
+    last_id = 0
+    while True:
+        ids = [row.id for row in db.session.query(Property.id).filter(Property.id > last_id)
+               .order_by(Property.id).limit(batch_size)]
+        if not ids:
+            return processed
+
+        counts = {} # property_id -> {rating: count}
+        rows = db.session.query(Review.property_id, Review.rating, func.count(Review.id)) \
+            .filter(Review.property_id.in_(ids)).group_by(Review.property_id, Review.rating)
+        for property_id, rating, count in rows:
+            counts.setdefault(property_id, {})[rating] = count
+
+        for property_id in ids:
+            stars = counts.get(property_id, {})
+            total = sum(stars.values())
+            rating_sum = sum(rating * count for rating, count in stars.items())
+            values = {
+                Property.rating_count: total,
+                Property.rating_sum: rating_sum,
+                Property.rating_avg: rating_sum / total if total else 0,
+                # A repair is not an edit: leave the listing's updated_at alone
+                Property.updated_at: Property.updated_at,
+            }
+            for star in STARS:
+                values[star_column(star)] = stars.get(star, 0)
+            Property.query.filter_by(id=property_id).update(values, synchronize_session=False)
+        db.session.commit()
+        processed += len(ids)
+        last_id = ids[-1]
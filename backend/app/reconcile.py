@@ -0,0 +1,174 @@
+"""
+Payment reconciliation: `flask reconcile-payments`.
+
+A booking that holds a paystack_reference but is not marked paid has either not been paid,
+or its webhook was lost. This job asks Paystack's verify endpoint about every such booking
+and applies the successful charges exactly as the webhook processor would
+(webhooks.apply_charge_success).
+
+Bookings are walked in id order, `batch_size` at a time. Each batch is verified
+concurrently on a bounded thread pool, throttled to `rate` calls per second across all
+threads, using the pooled Paystack client from app/paystack.py. No transaction is open
+during these calls. The batch's results are then applied in one transaction. Bookings the
+webhook marked paid while the batch was being verified are skipped there, without taking
+their property lock. After every committed batch, the last booking id is written to a
+checkpoint file, so an interrupted run resumes where it stopped instead of starting over.
+If the gateway becomes unavailable mid-batch, what was verified is still applied, the
+checkpoint stops before the first unverified booking, and the run ends with an error so it
+can be resumed later.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+from . import db, events
+from .models import Booking
+from .paystack import GatewayUnavailable, PaystackError, get_paystack
+from .webhooks import apply_charge_success
+
+COUNTERS = ('checked', 'paid', 'already_paid', 'not_paid', 'not_found', 'mismatched', 'errors')
+
+
+class RateLimiter:
+    """ Spaces calls at least 1/rate seconds apart across threads (rate <= 0: unlimited). """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class GatewayDown(Exception):
+    """ Paystack stopped answering; the checkpoint is saved and the run can be resumed. """
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, state):
+    partial = f'{path}.part'
+    with open(partial, 'w') as f:
+        json.dump(state, f)
+    os.replace(partial, path) # Atomic: a crash never leaves a half-written checkpoint
+
+
+def _verify(client, limiter, reference):
+    """ Returns ('ok', data), ('not_found', message), ('error', message) or ('unavailable', message). """
+    limiter.wait()
+    try:
+        return 'ok', client.verify_transaction(reference)
+    except GatewayUnavailable as e:
+        return 'unavailable', str(e)
+    except PaystackError as e:
+        if e.status_code in (400, 404):
+            return 'not_found', str(e) # Paystack never saw this reference (checkout not started)
+        return 'error', str(e)
+
+
+def _apply(results, totals):
+    """ Applies one batch of verify results in a single transaction. """
+    changed = []
+    # Paid since the batch was read (usually by the webhook): skip them without taking their property lock
+    successes = [booking_id for booking_id, _, (outcome, data) in results if outcome == 'ok' and data.get('status') == 'success']
+    paid_meanwhile = {booking_id for booking_id, in db.session.query(Booking.id).filter(
+        Booking.id.in_(successes), Booking.payment_status == 'paid')} if successes else set()
+    for booking_id, reference, (outcome, data) in results:
+        totals['checked'] += 1
+        if outcome in ('not_found', 'error'):
+            totals[outcome if outcome == 'not_found' else 'errors'] += 1
+            if outcome == 'error':
+                print(f"Reconcile: could not verify booking {booking_id} ({reference}): {data}")
+            continue
+        if data.get('status') != 'success':
+            totals['not_paid'] += 1 # abandoned, failed, ongoing...
+            continue
+        if booking_id in paid_meanwhile:
+            totals['already_paid'] += 1
+            continue
+        status, note, change = apply_charge_success(dict(data, reference=reference))
+        if change:
+            totals['paid'] += 1
+            changed.append(change)
+            print(f"Reconcile: {note} ({reference}).")
+        elif status == 'done':
+            totals['already_paid'] += 1 # The webhook got there first
+        else:
+            totals['mismatched'] += 1
+            print(f"Reconcile: booking {booking_id} ({reference}) not updated: {note}.")
+    db.session.commit()
+    for booking, previous_status in changed:
+        events.booking_status_changed(booking, previous_status)
+
+
+def reconcile_payments(checkpoint_path, batch_size=500, concurrency=8, rate=20, resume=True, max_batches=None):
+    """
+    Verifies every unpaid booking that has a Paystack reference and applies the paid ones.
+    Returns the totals (including 'last_id' and 'batches'). Raises GatewayDown if Paystack
+    stops answering. max_batches stops early (after checkpointing), like an interruption;
+    a finished run's checkpoint is ignored by the next one.
+    """
+    state = load_checkpoint(checkpoint_path) if resume else None
+    if state is None or state.get('finished'):
+        # Only bookings that exist now: a run must end even while new payments keep arriving
+        max_id = db.session.query(func.max(Booking.id)).scalar() or 0
+        state = {'last_id': 0, 'max_id': max_id, 'batches': 0, **{name: 0 for name in COUNTERS}}
+        save_checkpoint(checkpoint_path, state)
+    db.session.rollback()
+
+    client = get_paystack()
+    limiter = RateLimiter(rate)
+    run_batches = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as pool:
+        while max_batches is None or run_batches < max_batches:
+            rows = db.session.query(Booking.id, Booking.paystack_reference).filter(
+                Booking.id > state['last_id'],
+                Booking.id <= state['max_id'],
+                Booking.paystack_reference.isnot(None),
+                Booking.payment_status != 'paid',
+            ).order_by(Booking.id).limit(batch_size).all()
+            db.session.rollback() # No transaction open while waiting on Paystack
+            if not rows:
+                state['finished'] = True # The next run starts over with the bookings that exist then
+                save_checkpoint(checkpoint_path, state)
+                break
+
+            verified = list(pool.map(lambda row: _verify(client, limiter, row.paystack_reference), rows))
+            results = [(row.id, row.paystack_reference, result) for row, result in zip(rows, verified)]
+            unavailable = next((i for i, (_, _, (outcome, _)) in enumerate(results) if outcome == 'unavailable'), None)
+            if unavailable is not None:
+                results = results[:unavailable] # Apply what came before; resume from the first gap
+
+            try:
+                _apply(results, state)
+            except Exception:
+                db.session.rollback() # Checkpoint not advanced: this batch is verified again on resume
+                raise
+            if results:
+                state['last_id'] = results[-1][0]
+            state['batches'] += 1
+            save_checkpoint(checkpoint_path, state)
+            run_batches += 1
+
+            if unavailable is not None:
+                raise GatewayDown(f"Paystack is unavailable; stopped after booking {state['last_id']}. "
+                                  f"Run again to resume.")
+    return state
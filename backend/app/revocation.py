@@ -0,0 +1,174 @@
+"""
+JWT revocation: logout and logout from all devices.
+
+Two kinds of revocation are stored in the database:
+
+- POST /api/auth/logout revokes the presented token by inserting its jti into the
+  revoked_token table. The row is kept until the token would have expired anyway, and
+  `flask prune-revoked-tokens` deletes expired rows.
+- POST /api/auth/logout-all sets user.tokens_valid_after to now. One write revokes every
+  token issued to the user before that moment. Tokens carry an `iat_ms` claim, so a login
+  right after logout-all is not caught by it.
+
+Flask-JWT-Extended asks is_token_revoked() about every token. Answering that must not
+cost a query per request, because almost no token is revoked. So each worker keeps a
+RevocationList in memory: a hash set of revoked jtis and a dict of per-user watermarks,
+loaded once and then topped up with the rows written since the last sync, at most every
+REVOCATION_SYNC_INTERVAL seconds. A revocation takes effect at once in the worker that
+made it, and within the sync interval in the others.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, jsonify
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import RevokedToken, User
+
+# Re-read this far back on every sync, so a row whose transaction committed after the
+# previous sync started (with an older revoked_at) is not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None) # Stored naive, like the columns
+
+
+def _epoch_ms(naive_utc):
+    return int(naive_utc.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def issued_ms(jwt_data):
+    """ When the token was issued, in ms; tokens from before the iat_ms claim fall back to iat. """
+    return jwt_data.get('iat_ms', jwt_data.get('iat', 0) * 1000)
+
+
+class RevocationList:
+    def __init__(self, sync_interval=5, watermark_lifetime=timedelta(days=30)):
+        self.sync_interval = sync_interval
+        self.watermark_lifetime = watermark_lifetime # Tokens older than this are expired anyway
+        self.jtis = {} # jti -> expiry (epoch seconds)
+        self.watermarks = {} # user id -> tokens_valid_after (epoch ms)
+        self.synced_since = None # Naive UTC start of the last successful sync
+        self._next_sync = 0
+        self._lock = threading.Lock()
+
+    def sync(self, force=False):
+        """ Loads revocations written since the last sync (all of them the first time). """
+        if not force and time.monotonic() < self._next_sync:
+            return
+        with self._lock:
+            if not force and time.monotonic() < self._next_sync:
+                return # Another thread synced while we waited
+            started = _utcnow()
+            tokens = db.session.query(RevokedToken.jti, RevokedToken.expires_at).filter(RevokedToken.expires_at > started)
+            users = db.session.query(User.id, User.tokens_valid_after).filter(User.tokens_valid_after.isnot(None))
+            if self.synced_since is not None:
+                tokens = tokens.filter(RevokedToken.revoked_at >= self.synced_since - SYNC_OVERLAP)
+                users = users.filter(User.tokens_valid_after >= self.synced_since - SYNC_OVERLAP)
+            try:
+                token_rows, user_rows = tokens.all(), users.all()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Token revocation sync failed, keeping the previous list: {e}")
+                self._next_sync = time.monotonic() + self.sync_interval
+                return
+            for jti, expires_at in token_rows:
+                self.jtis[jti] = _epoch_ms(expires_at) / 1000
+            for user_id, valid_after in user_rows:
+                self.watermarks[user_id] = max(self.watermarks.get(user_id, 0), _epoch_ms(valid_after))
+            self._forget_expired()
+            self.synced_since = started
+            self._next_sync = time.monotonic() + self.sync_interval
+
+    def _forget_expired(self):
+        now = time.time()
+        for jti in [jti for jti, expires in self.jtis.items() if expires <= now]:
+            del self.jtis[jti]
+        oldest = (now - self.watermark_lifetime.total_seconds()) * 1000
+        for user_id in [user_id for user_id, ms in self.watermarks.items() if ms < oldest]:
+            del self.watermarks[user_id]
+
+    def add(self, jti, expires):
+        with self._lock:
+            self.jtis[jti] = expires
+
+    def set_watermark(self, user_id, ms):
+        with self._lock:
+            self.watermarks[user_id] = max(self.watermarks.get(user_id, 0), ms)
+
+    def is_revoked(self, jwt_data):
+        if jwt_data['jti'] in self.jtis:
+            return True
+        try:
+            watermark = self.watermarks.get(int(jwt_data['sub']))
+        except (KeyError, ValueError, TypeError):
+            return False
+        return watermark is not None and issued_ms(jwt_data) <= watermark
+
+    def stats(self):
+        return {'revoked_jtis': len(self.jtis), 'user_watermarks': len(self.watermarks),
+                'sync_interval_seconds': self.sync_interval}
+
+
+def get_revocation_list():
+    return current_app.extensions['revocation_list']
+
+
+def is_token_revoked(jwt_header, jwt_data):
+    """ token_in_blocklist_loader: in-memory lookups only, apart from the periodic sync. """
+    revocations = get_revocation_list()
+    revocations.sync()
+    return revocations.is_revoked(jwt_data)
+
+
+# --- Writes ---
+def revoke_token(jwt_data):
+    """ Revokes one token (the decoded JWT) and commits. """
+    jti = jwt_data['jti']
+    expires_at = datetime.fromtimestamp(jwt_data['exp'], timezone.utc).replace(tzinfo=None)
+    if db.session.get(RevokedToken, jti) is None:
+        db.session.add(RevokedToken(jti=jti, user_id=int(jwt_data['sub']), token_type=jwt_data.get('type', 'access'),
+                                    expires_at=expires_at, revoked_at=_utcnow()))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback() # Revoked concurrently by another request
+    get_revocation_list().add(jti, jwt_data['exp'])
+
+
+def revoke_all(user_id):
+    """ Revokes every token issued to the user until now and commits. """
+    now = _utcnow()
+    User.query.filter_by(id=user_id).update({User.tokens_valid_after: now}, synchronize_session=False)
+    db.session.commit()
+    get_revocation_list().set_watermark(user_id, _epoch_ms(now))
+
+
+def prune():
+    """ Deletes revoked tokens that have expired and watermarks older than any live token; returns counts. """
+    now = _utcnow()
+    tokens = RevokedToken.query.filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+    lifetime = current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
+    watermarks = User.query.filter(User.tokens_valid_after < now - lifetime) \
+        .update({User.tokens_valid_after: None}, synchronize_session=False)
+    db.session.commit()
+    return tokens, watermarks
+
+
+def init_app(app, jwt):
+    app.extensions['revocation_list'] = RevocationList(
+        sync_interval=app.config.get('REVOCATION_SYNC_INTERVAL', 5),
+        watermark_lifetime=app.config.get('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30)),
+    )
+    jwt.token_in_blocklist_loader(is_token_revoked)
+
+    @jwt.additional_claims_loader
+    def add_issued_ms(identity):
+        return {'iat_ms': int(time.time() * 1000)}
+
+    @jwt.revoked_token_loader
+    def token_revoked(jwt_header, jwt_data):
+        return jsonify({"message": "Token has been revoked. Please log in again."}), 401
@@ -0,0 +1,219 @@
+"""
+Daily booking rollups for host analytics.
+
+Each booking contributes to property_daily_stats according to its current status and
+payment status: one booked night (and its nightly share of the price) on every night of a
+confirmed stay, plus a per-status booking count and the lead time on its check-in day.
+When a booking changes, record_booking_change() applies the difference between its old
+and new contribution as a single upsert, in the same transaction as the booking update.
+So the analytics endpoint reads at most one row per property per day instead of
+scanning bookings. rebuild_all() recomputes the table from the bookings, one property at
+a time, while bookings keep changing.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import func
+
+from . import db
+from .models import Booking, Property, PropertyDailyStats
+
+COUNTERS = ('booked_nights', 'revenue', 'paid_revenue', 'pending_count', 'confirmed_count',
+            'cancelled_count', 'lead_time_days')
+STATUS_COUNTERS = {'pending': 'pending_count', 'confirmed': 'confirmed_count', 'cancelled': 'cancelled_count'}
+MAX_RANGE_DAYS = 366
+
+
+def contribution(check_in, check_out, total_price, created_at, status, payment_status):
+    """ What one booking in the given state adds to the rollup: {day: {counter: delta}}. """
+    deltas = {}
+    if status is None:
+        return deltas
+    if status == 'confirmed':
+        nights = (check_out - check_in).days
+        nightly = total_price / nights if nights > 0 else 0
+        for i in range(nights):
+            night = deltas.setdefault(check_in + timedelta(days=i), {})
+            night['booked_nights'] = 1
+            night['revenue'] = nightly
+            if payment_status == 'paid':
+                night['paid_revenue'] = nightly
+    counter = STATUS_COUNTERS.get(status)
+    if counter:
+        first_day = deltas.setdefault(check_in, {})
+        first_day[counter] = 1
+        if status == 'confirmed' and created_at:
+            first_day['lead_time_days'] = max((check_in - created_at.date()).days, 0)
+    return deltas
+
+
+def _net(old, new):
+    """ new - old, dropping days where nothing changed. """
+    net = {}
+    for day in old.keys() | new.keys():
+        changes = {}
+        for name in COUNTERS:
+            delta = new.get(day, {}).get(name, 0) - old.get(day, {}).get(name, 0)
+            if delta:
+                changes[name] = delta
+        if changes:
+            net[day] = changes
+    return net
+
+
+def _upsert(property_id, deltas):
+    """ Adds deltas to the property's rows, creating missing days. One statement on SQLite/PostgreSQL. """
+    if not deltas:
+        return
+    rows = [dict({name: 0 for name in COUNTERS}, property_id=property_id, day=day, **changes)
+            for day, changes in sorted(deltas.items())]
+    table = PropertyDailyStats.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['property_id', 'day'],
+            set_={name: table.c[name] + stmt.excluded[name] for name in COUNTERS}
+        )
+        db.session.execute(stmt)
+        return
+    # Other databases: update, then insert the days that did not exist yet
+    for row in rows:
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.property_id == property_id, table.c.day == row['day'])
+            .values({name: table.c[name] + row[name] for name in COUNTERS})
+        )
+        if not updated.rowcount:
+            db.session.execute(table.insert().values(row))
+
+
+def record_booking_change(booking, previous_status=None, previous_payment_status=None):
+    """
+    Moves the booking's contribution from its previous state to its current one. Call
+    before committing the change; previous_status=None means the booking is new.
+    """
+    if previous_status is not None and previous_payment_status is None:
+        previous_payment_status = booking.payment_status
+    args = (booking.check_in_date, booking.check_out_date, booking.total_price, booking.created_at)
+    old = contribution(*args, previous_status, previous_payment_status)
+    new = contribution(*args, booking.status, booking.payment_status)
+    _upsert(booking.property_id, _net(old, new))
+
+
+def _lock_property(property_id):
+    """ Takes the property's booking lock (row lock on PostgreSQL; SQLite's write lock is taken by the delete). """
+    return db.session.query(Property.id).filter_by(id=property_id).with_for_update().first() is not None
+
+
+def rebuild_property(property_id):
+    """
+    Recomputes one property's rollup rows in a single transaction and commits; returns how
+    many bookings were read. Booking writers take the same property lock, so a change
+    either lands before the bookings are read here (and is counted once, by the rebuild)
+    or waits and applies its delta on top of the rebuilt rows. Readers see the old rows
+    until the commit, never a partly rebuilt property.
+    """
+    try:
+        if not _lock_property(property_id):
+            db.session.rollback()
+            return 0 # Deleted meanwhile; its rows went with it
+        PropertyDailyStats.query.filter_by(property_id=property_id).delete(synchronize_session=False)
+        totals = {} # day -> {counter: value}
+        processed = 0
+        bookings = db.session.query(
+            Booking.check_in_date, Booking.check_out_date, Booking.total_price,
+            Booking.created_at, Booking.status, Booking.payment_status
+        ).filter(Booking.property_id == property_id).yield_per(1000)
+        for state in bookings:
+            for day, changes in contribution(*state).items():
+                row = totals.setdefault(day, {})
+                for name, delta in changes.items():
+                    row[name] = row.get(name, 0) + delta
+            processed += 1
+        _upsert(property_id, totals)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return processed
+
+
+def rebuild_all(batch_size=200):
+    """ Recomputes the rollup table from the booking table, one property per transaction; returns bookings read. """
+    processed = 0
+    last_id = 0
+    while True:
+        property_ids = [row.id for row in db.session.query(Property.id).filter(Property.id > last_id)
+                        .order_by(Property.id).limit(batch_size)]
+        db.session.commit() # Each property below gets a transaction of its own
+        if not property_ids:
+            break
+        for property_id in property_ids:
+            processed += rebuild_property(property_id)
+        last_id = property_ids[-1]
+    # Rows of properties deleted outside the ORM cascade
+    PropertyDailyStats.query.filter(~PropertyDailyStats.property_id.in_(db.session.query(Property.id))) \
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return processed
+
+
+# --- Reading ---
+def host_analytics(host_id, start, end):
+    """
+    Per-property analytics for the host over the nights [start, end). Reads only rollup rows,
+    at most one per property per day in the range.
+    """
+    days_in_range = (end - start).days
+    properties = db.session.query(Property.id, Property.title) \
+        .filter(Property.host_id == host_id).order_by(Property.id).all()
+    sums = {
+        row.property_id: row for row in db.session.query(
+            PropertyDailyStats.property_id,
+            *[func.sum(getattr(PropertyDailyStats, name)).label(name) for name in COUNTERS]
+        ).join(Property, Property.id == PropertyDailyStats.property_id).filter(
+            Property.host_id == host_id,
+            PropertyDailyStats.day >= start,
+            PropertyDailyStats.day < end
+        ).group_by(PropertyDailyStats.property_id)
+    }
+
+    def summarize(values, nights_available):
+        booked = values['booked_nights']
+        return {
+            'nights_available': nights_available,
+            'booked_nights': booked,
+            'occupancy_rate': round(booked / nights_available, 4) if nights_available else None,
+            'revenue': round(values['revenue'], 2),
+            'paid_revenue': round(values['paid_revenue'], 2),
+            'average_daily_rate': round(values['revenue'] / booked, 2) if booked else None,
+            'average_lead_time_days': round(values['lead_time_days'] / values['confirmed_count'], 1)
+                                      if values['confirmed_count'] else None,
+            'bookings': {status: values[counter] for status, counter in STATUS_COUNTERS.items()},
+        }
+
+    items = []
+    overall = {name: 0 for name in COUNTERS}
+    for property_id, title in properties:
+        row = sums.get(property_id)
+        values = {name: (getattr(row, name) or 0) if row else 0 for name in COUNTERS}
+        for name in COUNTERS:
+            overall[name] += values[name]
+        items.append(dict(summarize(values, days_in_range), property_id=property_id, title=title))
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'properties': items,
+        'totals': summarize(overall, days_in_range * len(properties)),
+    }
+
+
+def default_range(today=None):
+    """ The last 30 nights, today included. """
+    end = (today or date.today()) + timedelta(days=1)
+    return end - timedelta(days=30), end
@@ -1,80 +1,132 @@
-import cloudinary
-import cloudinary.uploader
-from flask import Blueprint, jsonify, abort, request
+from flask import Blueprint, jsonify, abort, request, stream_with_context, send_from_directory
 from .models import Property, Booking, User, Review # Import your Property model
 from . import db # Import the db instance if needed for complex queries, though not strictly necessary here
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date # Import datetime, date
-import requests # Add requests
+from flask_jwt_extended import jwt_required, current_user
+from datetime import datetime, date, timedelta # Import datetime, date
 from flask import current_app # To access config variables
 import time # For unique reference timestamp
 import hmac # For signature verification
 import hashlib # For signature verification
 import json # For parsing raw body
+import csv # For the listings export
+import io
 from sqlalchemy import Text
-from sqlalchemy import and_
+from sqlalchemy import and_, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, joinedload
+from .pagination import get_page_args, keyset_paginate
+from .availability import get_availability_index
+from .geo import get_geo_args, filter_bbox, filter_radius, distance_km
+from .amenities import AMENITY, POWER_BACKUP, parse_tag_list, filter_by_tags, sync_property_tags
+from .search import apply_text_search
+from .search_cache import get_search_cache, cache_key, entry_meta
+from .identity import get_user_cache
+from .ratings import record_review
+from . import rollups
+from . import events
+from .http_cache import make_etag, not_modified, json_with_etag
+from .query_budget import query_budget
+from .storage import UploadError, allowed_file, get_media_storage, thumbnail_entry
+from . import media_jobs, webhooks
+from .paystack import GatewayUnavailable, PaystackError, get_paystack
 
 
 # Create a Blueprint for API routes
 # The first argument is the blueprint's name, the second is its import name
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-# --- Property Routes ---
+# Keyset sort orders for paginated lists: (column, how to read it off the last row).
+# The trailing id makes every key unique so pages never overlap or skip rows.
+PROPERTY_SORT_KEYS = [
+    (Property.created_at, lambda p: p.created_at),
+    (Property.id, lambda p: p.id),
+]
+RATING_SORT_KEYS = [ # sort=rating: best rated first, unrated (0) last
+    (Property.rating_avg, lambda p: p.rating_avg),
+    (Property.id, lambda p: p.id),
+]
+BOOKING_SORT_KEYS = [
+    (Booking.check_in_date, lambda b: b.check_in_date),
+    (Booking.id, lambda b: b.id),
+]
+
+def get_property_fields(default='card'):
+    """ Reads ?fields= (a profile like "card"/"full" or a comma list), aborting with 400 on unknown names. """
+    try:
+        return Property.resolve_fields(request.args.get('fields') or default)
+    except ValueError as e:
+        abort(400, description=str(e))
 
-@api_bp.route('/properties', methods=['GET'])
-def get_properties():
+
+def apply_property_filters(query, bbox=None, near=None):
     """
-    Gets a list of properties, optionally filtered by query parameters, including date availability.
+    Applies the search filters in request.args (text, location, tags, numbers, dates) to a
+    Property query. Shared by the paginated list and the export. Returns (query, extra_columns),
+    where extra_columns maps a label to a SQL expression to return alongside each Property.
     """
+    extra_columns = {}
+
+    # --- Apply Location Filters (index on latitude, longitude) ---
+    if bbox:
+        query = filter_bbox(query, bbox)
+    if near:
+        query, extra_columns['distance_sq'] = filter_radius(query, *near)
+
+    # --- Apply Full-Text / City / State Filters (FTS5 or tsvector + pg_trgm) ---
+    query, rank = apply_text_search(
+        query, request.args.get('q'), request.args.get('city'), request.args.get('state')
+    )
+    if rank is not None:
+        extra_columns['rank'] = rank
+
+    # --- Apply Amenity / Power Backup Filters (tag index) ---
+    query = filter_by_tags(query, AMENITY, parse_tag_list(request.args.get('amenities')))
+    query = filter_by_tags(query, POWER_BACKUP, parse_tag_list(request.args.get('power_backup')))
+
+    # --- Apply Numeric Filters ---
     try:
-        query = Property.query
-
-        # --- Apply Text/Numeric Filters (as before) ---
-        city = request.args.get('city')
-        state = request.args.get('state')
-        # ... (min_price, max_price, min_bedrooms, min_guests filtering logic - keep as is) ...
-        if city:
-            query = query.filter(Property.city.ilike(f'%{city}%'))
-        if state:
-            query = query.filter(Property.state.ilike(f'%{state}%'))
-        # ... (handle numeric filters with try-except block) ...
-        try:
-            min_price_str = request.args.get('min_price')
-            max_price_str = request.args.get('max_price')
-            min_bedrooms_str = request.args.get('min_bedrooms')
-            min_guests_str = request.args.get('min_guests')
-
-            if min_price_str:
-                min_price = float(min_price_str)
-                if min_price >= 0: query = query.filter(Property.price_per_night >= min_price)
-            if max_price_str:
-                max_price = float(max_price_str)
-                if max_price >= 0: query = query.filter(Property.price_per_night <= max_price)
-            if min_bedrooms_str:
-                min_bedrooms = int(min_bedrooms_str)
-                if min_bedrooms > 0: query = query.filter(Property.num_bedrooms >= min_bedrooms)
-            if min_guests_str:
-                min_guests = int(min_guests_str)
-                if min_guests > 0: query = query.filter(Property.max_guests >= min_guests)
-        except (ValueError, TypeError):
-             print(f"Warning: Invalid numeric filter parameter received.")
-             # Decide: ignore or abort(400)
-
-
-        # --- NEW: Apply Date Availability Filter ---
-        check_in_str = request.args.get('check_in') # Use 'check_in' and 'check_out'
-        check_out_str = request.args.get('check_out')
-
-        if check_in_str and check_out_str:
-            try:
-                # Parse dates
-                requested_checkin = datetime.strptime(check_in_str, '%Y-%m-%d').date()
-                requested_checkout = datetime.strptime(check_out_str, '%Y-%m-%d').date()
+        min_price_str = request.args.get('min_price')
+        max_price_str = request.args.get('max_price')
+        min_bedrooms_str = request.args.get('min_bedrooms')
+        min_guests_str = request.args.get('min_guests')
+
+        if min_price_str:
+            min_price = float(min_price_str)
+            if min_price >= 0: query = query.filter(Property.price_per_night >= min_price)
+        if max_price_str:
+            max_price = float(max_price_str)
+            if max_price >= 0: query = query.filter(Property.price_per_night <= max_price)
+        if min_bedrooms_str:
+            min_bedrooms = int(min_bedrooms_str)
+            if min_bedrooms > 0: query = query.filter(Property.num_bedrooms >= min_bedrooms)
+        if min_guests_str:
+            min_guests = int(min_guests_str)
+            if min_guests > 0: query = query.filter(Property.max_guests >= min_guests)
+    except (ValueError, TypeError):
+         print(f"Warning: Invalid numeric filter parameter received.")
+         # Decide: ignore or abort(400)
 
-                if requested_checkout <= requested_checkin:
-                     raise ValueError("Check-out date must be after check-in date.")
 
-                # Find property IDs that have a CONFLICTING confirmed booking
+    # --- NEW: Apply Date Availability Filter ---
+    check_in_str = request.args.get('check_in') # Use 'check_in' and 'check_out'
+    check_out_str = request.args.get('check_out')
+
+    if check_in_str and check_out_str:
+        try:
+            # Parse dates
+            requested_checkin = datetime.strptime(check_in_str, '%Y-%m-%d').date()
+            requested_checkout = datetime.strptime(check_out_str, '%Y-%m-%d').date()
+
+            if requested_checkout <= requested_checkin:
+                 raise ValueError("Check-out date must be after check-in date.")
+
+            # Properties with a booked night in the range come from the in-memory bitmap index
+            booked_ids = get_availability_index().booked_property_ids(requested_checkin, requested_checkout)
+            if booked_ids is not None:
+                if booked_ids:
+                    query = query.filter(Property.id.notin_(booked_ids)) # At most AVAILABILITY_MAX_EXCLUDED ids
+            else:
+                # Index not built, outside its horizon or too many booked: find CONFLICTING confirmed bookings in SQL
                 # Overlap: (ExistingStart < RequestedEnd) AND (ExistingEnd > RequestedStart)
                 conflicting_prop_ids_subquery = db.session.query(Booking.property_id).filter(
                     Booking.status == 'confirmed',
@@ -87,18 +139,92 @@ def get_properties():
                     db.select(conflicting_prop_ids_subquery.c.property_id)
                 ))
 
-            except ValueError as e:
-                print(f"Warning: Invalid date format or range: {e}")
-                # Optionally abort(400, description=f"Invalid date format or range: {e}")
-            except Exception as e:
-                 print(f"Error during date filtering: {e}") # Log other potential errors
+        except ValueError as e:
+            print(f"Warning: Invalid date format or range: {e}")
+            # Optionally abort(400, description=f"Invalid date format or range: {e}")
+        except Exception as e:
+             print(f"Error during date filtering: {e}") # Log other potential errors
 
+    return query, extra_columns
 
-        # --- Execute Query ---
-        properties = query.order_by(Property.created_at.desc()).all()
-        properties_list = [prop.to_dict() for prop in properties]
-        return jsonify(properties_list)
 
+# --- Property Routes ---
+
+@api_bp.route('/properties', methods=['GET'])
+def get_properties():
+    """
+    Gets a page of properties, optionally filtered by query parameters, including free text (q=),
+    date availability, location (bbox=min_lng,min_lat,max_lng,max_lat or near=lat,lng&radius_km=)
+    and tags (amenities=WiFi,Pool and power_backup=generator,solar, both meaning "has all of").
+    Ordered by relevance when q= is given, otherwise newest first; sort=distance (with near=),
+    sort=rating or sort=newest override that. Pass the returned next_cursor back as ?cursor= to get the
+    following page. fields= picks the returned fields (default: the "card" profile).
+    """
+    limit, cursor = get_page_args()
+    fields = get_property_fields()
+    bbox, near = get_geo_args()
+    sort = request.args.get('sort')
+    if sort == 'distance' and not near:
+        abort(400, description="sort=distance requires near=lat,lng.")
+
+    # --- Serve repeated searches from the response cache ---
+    search_cache = get_search_cache()
+    key = cache_key(request.args)
+    cached_body = search_cache.get(key)
+    if cached_body is not None:
+        response = current_app.response_class(cached_body, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    try:
+        # The keyset columns are loaded even when not requested: the cursor is built from them
+        query = Property.query.options(load_only(
+            *Property.load_only_columns(fields), Property.created_at, Property.rating_avg
+        ))
+        query, extra_columns = apply_property_filters(query, bbox, near)
+
+        # --- Choose Ordering ---
+        property_sort_keys = PROPERTY_SORT_KEYS # Newest first
+        if sort == 'distance':
+            order_by = 'distance_sq'
+        elif sort == 'rating':
+            order_by, property_sort_keys = None, RATING_SORT_KEYS
+        elif 'rank' in extra_columns and sort != 'newest':
+            order_by = 'rank'
+        else:
+            order_by = None
+
+        # --- Execute Query (one page) ---
+        if not extra_columns:
+            properties, next_cursor = keyset_paginate(query, property_sort_keys, limit, cursor)
+            properties_list = [prop.to_dict(fields) for prop in properties]
+        else:
+            # Rows are (Property, *extra_columns) tuples
+            for label, expr in extra_columns.items():
+                query = query.add_columns(expr.label(label))
+            if order_by:
+                sort_keys = [
+                    (extra_columns[order_by], lambda row: getattr(row, order_by), 'asc'),
+                    (Property.id, lambda row: row[0].id, 'asc'),
+                ]
+            else:
+                sort_keys = [(col, lambda row, get=get: get(row[0])) for col, get in property_sort_keys]
+            rows, next_cursor = keyset_paginate(query, sort_keys, limit, cursor)
+            properties_list = []
+            for row in rows:
+                item = row[0].to_dict(fields)
+                if 'distance_sq' in extra_columns:
+                    item['distance_km'] = distance_km(row.distance_sq)
+                properties_list.append(item)
+
+        body = current_app.json.dumps({"items": properties_list, "next_cursor": next_cursor})
+        search_cache.set(key, body, entry_meta(request.args))
+        response = current_app.response_class(body, mimetype='application/json')
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    except ValueError as e: # Raised by keyset_paginate for a bad cursor
+        abort(400, description=str(e))
     except Exception as e:
         # ... (existing error handling) ...
         print(f"Error fetching properties: {e}")
@@ -107,15 +233,113 @@ def get_properties():
         abort(500, description="Internal Server Error")
 
 
+EXPORT_BATCH_SIZE = 500 # Rows fetched per round trip while streaming an export
+
+@api_bp.route('/properties/export', methods=['GET'])
+def export_properties():
+    """
+    Streams every property matching the get_properties filters as NDJSON (default) or CSV
+    (?format=csv), ordered by id. Rows are fetched in batches with yield_per and written out
+    one at a time, so memory use stays flat however many listings match. fields= works as on
+    the list endpoint but defaults to "full".
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        abort(400, description="format must be 'ndjson' or 'csv'.")
+    fields = get_property_fields(default='full')
+    bbox, near = get_geo_args()
+
+    query = Property.query.options(load_only(*Property.load_only_columns(fields)))
+    query, extra_columns = apply_property_filters(query, bbox, near)
+    columns = list(fields)
+    if 'distance_sq' in extra_columns:
+        query = query.add_columns(extra_columns['distance_sq'].label('distance_sq'))
+        columns.append('distance_km')
+    # yield_per streams from a server-side cursor where the driver supports one (psycopg2)
+    query = query.order_by(Property.id.asc()).yield_per(EXPORT_BATCH_SIZE)
+
+    def items():
+        for row in query:
+            if near:
+                item = row[0].to_dict(fields)
+                item['distance_km'] = distance_km(row.distance_sq)
+            else:
+                item = row.to_dict(fields)
+            yield item
+
+    def ndjson_lines():
+        for item in items():
+            yield current_app.json.dumps(item) + '\n'
+
+    def csv_lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        for item in items():
+            for name, value in item.items():
+                if isinstance(value, (list, dict)):
+                    item[name] = json.dumps(value) # Lists (amenities, photos, thumbnails) go in as JSON text
+            writer.writerow(item)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    if export_format == 'csv':
+        body, mimetype = csv_lines(), 'text/csv'
+    else:
+        body, mimetype = ndjson_lines(), 'application/x-ndjson'
+    # stream_with_context keeps the request (and its database session) open while the generator runs
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=properties.{export_format}'
+    return response
+
+
+@api_bp.route('/properties/<int:property_id>/photos', methods=['GET'])
+@jwt_required()
+def get_photo_progress(property_id):
+    """ Background photo processing progress for one of the host's listings. """
+    prop = Property.query.get_or_404(property_id)
+    if prop.host_id != current_user.id:
+        abort(403, description="Forbidden: You do not own this property.")
+    return jsonify(media_jobs.photo_progress(prop))
+
+
+@api_bp.route('/media/<path:name>', methods=['GET'])
+def get_media(name):
+    """ Serves photos stored by the local storage backend (Cloudinary URLs point elsewhere). """
+    return send_from_directory(current_app.config['MEDIA_ROOT'], name, max_age=31536000) # Names are unique; cache forever
+
+
+@api_bp.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """ Hit/miss counters for this worker's search result and current-user caches (hosts only). """
+    if current_user.user_type != 'host':
+        return jsonify({"message": "Access forbidden: User is not a host"}), 403
+    return jsonify({"search": get_search_cache().stats(), "users": get_user_cache().stats()})
+
+
 @api_bp.route('/properties/<int:property_id>', methods=['GET'])
 def get_property(property_id):
     """
     Gets details for a single property by its ID.
+    Supports If-None-Match: a client holding the current ETag gets a 304 without the row being loaded.
     """
     try:
+        if request.if_none_match:
+            # Revalidation: read just the version columns and stop there if nothing changed
+            version = db.session.query(Property.created_at, Property.updated_at).filter_by(id=property_id).first()
+            if version is None:
+                abort(404, description="Property not found")
+            unchanged = not_modified(make_etag('property', property_id, *version))
+            if unchanged:
+                return unchanged
+
         # .get_or_404() is convenient: fetches by primary key or aborts with 404 Not Found
         property_item = Property.query.get_or_404(property_id)
-        return jsonify(property_item.to_dict())
+        etag = make_etag('property', property_id, property_item.created_at, property_item.updated_at)
+        return json_with_etag(property_item.to_dict(), etag)
     except Exception as e:
         # Log the error e
         print(f"Error fetching property {property_id}: {e}")
@@ -130,12 +354,12 @@ def get_property(property_id):
 @api_bp.route('/properties', methods=['POST'])
 @jwt_required()
 def create_property():
-    """ Creates a new property listing, handling image uploads. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-        abort(401, description="Invalid user identity in token.")
+    """
+    Creates a new property listing, handling image uploads. With MEDIA_ASYNC_UPLOADS (the
+    default) photos are queued for background processing and the response is 202 with
+    photos_status "processing"; poll GET /properties/<id>/photos for progress.
+    """
+    current_user_id = current_user.id
 
     # --- IMPORTANT: Get data from request.form and request.files ---
     data = request.form # Text fields come from form data now
@@ -160,8 +384,9 @@ def create_property():
         print(f"Data conversion error: {e}")
         return jsonify({"message": "Invalid data type or value for numeric fields (price, guests, bedrooms, bathrooms)."}), 400
 
-    # --- Image Uploading to Cloudinary ---
-    image_urls = []
+    # --- Image Uploading (Cloudinary or local storage, see app/storage.py) ---
+    assets, uploads, staged = [], [], []
+    process_later = current_app.config.get('MEDIA_ASYNC_UPLOADS', True)
     if not files or len(files) == 0 or files[0].filename == '':
          # Handle case where no files are uploaded, maybe make it required?
          # return jsonify({"message": "At least one image is required for listing_photos"}), 400
@@ -169,36 +394,24 @@ def create_property():
          # Allow creation without photos for now, adjust if photos are mandatory
     else:
         print(f"Received {len(files)} files for upload.")
-        # Define allowed extensions (example)
-        ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
-
-        def allowed_file(filename):
-            return '.' in filename and \
-                   filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
         for file in files:
             if file and allowed_file(file.filename):
-                try:
-                    # Upload to Cloudinary, optionally specify a folder
-                    upload_result = cloudinary.uploader.upload(
-                        file,
-                        folder="shortlet_listings" # Optional: organize uploads in Cloudinary
-                        # You can add transformations here too if needed
-                    )
-                    image_urls.append(upload_result['secure_url']) # Get the HTTPS URL
-                    print(f"Uploaded {file.filename} to {upload_result['secure_url']}")
-                except Exception as e:
-                    print(f"Cloudinary upload error for {file.filename}: {e}")
-                    # Decide: fail entire request or just skip this file?
-                    # Let's fail for now if any upload fails.
-                    return jsonify({"message": f"Image upload failed for {file.filename}: {e}"}), 500
+                uploads.append(file)
             elif file and file.filename != '':
                  print(f"Skipped file with invalid type: {file.filename}")
                  # Optionally return an error for invalid file types
                  # return jsonify({"message": f"Invalid file type: {file.filename}. Allowed: {ALLOWED_EXTENSIONS}"}), 400
+        if not process_later:
+            try:
+                # Uploaded concurrently, skipping photos stored before; if any file fails, the ones that made it are deleted again
+                assets = get_media_storage().upload_all(uploads)
+            except UploadError as e:
+                print(f"Upload error: {e}")
+                return jsonify({"message": str(e)}), 500
 
 
     # --- Create Property in DB ---
+    committed = False
     try:
         # Get amenities - assuming sent as comma-separated string in form data
         amenities_str = data.get('amenities', '')
@@ -219,11 +432,26 @@ def create_property():
             power_backup_details=data.get('power_backup_details', 'None'),
             latitude=float(data['latitude']) if data.get('latitude') else None, # Convert optional lat/lon
             longitude=float(data['longitude']) if data.get('longitude') else None,
-            listing_photos=image_urls # Store the Cloudinary URLs
+            listing_photos=[asset.url for asset in assets], # Store the uploaded image URLs
+            listing_thumbnails=[thumbnail_entry(asset) for asset in assets]
         )
+        sync_property_tags(new_property) # Keep the amenity filter index in step
+        get_media_storage().register(assets) # Lets later uploads of the same photos reuse them
+        if process_later and uploads:
+            staged = media_jobs.enqueue_photos(new_property, uploads) # Spooled to disk, processed by workers
 
         db.session.add(new_property)
         db.session.commit()
+        committed = True # From here on the listing references the photos; never clean them up
+        events.listing_changed((new_property.city, new_property.state))
+
+        if staged:
+            media_jobs.notify()
+            return jsonify({
+                "message": "Property created successfully; photos are processing.",
+                "property": new_property.to_dict(),
+                "photos_status_url": f"/api/properties/{new_property.id}/photos"
+            }), 202
 
         return jsonify({
             "message": "Property created successfully",
@@ -232,6 +460,10 @@ def create_property():
 
     except Exception as e:
         db.session.rollback()
+        if not committed:
+            # Don't leave orphaned photos behind. New assets are this request's own copies, so no other listing uses them
+            get_media_storage().delete_all([asset.asset_id for asset in assets if asset.is_new])
+            media_jobs.discard_staged(staged)
         print(f"Error creating property in DB: {e}")
         import traceback
         traceback.print_exc()
@@ -242,7 +474,7 @@ def create_property():
 @jwt_required()
 def create_booking(property_id):
     """ Creates a new booking request for a specific property. """
-    current_user_id = get_jwt_identity()
+    current_user_id = current_user.id
     data = request.get_json()
 
     if not data:
@@ -272,7 +504,8 @@ def create_booking(property_id):
         return jsonify({"message": "Invalid data format for dates (use YYYY-MM-DD) or number of guests."}), 400
 
     # --- Check Property and Guest Capacity ---
-    property_item = Property.query.get_or_404(property_id) # 404 if property not found
+    # Row lock on PostgreSQL: the rollup rebuild of this property waits for us, or we for it
+    property_item = Property.query.with_for_update().get_or_404(property_id) # 404 if property not found
     if num_guests > property_item.max_guests:
         return jsonify({"message": f"Number of guests ({num_guests}) exceeds property capacity ({property_item.max_guests})"}), 400
 
@@ -308,6 +541,7 @@ def create_booking(property_id):
             payment_status='unpaid' # Default status
         )
         db.session.add(new_booking)
+        rollups.record_booking_change(new_booking)
         db.session.commit()
 
         return jsonify({
@@ -326,14 +560,22 @@ def create_booking(property_id):
 # --- NEW: View My Bookings Route (Guest) ---
 @api_bp.route('/my-bookings', methods=['GET'])
 @jwt_required()
+@query_budget(1)
 def get_my_bookings():
-    """ Gets bookings made by the current logged-in user. """
-    current_user_id = get_jwt_identity()
+    """ Gets a page of bookings made by the current logged-in user. """
+    current_user_id = current_user.id
+    limit, cursor = get_page_args()
     try:
-        bookings = Booking.query.filter_by(guest_id=current_user_id).order_by(Booking.check_in_date.desc()).all()
+        # Load the property summary in the same query instead of one lazy SELECT per booking
+        query = Booking.query.options(
+            joinedload(Booking.property).load_only(Property.id, Property.title, Property.city, Property.state)
+        ).filter_by(guest_id=current_user_id)
+        bookings, next_cursor = keyset_paginate(query, BOOKING_SORT_KEYS, limit, cursor)
         # Include basic property info with each booking
         bookings_list = [b.to_dict(include_property=True) for b in bookings]
-        return jsonify(bookings_list)
+        return jsonify({"items": bookings_list, "next_cursor": next_cursor})
+    except ValueError as e:
+        abort(400, description=str(e))
     except Exception as e:
         print(f"Error fetching user bookings: {e}")
         abort(500, description="Internal Server Error")
@@ -342,19 +584,25 @@ def get_my_bookings():
 # --- NEW: View Host Bookings Route (Host) ---
 @api_bp.route('/host/bookings', methods=['GET'])
 @jwt_required()
+@query_budget(1)
 def get_host_bookings():
-    """ Gets bookings for properties hosted by the current user. """
-    current_user_id = get_jwt_identity()
+    """ Gets a page of bookings for properties hosted by the current user. """
+    current_user_id = current_user.id
+    limit, cursor = get_page_args()
 
     # Optional: Check if user is actually a host (add this later if needed)
-    # current_user = User.query.get(current_user_id)
-    # if not current_user or current_user.user_type != 'host':
+    # if current_user.user_type != 'host':
     #     return jsonify({"message": "Access forbidden: User is not a host"}), 403
 
     try:
-        bookings = Booking.query.join(Property).filter(Property.host_id == current_user_id).order_by(Booking.check_in_date.desc()).all()
+        query = Booking.query.join(Property).filter(Property.host_id == current_user_id).options(
+            joinedload(Booking.guest).load_only(User.id, User.first_name, User.last_name)
+        )
+        bookings, next_cursor = keyset_paginate(query, BOOKING_SORT_KEYS, limit, cursor)
         bookings_list = [b.to_dict(include_guest=True) for b in bookings]
-        return jsonify(bookings_list)
+        return jsonify({"items": bookings_list, "next_cursor": next_cursor})
+    except ValueError as e:
+        abort(400, description=str(e))
     except Exception as e:
         print(f"Error fetching host bookings: {e}")
         import traceback
@@ -362,30 +610,55 @@ def get_host_bookings():
         abort(500, description="Internal Server Error")
 
 
+@api_bp.route('/host/analytics', methods=['GET'])
+@jwt_required()
+def get_host_analytics():
+    """
+    Occupancy, revenue, average daily rate, lead time and booking counts per listing for the
+    nights from ?start= up to (not including) ?end= (YYYY-MM-DD; default the last 30 nights).
+    Served from the daily rollup table, so cost depends on the range, not on booking volume.
+    """
+    current_user_id = current_user.id
+    start, end = rollups.default_range()
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        if request.args.get('end'):
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, description="start and end must be dates in YYYY-MM-DD format.")
+    if end <= start:
+        abort(400, description="end must be after start.")
+    if (end - start).days > rollups.MAX_RANGE_DAYS:
+        abort(400, description=f"The range can be at most {rollups.MAX_RANGE_DAYS} days.")
+
+    return jsonify(rollups.host_analytics(current_user_id, start, end))
+
+
 @api_bp.route('/host/bookings/<int:booking_id>/confirm', methods=['PATCH'])
 @jwt_required()
 def confirm_booking(booking_id):
     """ Confirms a pending booking for one of the host's properties. """
-    current_user_id_str = get_jwt_identity()
+    current_user_id = current_user.id
     try:
         booking = Booking.query.get_or_404(booking_id)
         property_item = Property.query.get(booking.property_id) # Get associated property
 
-        try:
-            current_user_id = int(current_user_id_str)
-        except (ValueError, TypeError):
-             print(f"ERROR: Invalid JWT identity format: {current_user_id_str}")
-             abort(401) # Unauthorized - bad token identity format
-
         # Authorization: Ensure current user owns the property associated with the booking
         if not property_item or property_item.host_id != current_user_id:
             abort(403, description="Forbidden: You do not own the property for this booking.") # 403 Forbidden
 
+        # --- Lock this property's bookings, then re-read the booking under the lock ---
+        # Concurrent confirms/payments for the same property queue here; other properties are unaffected
+        Property.bump_booking_version(booking.property_id)
+        db.session.refresh(booking)
+
         # Check if booking is in a confirmable state
         if booking.status != 'pending':
+            db.session.rollback()
             return jsonify({"message": f"Booking is already {booking.status}, cannot confirm."}), 409 # Conflict
 
-        # --- Optional but recommended: Re-check for conflicts AT THE TIME OF CONFIRMATION ---
+        # --- Re-check for conflicts AT THE TIME OF CONFIRMATION (safe: we hold the property lock) ---
         # Only check against other CONFIRMED bookings now
         conflicting_bookings = Booking.query.filter(
             Booking.property_id == booking.property_id,
@@ -398,18 +671,26 @@ def confirm_booking(booking_id):
         if conflicting_bookings:
             # Maybe automatically cancel this one? Or just report conflict.
             # Let's report conflict for now.
+            db.session.rollback() # Releases the property lock
             return jsonify({"message": "Cannot confirm booking, dates now conflict with another confirmed booking."}), 409
 
         # --- Update Status ---
+        previous_status = booking.status
         booking.status = 'confirmed'
         # Payment status remains 'unpaid' until payment flow
+        rollups.record_booking_change(booking, previous_status)
         db.session.commit()
+        events.booking_status_changed(booking, previous_status)
 
         return jsonify({
             "message": "Booking confirmed successfully.",
             "booking": booking.to_dict(include_guest=True) # Return updated booking
         }), 200
 
+    except IntegrityError:
+        # PostgreSQL's booking_no_overlap exclusion constraint caught an overlap
+        db.session.rollback()
+        return jsonify({"message": "Cannot confirm booking, dates now conflict with another confirmed booking."}), 409
     except Exception as e:
         db.session.rollback()
         print(f"Error confirming booking {booking_id}: {e}")
@@ -426,31 +707,34 @@ def confirm_booking(booking_id):
 @jwt_required()
 def cancel_booking(booking_id):
     """ Cancels a booking for one of the host's properties. """
-    current_user_id_str = get_jwt_identity()
+    current_user_id = current_user.id
     try:
         booking = Booking.query.get_or_404(booking_id)
         property_item = Property.query.get(booking.property_id)
 
-        try:
-            current_user_id = int(current_user_id_str)
-        except (ValueError, TypeError):
-             print(f"ERROR: Invalid JWT identity format: {current_user_id_str}")
-             abort(401) # Unauthorized - bad token identity format
-
         # Authorization check
         if not property_item or property_item.host_id != current_user_id:
             abort(403, description="Forbidden: You do not own the property for this booking.")
 
+        # Lock this property's bookings and re-read the booking, so a concurrent confirm or
+        # cancel cannot interleave with this one
+        Property.bump_booking_version(booking.property_id)
+        db.session.refresh(booking)
+
         # Check if booking is in a cancellable state (e.g., pending or confirmed)
         # Add more complex logic later if needed (e.g., cannot cancel too close to check-in)
         if booking.status not in ['pending', 'confirmed']:
+            db.session.rollback()
             return jsonify({"message": f"Cannot cancel booking with status '{booking.status}'."}), 409
 
         # --- Update Status ---
+        previous_status = booking.status
         booking.status = 'cancelled'
         # Consider what happens to payment status - if paid, maybe trigger refund process later?
         # For now, just update booking status.
+        rollups.record_booking_change(booking, previous_status)
         db.session.commit()
+        events.booking_status_changed(booking, previous_status)
 
         return jsonify({
             "message": "Booking cancelled successfully.",
@@ -471,14 +755,8 @@ def cancel_booking(booking_id):
 @api_bp.route('/bookings/<int:booking_id>/pay', methods=['POST'])
 @jwt_required()
 def initiate_payment(booking_id):
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-         abort(401) # Bad token identity
-
+    current_user_id = current_user.id
     booking = Booking.query.get_or_404(booking_id)
-    user = User.query.get(current_user_id) # Fetch user for email
 
     # Authorization: Only the guest who made the booking can pay
     if booking.guest_id != current_user_id:
@@ -489,58 +767,45 @@ def initiate_payment(booking_id):
     if booking.status != 'confirmed' or booking.payment_status != 'unpaid':
          return jsonify({"message": f"Booking cannot be paid for in its current state (Status: {booking.status}, Payment: {booking.payment_status})."}), 409
 
-    if not user: # Should not happen if JWT is valid, but check anyway
-        abort(404, description="User not found")
-
     # --- Prepare Paystack Request ---
-    paystack_url = "https://api.paystack.co/transaction/initialize"
     # Amount must be in Kobo (multiply Naira amount by 100)
     amount_kobo = int(booking.total_price * 100)
     # Create a unique reference (important for webhook mapping)
     # Include timestamp to ensure uniqueness even if user retries payment for same booking
     reference = f"booking_{booking.id}_{int(time.time())}"
-
-    headers = {
-        "Authorization": f"Bearer {current_app.config['PAYSTACK_SECRET_KEY']}",
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "email": user.email,
-        "amount": amount_kobo,
-        "reference": reference,
-        # Optional: Add callback_url for frontend redirect after payment attempt
-        # "callback_url": "http://localhost:5173/booking-payment-status",
-        "metadata": {
-            "booking_id": booking.id,
-            "user_id": current_user_id,
-            "description": f"Payment for Booking #{booking.id}"
-        }
+    metadata = {
+        "booking_id": booking.id,
+        "user_id": current_user_id,
+        "description": f"Payment for Booking #{booking.id}"
     }
+    email = current_user.email
+    db.session.rollback() # Don't hold a transaction open while waiting on Paystack
 
     try:
-        response = requests.post(paystack_url, headers=headers, json=payload)
-        response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        paystack_data = response.json()
+        # Pooled, timeout-bounded client with a circuit breaker (app/paystack.py)
+        paystack_data = get_paystack().initialize_transaction(email, amount_kobo, reference, metadata)
 
-        if paystack_data.get("status"):
-            # Store the reference on the booking BEFORE sending URL to client
-            booking.paystack_reference = reference
-            db.session.commit()
+        # Store the reference on the booking BEFORE sending URL to client
+        booking.paystack_reference = reference
+        db.session.commit()
 
-            # Send authorization URL back to frontend
-            return jsonify({
-                "message": "Payment initialization successful.",
-                "authorization_url": paystack_data["data"]["authorization_url"],
-                "access_code": paystack_data["data"]["access_code"], # Needed for some integrations
-                "reference": reference
-            }), 200
-        else:
-            print("Paystack initialization failed:", paystack_data.get("message"))
-            return jsonify({"message": "Payment initialization failed."}), 500
+        # Send authorization URL back to frontend
+        return jsonify({
+            "message": "Payment initialization successful.",
+            "authorization_url": paystack_data["authorization_url"],
+            "access_code": paystack_data["access_code"], # Needed for some integrations
+            "reference": reference
+        }), 200
 
-    except requests.exceptions.RequestException as e:
+    except GatewayUnavailable as e:
         print(f"Error calling Paystack API: {e}")
-        return jsonify({"message": "Could not connect to payment gateway."}), 503 # Service Unavailable
+        response = jsonify({"message": "Could not connect to payment gateway. Please try again shortly."})
+        if e.retry_after:
+            response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503 # Service Unavailable
+    except PaystackError as e:
+        print("Paystack initialization failed:", e)
+        return jsonify({"message": "Payment initialization failed."}), 500
     except Exception as e:
         db.session.rollback() # Rollback reference save if anything else fails
         print(f"Error initiating payment: {e}")
@@ -549,9 +814,18 @@ def initiate_payment(booking_id):
         return jsonify({"message": "Failed to initiate payment due to server error"}), 500
 
 
+@api_bp.route('/payments/gateway/stats', methods=['GET'])
+@jwt_required()
+def get_payment_gateway_stats():
+    """ Paystack call latency, error counts and circuit breaker state for this worker (hosts only). """
+    if current_user.user_type != 'host':
+        return jsonify({"message": "Access forbidden: User is not a host"}), 403
+    return jsonify(get_paystack().stats())
+
+
 @api_bp.route('/payment/webhook', methods=['POST'])
 def paystack_webhook():
-    """ Handles incoming webhook events from Paystack. """
+    """ Receives webhook events from Paystack: verify, store, acknowledge. """
 
     # --- 1. Signature Verification ---
     paystack_secret = current_app.config['PAYSTACK_SECRET_KEY']
@@ -576,80 +850,36 @@ def paystack_webhook():
         abort(400)
 
 
-    # --- 2. Process Verified Event ---
+    # --- 2. Store the Verified Event; app/webhooks.py applies it in the background ---
     try:
         event_data = json.loads(raw_body) # Parse the verified body
-        event = event_data.get('event')
-        data = event_data.get('data')
-
-        print(f"Received Paystack event: {event}") # Log received event
-
-        if event == 'charge.success':
-            reference = data.get('reference')
-            amount_kobo = data.get('amount')
-            status = data.get('status')
-
-            if not reference or amount_kobo is None or status != 'success':
-                 print(f"Webhook Info: Ignoring unsuccessful or incomplete charge event for ref {reference}")
-                 return jsonify(success=True), 200 # Acknowledge receipt but ignore
-
-            # Find the booking using the reference
-            booking = Booking.query.filter_by(paystack_reference=reference).first()
-
-            if not booking:
-                print(f"Webhook Warning: Received success event for unknown reference {reference}")
-                return jsonify(success=True), 200 # Acknowledge but can't process
-
-            # --- 3. Verify Amount ---
-            expected_amount_kobo = int(booking.total_price * 100)
-            if amount_kobo != expected_amount_kobo:
-                 print(f"Webhook Error: Amount mismatch for ref {reference}. Expected {expected_amount_kobo}, got {amount_kobo}")
-                 # Potentially flag booking for review, don't mark as paid
-                 return jsonify(success=True), 200 # Acknowledge but don't update status
-
-            # --- 4. Update Booking Status ---
-            try:
-                booking.payment_status = 'paid'
-                # Optionally update main status if it was 'confirmed' or 'pending'
-                if booking.status in ['pending', 'confirmed']:
-                    booking.status = 'confirmed' # Ensure it's confirmed after payment
-                db.session.commit()
-                print(f"Webhook Success: Updated booking {booking.id} for ref {reference} to paid/confirmed.")
-            except Exception as db_err:
-                 db.session.rollback()
-                 print(f"Webhook Error: DB update failed for ref {reference} after successful charge: {db_err}")
-                 # Log this error critically - payment received but DB not updated!
-                 return jsonify(success=False), 500 # Internal error updating DB
-
-        # Handle other events like charge.failed if needed
-        # elif event == 'charge.failed':
-        #     # Find booking by reference, mark payment_status as 'failed' maybe
-        #     pass
-
-        # Acknowledge receipt of the event to Paystack
-        return jsonify(success=True), 200
-
     except json.JSONDecodeError:
         print("Webhook Error: Could not decode JSON body")
         abort(400)
+    if not isinstance(event_data, dict):
+        abort(400)
+
+    try:
+        stored = webhooks.record(raw_body, event_data)
     except Exception as e:
-         print(f"Webhook Error: General processing error - {e}")
-         import traceback
-         traceback.print_exc()
-         # Return 200 OK to Paystack even if processing fails, to prevent retries
-         # But log the error critically for investigation.
-         return jsonify(success=False, error="Internal processing error"), 200
-    
+        db.session.rollback()
+        print(f"Webhook Error: Could not store event - {e}")
+        # Not stored, so let Paystack retry it
+        return jsonify(success=False), 500
+
+    if stored:
+        webhooks.notify()
+    else:
+        print(f"Webhook Info: Duplicate {event_data.get('event')} event ignored.")
+    # Acknowledge receipt of the event to Paystack
+    return jsonify(success=True), 200
+
 
 @api_bp.route('/properties/<int:property_id>/reviews', methods=['POST'])
 @jwt_required()
 def create_review(property_id):
     """ Creates a review for a property if the user had a completed stay. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-         abort(401, description="Invalid user identity in token.")
+    current_user_id = current_user.id
 
     data = request.get_json()
     if not data:
@@ -701,7 +931,10 @@ def create_review(property_id):
             comment=comment
         )
         db.session.add(new_review)
+        record_review(property_id, rating) # Same transaction as the insert
+        location = (property_exists.city, property_exists.state)
         db.session.commit()
+        events.listing_changed(location) # Cached lists carry the rating
 
         # Ensure author relationship is loaded for to_dict
         # This might happen automatically depending on lazy loading settings
@@ -720,29 +953,140 @@ def create_review(property_id):
 
 
 @api_bp.route('/properties/<int:property_id>/reviews', methods=['GET'])
+@query_budget(3)
 def get_reviews(property_id):
-    """ Gets all reviews for a specific property. """
+    """ Gets all reviews for a specific property. Supports If-None-Match (ETag from count + latest review). """
     try:
         # Check if property exist
-        property_exists = Property.query.get(property_id)
+        property_exists = db.session.query(Property.id).filter_by(id=property_id).first()
         if not property_exists:
             abort(404, description="Property not found.")
 
-        reviews = Review.query.filter_by(property_id=property_id).order_by(Review.created_at.desc()).all()
+        # Reviews are only ever added, so (count, newest timestamp) changes whenever the list does
+        review_count, latest_review = db.session.query(
+            func.count(Review.id), func.max(Review.created_at)
+        ).filter(Review.property_id == property_id).one()
+        etag = make_etag('reviews', property_id, review_count, latest_review)
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+
+        reviews = Review.query.options(joinedload(Review.author).load_only(User.id, User.first_name)) \
+            .filter_by(property_id=property_id).order_by(Review.created_at.desc()).all()
         reviews_list = [r.to_dict(include_author=True) for r in reviews]
-        return jsonify(reviews_list)
+        return json_with_etag(reviews_list, etag)
 
     except Exception as e:
         print(f"Error fetching reviews for property {property_id}: {e}")
+        if hasattr(e, 'code') and e.code == 404:
+            abort(404, description="Property not found.")
         abort(500, description="Internal Server Error")
 
 
+MAX_BATCH_PROPERTY_IDS = 100
+MAX_BATCH_WINDOW_DAYS = 366
+
+@api_bp.route('/properties/booked-dates', methods=['GET'])
+def get_booked_dates_batch():
+    """
+    Booked nights for many properties in one call, for date pickers and map views:
+    ?ids=1,2,3 (at most MAX_BATCH_PROPERTY_IDS) within ?start=&end= (YYYY-MM-DD, end exclusive;
+    default the next 365 nights). Overlapping and back-to-back bookings are merged and clipped
+    to the window. format=bitmap returns one '0'/'1' character per night instead of ranges.
+    Ids that do not exist are listed under not_found. One query for the whole batch.
+    """
+    try:
+        ids = list(dict.fromkeys(int(part) for part in request.args.get('ids', '').split(',') if part.strip()))
+    except ValueError:
+        abort(400, description="ids must be a comma-separated list of property ids.")
+    if not ids:
+        abort(400, description="ids is required.")
+    if len(ids) > MAX_BATCH_PROPERTY_IDS:
+        abort(400, description=f"At most {MAX_BATCH_PROPERTY_IDS} ids per request.")
+
+    start = date.today()
+    end = None
+    try:
+        if request.args.get('start'):
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        if request.args.get('end'):
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, description="start and end must be dates in YYYY-MM-DD format.")
+    end = end or start + timedelta(days=365)
+    if end <= start:
+        abort(400, description="end must be after start.")
+    if (end - start).days > MAX_BATCH_WINDOW_DAYS:
+        abort(400, description=f"The window can be at most {MAX_BATCH_WINDOW_DAYS} days.")
+    output_format = request.args.get('format', 'ranges')
+    if output_format not in ('ranges', 'bitmap'):
+        abort(400, description="format must be 'ranges' or 'bitmap'.")
+
+    # Properties LEFT JOIN their confirmed bookings in the window: existence, versions and ranges at once
+    rows = db.session.query(
+        Property.id, Property.booking_version, Booking.check_in_date, Booking.check_out_date
+    ).outerjoin(Booking, and_(
+        Booking.property_id == Property.id,
+        Booking.status == 'confirmed',
+        Booking.check_in_date < end,
+        Booking.check_out_date > start
+    )).filter(Property.id.in_(ids)).order_by(Property.id, Booking.check_in_date).all()
+
+    versions = {}
+    merged = {} # property_id -> [[first night, end], ...] clipped to the window
+    for property_id, booking_version, check_in, check_out in rows:
+        versions[property_id] = booking_version
+        ranges = merged.setdefault(property_id, [])
+        if check_in is None:
+            continue
+        check_in, check_out = max(check_in, start), min(check_out, end)
+        if ranges and check_in <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], check_out)
+        else:
+            ranges.append([check_in, check_out])
+
+    etag = make_etag('booked-dates-batch', start, end, output_format, *sorted(versions.items()))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    days = (end - start).days
+    properties = {}
+    for property_id, ranges in merged.items():
+        if output_format == 'bitmap':
+            nights = ['0'] * days
+            for first, last in ranges:
+                nights[(first - start).days:(last - start).days] = '1' * (last - first).days
+            properties[str(property_id)] = ''.join(nights)
+        else:
+            properties[str(property_id)] = [
+                {"startDate": first.isoformat(), "endDate": last.isoformat()} for first, last in ranges
+            ]
+
+    return json_with_etag({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "format": output_format,
+        "properties": properties,
+        "not_found": [property_id for property_id in ids if property_id not in versions],
+    }, etag)
+
+
 # --- Get Booked Dates for a Property ---
 @api_bp.route('/properties/<int:property_id>/booked-dates', methods=['GET'])
 def get_booked_dates(property_id):
-    """ Gets a list of confirmed booked date ranges for a specific property. """
-    # Ensure property exists
-    prop = Property.query.get_or_404(property_id)
+    """
+    Gets a list of confirmed booked date ranges for a specific property.
+    Supports If-None-Match: the ETag is the property's booking_version, so revalidating costs one lookup.
+    """
+    # Ensure property exists (reading only the version column)
+    booking_version = db.session.query(Property.booking_version).filter_by(id=property_id).scalar()
+    if booking_version is None:
+        abort(404, description="Property not found")
+    etag = make_etag('booked-dates', property_id, booking_version)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
     try:
         # Find confirmed bookings for this property
         booked_ranges = Booking.query.with_entities(
@@ -769,7 +1113,7 @@ def get_booked_dates(property_id):
             for booked in booked_ranges
         ]
 
-        return jsonify(booked_dates_list)
+        return json_with_etag(booked_dates_list, etag)
 
     except Exception as e:
         print(f"Error fetching booked dates for property {property_id}: {e}")
@@ -781,11 +1125,7 @@ def get_booked_dates(property_id):
 @jwt_required()
 def update_property(property_id):
     """ Updates details for a specific property. Only owner can update. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-         abort(401, description="Invalid user identity in token.")
+    current_user_id = current_user.id
 
     property_to_update = Property.query.get_or_404(property_id)
 
@@ -802,6 +1142,7 @@ def update_property(property_id):
         return jsonify({"message": "No update data provided"}), 400
 
     # --- Update Fields if Present in Request ---
+    previous_location = (property_to_update.city, property_to_update.state) # For cache invalidation
     updated = False # Flag to check if any updates were made
     possible_fields = ['title', 'description', 'address', 'city', 'state', 'price_per_night', 'max_guests', 'num_bedrooms', 'num_bathrooms', 'amenities', 'power_backup_details', 'latitude', 'longitude']
 
@@ -827,7 +1168,10 @@ def update_property(property_id):
         if not updated:
              return jsonify({"message": "No valid fields provided for update"}), 400
 
+        if 'amenities' in data or 'power_backup_details' in data:
+            sync_property_tags(property_to_update)
         db.session.commit()
+        events.listing_changed(previous_location, (property_to_update.city, property_to_update.state))
         return jsonify({
             "message": "Property updated successfully",
             "property": property_to_update.to_dict()
@@ -850,11 +1194,7 @@ def update_property(property_id):
 @jwt_required()
 def delete_property(property_id):
     """ Deletes a specific property. Only owner can delete. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-         abort(401, description="Invalid user identity in token.")
+    current_user_id = current_user.id
 
     property_to_delete = Property.query.get_or_404(property_id)
 
@@ -863,8 +1203,11 @@ def delete_property(property_id):
         abort(403, description="Forbidden: You do not have permission to delete this property.")
 
     try:
+        location = (property_to_delete.city, property_to_delete.state)
+        media_jobs.discard_for_property(property_id) # Photos still waiting to be processed
         db.session.delete(property_to_delete)
         db.session.commit()
+        events.listing_deleted(property_id, *location)
         # Standard practice is to return 204 No Content on successful DELETE
         # Alternatively return 200 OK with a message
         return '', 204 # No content response body for 204
@@ -884,17 +1227,19 @@ def delete_property(property_id):
 @api_bp.route('/my-listings', methods=['GET'])
 @jwt_required()
 def get_my_listings():
-    """ Gets all properties listed by the currently logged-in user. """
-    current_user_id_str = get_jwt_identity()
-    try:
-        current_user_id = int(current_user_id_str)
-    except (ValueError, TypeError):
-         abort(401, description="Invalid user identity in token.")
+    """ Gets a page of properties listed by the currently logged-in user. """
+    current_user_id = current_user.id
 
+    limit, cursor = get_page_args()
+    fields = get_property_fields()
     try:
-        user_properties = Property.query.filter_by(host_id=current_user_id).order_by(Property.created_at.desc()).all()
-        properties_list = [prop.to_dict() for prop in user_properties]
-        return jsonify(properties_list)
+        query = Property.query.options(load_only(*Property.load_only_columns(fields), Property.created_at)) \
+            .filter_by(host_id=current_user_id)
+        user_properties, next_cursor = keyset_paginate(query, PROPERTY_SORT_KEYS, limit, cursor)
+        properties_list = [prop.to_dict(fields) for prop in user_properties]
+        return jsonify({"items": properties_list, "next_cursor": next_cursor})
+    except ValueError as e:
+        abort(400, description=str(e))
     except Exception as e:
         print(f"Error fetching listings for user {current_user_id}: {e}")
         abort(500, description="Internal Server Error")
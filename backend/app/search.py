@@ -0,0 +1,98 @@
+"""
+Full-text listing search.
+
+SQLite: an external-content FTS5 table (property_fts) over title, description, city and
+state, kept current by triggers on the property table. PostgreSQL: a generated
+tsvector column (property.search_vector) with a GIN index, plus pg_trgm GIN indexes that
+let the existing city/state ILIKE filters use an index. Both are created by the
+"add full-text search" migration.
+
+Only q= goes through the full-text index. The city= and state= filters stay ILIKE
+substring matches on both databases ('agos' finds Lagos), as they always were.
+
+If the search objects are missing (e.g. a dev database made with db.create_all()) we
+fall back to ILIKE so the endpoints keep working, just without an index.
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import func, literal_column, select, table, column, text, or_
+
+from . import db
+from .models import Property
+
+MAX_TERMS = 8
+# bm25 column weights, in property_fts column order: title, description, city, state
+FTS_WEIGHTS = (10.0, 1.0, 4.0, 4.0)
+
+_property_fts = table('property_fts', column('rowid'))
+
+
+def _terms(value):
+    return re.findall(r'\w+', (value or '').lower())[:MAX_TERMS]
+
+
+def _fts_available():
+    """ Checks once per app whether the migration's search objects exist. """
+    cached = current_app.extensions.get('search_fts_available')
+    if cached is None:
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'property_fts'"
+        elif dialect == 'postgresql':
+            sql = ("SELECT 1 FROM information_schema.columns "
+                   "WHERE table_name = 'property' AND column_name = 'search_vector'")
+        else:
+            sql = None
+        cached = bool(sql and db.session.execute(text(sql)).first())
+        if not cached:
+            print("Full-text search index not found; text search falls back to ILIKE.")
+        current_app.extensions['search_fts_available'] = cached
+    return cached
+
+
+def _sqlite_match(q_terms):
+    """ Builds an FTS5 MATCH expression: every term is a quoted prefix query, ANDed together. """
+    return ' '.join(f'"{term}"*' for term in q_terms)
+
+
+def _filter_location(query, city, state):
+    if city:
+        query = query.filter(Property.city.ilike(f'%{city}%'))
+    if state:
+        query = query.filter(Property.state.ilike(f'%{state}%'))
+    return query
+
+
+def _ilike_fallback(query, q_terms):
+    for term in q_terms:
+        query = query.filter(or_(Property.title.ilike(f'%{term}%'), Property.description.ilike(f'%{term}%')))
+    return query, None
+
+
+def apply_text_search(query, q=None, city=None, state=None):
+    """
+    Filters a Property query by free text (q, over title/description/city/state) and by
+    city/state. Returns (query, rank) where rank is a SQL expression that sorts the best
+    match first when ordered ascending, or None if no free-text query was given.
+    """
+    query = _filter_location(query, city, state) # On PostgreSQL served by the pg_trgm GIN indexes
+    q_terms = _terms(q)
+    if not q_terms:
+        return query, None
+    if not _fts_available():
+        return _ilike_fallback(query, q_terms)
+
+    if db.engine.dialect.name == 'sqlite':
+        fts_table = literal_column('property_fts')
+        matches = select(
+            _property_fts.c.rowid.label('property_id'),
+            func.bm25(fts_table, *FTS_WEIGHTS).label('rank') # Lower is better
+        ).where(fts_table.op('MATCH')(_sqlite_match(q_terms))).subquery('fts_match')
+        query = query.join(matches, Property.id == matches.c.property_id)
+        return query, matches.c.rank
+
+    vector = literal_column('property.search_vector')
+    ts_query = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in q_terms))
+    query = query.filter(vector.op('@@')(ts_query))
+    return query, -func.ts_rank(vector, ts_query)
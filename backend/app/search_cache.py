@@ -0,0 +1,69 @@
+"""
+Response cache for GET /api/properties.
+
+Entries are keyed on the normalized filter set and hold the serialized JSON body. Each
+entry remembers which city/state it was filtered on and whether it had a date filter,
+so listing writes only drop the entries that could contain the listing, and booking
+status changes only drop date-filtered entries.
+"""
+from flask import current_app
+
+from .cache import TTLCache
+
+# Free-text style parameters compared case-insensitively
+_CASE_INSENSITIVE = {'q', 'city', 'state', 'amenities', 'power_backup'}
+
+
+def init_app(app):
+    app.extensions['search_cache'] = TTLCache(
+        maxsize=app.config.get('SEARCH_CACHE_SIZE', 1024),
+        ttl=app.config.get('SEARCH_CACHE_TTL', 30),
+    )
+
+
+def get_search_cache():
+    return current_app.extensions['search_cache']
+
+
+def _normalized_args(args):
+    normalized = {}
+    for key in args:
+        value = ' '.join(args.get(key, '').split()) # Collapse whitespace
+        if not value:
+            continue
+        normalized[key] = value.lower() if key in _CASE_INSENSITIVE else value
+    return normalized
+
+
+def cache_key(args):
+    return tuple(sorted(_normalized_args(args).items()))
+
+
+def entry_meta(args):
+    normalized = _normalized_args(args)
+    return {
+        'city': normalized.get('city'),
+        'state': normalized.get('state'),
+        'dates': bool(normalized.get('check_in') and normalized.get('check_out')),
+    }
+
+
+def _could_match(filter_value, listing_value):
+    """ Conservative: every word of the filter appears somewhere in the listing's value. """
+    if filter_value is None:
+        return True # Unfiltered on this field: the listing may be in the results
+    listing_value = (listing_value or '').lower()
+    return all(word in listing_value for word in filter_value.split())
+
+
+def invalidate_listing(*locations):
+    """ Drops entries that could include a listing in any of the given (city, state) pairs. """
+    def affected(meta):
+        return any(_could_match(meta.get('city'), city) and _could_match(meta.get('state'), state)
+                   for city, state in locations)
+    return get_search_cache().invalidate(affected)
+
+
+def invalidate_date_filtered():
+    """ Drops entries whose availability filter may have changed. """
+    return get_search_cache().invalidate(lambda meta: meta.get('dates'))
@@ -0,0 +1,321 @@
+"""
+Listing photo storage.
+
+Two interchangeable backends: CloudinaryStorage (production) and LocalStorage, which writes
+under MEDIA_ROOT and serves files from /api/media/<name>. LocalStorage stands in for
+Cloudinary in development and benchmarks; MEDIA_LOCAL_LATENCY adds an artificial delay per
+upload to mimic a remote service.
+
+Assets are content-addressed: a photo is keyed by the SHA-256 of its bytes. The media_asset
+table remembers every stored key, so a photo that was uploaded before (typically a host
+reusing photos across listings) is not uploaded again. Each upload is stored under a name of
+its own (the key plus a random suffix), never under the bare key. So when two requests
+upload the same new photo at once, each gets its own copy, and a request that fails deletes
+only its copies, never a file another listing points at. The copy registered first becomes
+the one later uploads reuse; the other stays with its listing. Each stored photo also gets a
+card-size thumbnail, as JPEG and WebP, which is what listing cards load. Cloudinary
+generates these with eager transformations at upload time. LocalStorage renders them next
+to the original in a small process pool (thumbnails.py), because resizing is CPU-bound. Rendering needs
+Pillow; without it the thumbnails fall back to the original photo.
+
+upload_all() sends a request's new files concurrently on a bounded, per-app thread pool. Each
+file gets a timeout and a few retries with backoff. If any file still fails, every asset
+uploaded for that request is deleted again, so a failed listing leaves nothing behind.
+Photos reused from media_asset are never deleted this way.
+Files are handed over as the streams Werkzeug parsed them into (large parts are spooled
+to temporary files), never read fully into memory here.
+"""
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+
+from thumbnails import CARD_SIZE, render_thumbnails
+from . import db
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+CLOUDINARY_FOLDER = 'shortlet_listings'
+CHUNK_SIZE = 64 * 1024
+THUMBNAIL_TIMEOUT = 60 # seconds
+
+# One stored photo. key is the SHA-256 of its bytes; is_new is True when this request stored it (its own copy).
+StoredAsset = namedtuple('StoredAsset', 'key url asset_id thumbnail_url thumbnail_webp_url is_new')
+
+
+class UploadError(Exception):
+    pass
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def content_hash(stream):
+    """ SHA-256 of a seekable stream, read in chunks; rewinds the stream afterwards. """
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def thumbnail_entry(asset):
+    """ The listing_thumbnails item for a stored asset. """
+    return {'url': asset.thumbnail_url or asset.url, 'webp': asset.thumbnail_webp_url}
+
+
+# --- Backends ---
+class CloudinaryStorage:
+    name = 'cloudinary'
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    # Card thumbnails: fit inside CARD_SIZE without upscaling
+    CARD_TRANSFORMATION = {'width': CARD_SIZE[0], 'height': CARD_SIZE[1], 'crop': 'limit'}
+
+    def upload(self, stream, filename, name):
+        """ Returns (url, asset_id, thumbnail_url, thumbnail_webp_url). """
+        import cloudinary.uploader
+        import cloudinary.utils
+        # overwrite=False: a retry after a timed-out attempt that did arrive returns that upload
+        result = cloudinary.uploader.upload(
+            stream, folder=CLOUDINARY_FOLDER, public_id=name, overwrite=False, timeout=self.timeout,
+            eager=[dict(self.CARD_TRANSFORMATION, format='jpg'), dict(self.CARD_TRANSFORMATION, format='webp')],
+        )
+        public_id = result['public_id']
+        thumbnails = [cloudinary.utils.cloudinary_url(public_id, secure=True, format=image_format, **self.CARD_TRANSFORMATION)[0]
+                      for image_format in ('jpg', 'webp')]
+        return result['secure_url'], public_id, thumbnails[0], thumbnails[1]
+
+    def delete(self, asset_id):
+        import cloudinary.uploader
+        cloudinary.uploader.destroy(asset_id, timeout=self.timeout)
+
+
+class LocalStorage:
+    name = 'local'
+
+    def __init__(self, root, url_prefix='/api/media', latency=0.0, processes=2):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+        self.latency = latency
+        self.processes = processes
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def pool(self):
+        # Spawned, not forked: the app process runs threads, and forking those is unsafe.
+        # render_thumbnails lives outside the app package, so the children never import the app.
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _url(self, path):
+        return f"{self.url_prefix}/{os.path.relpath(path, self.root).replace(os.sep, '/')}"
+
+    def upload(self, stream, filename, name):
+        """ Returns (url, asset_id, thumbnail_url, thumbnail_webp_url). """
+        if self.latency:
+            time.sleep(self.latency)
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'bin'
+        name = f'{name[:2]}/{name}.{extension}' # Fanned out so no directory gets huge
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f'{path}.{uuid.uuid4().hex}.part'
+        with open(partial, 'wb') as out:
+            shutil.copyfileobj(stream, out, CHUNK_SIZE) # Chunked copy; the upload is never held in memory
+        os.replace(partial, path)
+
+        thumbnails = None
+        if self.processes > 0:
+            try:
+                thumbnails = self.pool.submit(render_thumbnails, path).result(timeout=THUMBNAIL_TIMEOUT)
+            except Exception as e:
+                print(f"Thumbnail rendering failed for {name}: {e}")
+        if not thumbnails:
+            return self._url(path), name, None, None
+        return self._url(path), name, self._url(thumbnails[0]), self._url(thumbnails[1])
+
+    def delete(self, asset_id):
+        base = os.path.join(self.root, asset_id).rsplit('.', 1)[0]
+        for path in (os.path.join(self.root, asset_id), base + '.card.jpg', base + '.card.webp'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+# --- Per-app wiring ---
+class MediaStorage:
+    def __init__(self, backend, workers=4, timeout=30, retries=2, backoff=0.5):
+        self.backend = backend
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        # Created lazily so CLI commands and forked workers do not inherit idle threads
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='media-upload')
+            return self._pool
+
+    # --- Dedup (request/worker thread, needs an app context) ---
+    def find(self, keys):
+        """ Assets already stored for these content hashes, as {key: StoredAsset}. """
+        from .models import MediaAsset
+        keys = set(keys)
+        if not keys:
+            return {}
+        rows = MediaAsset.query.filter(MediaAsset.backend == self.backend.name, MediaAsset.key.in_(keys)).all()
+        return {row.key: StoredAsset(row.key, row.url, row.asset_id, row.thumbnail_url, row.thumbnail_webp_url, False)
+                for row in rows}
+
+    def register(self, assets):
+        """
+        Records newly stored assets in the current transaction, so later uploads of the same
+        bytes reuse them. Safe against a concurrent upload of the same photo: the first row wins.
+        """
+        from .models import MediaAsset
+        rows = {asset.key: {
+            'backend': self.backend.name, 'key': asset.key, 'url': asset.url, 'asset_id': asset.asset_id,
+            'thumbnail_url': asset.thumbnail_url, 'thumbnail_webp_url': asset.thumbnail_webp_url,
+        } for asset in assets if asset.is_new}
+        if not rows:
+            return
+        table = MediaAsset.__table__
+        dialect = db.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            db.session.execute(insert(table).values(list(rows.values())).on_conflict_do_nothing())
+            return
+        # Other databases: insert the keys that are not there yet
+        known = self.find(rows)
+        new_rows = [row for key, row in rows.items() if key not in known]
+        if new_rows:
+            db.session.execute(table.insert().values(new_rows))
+
+    # --- Uploading ---
+    def _upload(self, stream, filename, key):
+        """ Stores one seekable stream with retries; returns a StoredAsset or raises UploadError. """
+        name = f'{key}-{uuid.uuid4().hex[:12]}' # This upload's own copy; retries reuse the name
+        attempt = 0
+        while True:
+            try:
+                stream.seek(0)
+                return StoredAsset(key, *self.backend.upload(stream, filename, name), True)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries:
+                    raise UploadError(f"Image upload failed for {filename}: {e}") from e
+                print(f"Upload of {filename} failed (attempt {attempt}): {e}; retrying.")
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+    def upload_stream(self, stream, filename):
+        """ Stores one seekable stream unless the same bytes are already stored; returns a StoredAsset. """
+        key = content_hash(stream)
+        return self.find([key]).get(key) or self._upload(stream, filename, key)
+
+    def shutdown(self):
+        """ Stops the upload threads and thumbnail processes (benchmarks create many apps). """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+        backend_pool = getattr(self.backend, '_pool', None)
+        if backend_pool is not None:
+            backend_pool.shutdown(wait=True)
+            self.backend._pool = None
+
+    def delete_all(self, asset_ids):
+        for asset_id in asset_ids:
+            try:
+                self.backend.delete(asset_id)
+            except Exception as e:
+                print(f"Could not delete uploaded asset {asset_id}: {e}")
+
+    def upload_all(self, files):
+        """
+        Stores files and returns a StoredAsset for each, in the original order. Photos that are
+        already stored are reused; the rest upload concurrently. Raises UploadError (after
+        deleting whatever did upload) if any file fails or times out. Call register() with the
+        result in the transaction that saves the listing.
+        """
+        keys = [content_hash(file.stream) for file in files]
+        assets = self.find(keys)
+        new_files = {}
+        for key, file in zip(keys, files):
+            if key not in assets:
+                new_files.setdefault(key, file) # The same photo twice in one request is stored once
+        futures = {key: self.pool.submit(self._upload, file.stream, file.filename, key) for key, file in new_files.items()}
+        # Worst case for one file is every attempt timing out plus the backoff sleeps; files beyond
+        # the pool size wait for a free thread, so allow one such slot per wave of uploads
+        per_file = (self.timeout + self.backoff * 2 ** self.retries) * (self.retries + 1)
+        waves = -(-len(futures) // self.workers)
+        deadline = time.monotonic() + per_file * waves
+        uploaded, error = [], None
+        for key, future in futures.items():
+            try:
+                uploaded.append(future.result(timeout=max(deadline - time.monotonic(), 0)))
+            except FutureTimeout:
+                error = error or UploadError(f"Image upload timed out for {new_files[key].filename}.")
+            except UploadError as e:
+                error = error or e
+        if error:
+            # Uploads still running when we gave up are cleaned up as they finish
+            for future in futures.values():
+                if not future.done():
+                    future.add_done_callback(self._delete_late_upload)
+            self.delete_all([asset.asset_id for asset in uploaded])
+            raise error
+        assets.update((asset.key, asset) for asset in uploaded)
+        return [assets[key] for key in keys]
+
+    def _delete_late_upload(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self.delete_all([future.result().asset_id])
+
+
+def init_app(app):
+    backend_name = app.config.get('MEDIA_STORAGE') or ('cloudinary' if app.config.get('CLOUDINARY_CLOUD_NAME') else 'local')
+    timeout = app.config.get('MEDIA_UPLOAD_TIMEOUT', 30)
+    if backend_name == 'cloudinary':
+        backend = CloudinaryStorage(timeout=timeout)
+    else:
+        processes = app.config.get('MEDIA_THUMBNAIL_PROCESSES', 2)
+        if processes and importlib.util.find_spec('PIL') is None:
+            print("Pillow is not installed; listing cards will use the full-size photos.")
+            processes = 0
+        backend = LocalStorage(app.config['MEDIA_ROOT'], latency=app.config.get('MEDIA_LOCAL_LATENCY', 0.0),
+                               processes=processes)
+    app.extensions['media_storage'] = MediaStorage(
+        backend,
+        workers=app.config.get('MEDIA_UPLOAD_WORKERS', 4),
+        timeout=timeout,
+        retries=app.config.get('MEDIA_UPLOAD_RETRIES', 2),
+    )
+    print(f"Media storage: {backend.name}.")
+
+
+def get_media_storage():
+    return current_app.extensions['media_storage']
@@ -0,0 +1,247 @@
+"""
+Paystack webhook inbox.
+
+POST /api/payment/webhook verifies the signature, stores the raw event in the
+webhook_event table and answers 200 right away. Paystack gets its acknowledgement in
+milliseconds, so it does not retry because of a slow response, and API workers are not
+tied up applying payments during a spike. Each event is stored once. The dedup key is the
+event type plus the transaction reference, so a re-sent event is dropped at insert time.
+
+A processor drains the inbox in batches. It runs as worker threads in the app process
+(WEBHOOK_WORKER_THREADS, woken when an event arrives) and/or as `flask webhooks process`.
+Batches are claimed with a lease token. Each event is applied in the same transaction
+that marks it done, so a crash can never apply an event twice. Failures are retried with
+backoff. After WEBHOOK_MAX_ATTEMPTS an event is parked as 'dead'. `flask webhooks status`
+lists dead events and `flask webhooks retry` puts them back in the queue.
+"""
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+
+from . import db, events, rollups
+from .models import Booking, Property, WebhookEvent
+from .workers import PollingWorkers
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None) # Stored naive, like the columns
+
+
+# --- Receiving (request side) ---
+def dedup_key(raw_body, event_data):
+    reference = (event_data.get('data') or {}).get('reference')
+    if reference:
+        return f"{event_data.get('event')}:{reference}"
+    return 'sha256:' + hashlib.sha256(raw_body).hexdigest() # No reference: identical bodies are duplicates
+
+
+def record(raw_body, event_data):
+    """ Stores a verified event and commits; returns False if it was a duplicate. """
+    row = {
+        'dedup_key': dedup_key(raw_body, event_data),
+        'event': event_data.get('event'),
+        'reference': (event_data.get('data') or {}).get('reference'),
+        'payload': raw_body.decode('utf-8'),
+        'status': 'pending',
+        'attempts': 0,
+        'run_after': _utcnow(),
+    }
+    table = WebhookEvent.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        inserted = db.session.execute(insert(table).values(row).on_conflict_do_nothing()).rowcount
+    else:
+        # Other databases: check first; a racing duplicate fails the unique key instead
+        exists = db.session.query(WebhookEvent.id).filter_by(dedup_key=row['dedup_key']).first()
+        inserted = 0 if exists else db.session.execute(table.insert().values(row)).rowcount
+    db.session.commit()
+    return bool(inserted)
+
+
+# --- Applying events ---
+def apply_charge_success(data):
+    """
+    Marks the booking for a successful charge as paid (and confirms it if it was pending).
+    Returns (status, note, (booking, previous status) or None); does not commit. Raises on
+    database errors.
+    """
+    reference = data.get('reference')
+    amount_kobo = data.get('amount')
+    if not reference or amount_kobo is None or data.get('status') != 'success':
+        return 'ignored', 'Unsuccessful or incomplete charge', None
+
+    booking = Booking.query.filter_by(paystack_reference=reference).first()
+    if not booking:
+        return 'ignored', 'Unknown reference', None
+
+    expected_amount_kobo = int(booking.total_price * 100)
+    if amount_kobo != expected_amount_kobo:
+        # Potentially flag booking for review, don't mark as paid
+        return 'ignored', f"Amount mismatch: expected {expected_amount_kobo}, got {amount_kobo}", None
+
+    # Same per-property lock as confirm_booking, then re-read under it
+    Property.bump_booking_version(booking.property_id)
+    db.session.refresh(booking)
+    if booking.payment_status == 'paid':
+        return 'done', f"Booking {booking.id} already paid", None
+
+    previous_status = booking.status
+    previous_payment_status = booking.payment_status
+    booking.payment_status = 'paid'
+    note = f"Booking {booking.id} marked paid"
+    # Optionally update main status if it was 'pending', unless that would double-book the dates
+    if booking.status == 'pending':
+        overlapping = Booking.query.filter(
+            Booking.property_id == booking.property_id,
+            Booking.id != booking.id,
+            Booking.status == 'confirmed',
+            Booking.check_in_date < booking.check_out_date,
+            Booking.check_out_date > booking.check_in_date
+        ).first()
+        if overlapping:
+            note += f"; left pending, overlaps confirmed booking {overlapping.id}"
+        else:
+            booking.status = 'confirmed' # Ensure it's confirmed after payment
+    rollups.record_booking_change(booking, previous_status, previous_payment_status)
+    return 'done', note, (booking, previous_status)
+
+
+# Event type -> handler(data) returning (status, note, (booking, previous status) or None)
+HANDLERS = {
+    'charge.success': apply_charge_success,
+}
+
+
+# --- Processing (worker side) ---
+def _due():
+    now = _utcnow()
+    return or_(
+        and_(WebhookEvent.status == 'pending', WebhookEvent.run_after <= now),
+        and_(WebhookEvent.status == 'processing', WebhookEvent.locked_until < now), # Lease expired
+    )
+
+
+def claim_batch(limit):
+    """ Claims up to `limit` due events; returns (lease token, their ids in arrival order). """
+    token = uuid.uuid4().hex
+    lease = timedelta(seconds=current_app.config.get('WEBHOOK_LEASE', 120))
+    ids = [event_id for event_id, in db.session.query(WebhookEvent.id).filter(_due())
+           .order_by(WebhookEvent.id).limit(limit)]
+    if not ids:
+        db.session.rollback()
+        return token, []
+    # Rows another processor claimed in the meantime no longer match _due() and are skipped
+    WebhookEvent.query.filter(WebhookEvent.id.in_(ids), _due()).update({
+        WebhookEvent.status: 'processing',
+        WebhookEvent.attempts: WebhookEvent.attempts + 1,
+        WebhookEvent.locked_until: _utcnow() + lease,
+        WebhookEvent.lease_token: token,
+    }, synchronize_session=False)
+    db.session.commit()
+    claimed = [event_id for event_id, in db.session.query(WebhookEvent.id)
+               .filter(WebhookEvent.id.in_(ids), WebhookEvent.lease_token == token).order_by(WebhookEvent.id)]
+    db.session.rollback()
+    return token, claimed
+
+
+def process(event_id, token):
+    """ Applies one claimed event, recording the result in the same transaction. """
+    ours = and_(WebhookEvent.id == event_id, WebhookEvent.lease_token == token, WebhookEvent.status == 'processing')
+    event = db.session.get(WebhookEvent, event_id)
+    try:
+        event_data = json.loads(event.payload)
+        handler = HANDLERS.get(event_data.get('event'))
+        if handler is None:
+            status, note, changed = 'ignored', f"No handler for {event_data.get('event')}", None
+        else:
+            status, note, changed = handler(event_data.get('data') or {})
+        updated = WebhookEvent.query.filter(ours).update({
+            WebhookEvent.status: status, WebhookEvent.outcome: note[:500], WebhookEvent.processed_at: _utcnow(),
+        }, synchronize_session=False)
+        if not updated:
+            db.session.rollback() # Our lease ran out and another processor took the event over
+            return
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        _failed(event_id, token, e)
+        return
+
+    print(f"Webhook {event_id} ({event.event} {event.reference}): {status}, {note}")
+    if changed:
+        booking, previous_status = changed
+        events.booking_status_changed(booking, previous_status)
+
+
+def _failed(event_id, token, error):
+    event = db.session.get(WebhookEvent, event_id)
+    max_attempts = current_app.config.get('WEBHOOK_MAX_ATTEMPTS', 5)
+    if event.attempts >= max_attempts:
+        values = {WebhookEvent.status: 'dead'}
+        print(f"Webhook {event_id} failed {event.attempts} times, moved to dead letters: {error}")
+    else:
+        delay = current_app.config.get('WEBHOOK_RETRY_DELAY', 30) * 2 ** (event.attempts - 1)
+        values = {WebhookEvent.status: 'pending', WebhookEvent.run_after: _utcnow() + timedelta(seconds=delay)}
+        print(f"Webhook {event_id} failed (attempt {event.attempts}), retrying in {delay}s: {error}")
+    values[WebhookEvent.outcome] = f"{type(error).__name__}: {error}"[:500]
+    WebhookEvent.query.filter(
+        WebhookEvent.id == event_id, WebhookEvent.lease_token == token, WebhookEvent.status == 'processing'
+    ).update(values, synchronize_session=False)
+    db.session.commit()
+
+
+def run_pending(batches=None):
+    """ Drains due events batch by batch until none are left (or `batches` ran); returns how many. """
+    batch_size = current_app.config.get('WEBHOOK_BATCH_SIZE', 50)
+    processed = 0
+    done_batches = 0
+    while batches is None or done_batches < batches:
+        token, ids = claim_batch(batch_size)
+        if not ids:
+            break
+        for event_id in ids:
+            process(event_id, token)
+        processed += len(ids)
+        done_batches += 1
+    return processed
+
+
+# --- Dead letters ---
+def dead_letters(limit=100):
+    return WebhookEvent.query.filter_by(status='dead').order_by(WebhookEvent.id).limit(limit).all()
+
+
+def requeue(event_ids=None):
+    """ Puts dead events (all, or the given ids) back in the queue; returns how many. """
+    query = WebhookEvent.query.filter(WebhookEvent.status == 'dead')
+    if event_ids:
+        query = query.filter(WebhookEvent.id.in_(event_ids))
+    count = query.update({
+        WebhookEvent.status: 'pending', WebhookEvent.attempts: 0, WebhookEvent.run_after: _utcnow(),
+        WebhookEvent.lease_token: None,
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def status_counts():
+    return dict(db.session.query(WebhookEvent.status, func.count(WebhookEvent.id)).group_by(WebhookEvent.status).all())
+
+
+# --- In-process processor threads ---
+def init_app(app):
+    app.extensions['webhook_workers'] = PollingWorkers(
+        app, 'webhook processor', lambda: run_pending(batches=1), 'WEBHOOK_WORKER_THREADS', 'WEBHOOK_POLL_INTERVAL',
+    )
+
+
+def notify():
+    current_app.extensions['webhook_workers'].notify()
@@ -0,0 +1,102 @@
+"""
+Background threads that drain a database-backed queue (media jobs, webhook events).
+
+Each queue module supplies run_batch(), which processes whatever is due and returns how
+many items it handled. The threads run it inside an app context until nothing is left,
+then sleep for the poll interval or until notify() wakes them. Serving processes start
+them at boot (see starts_at_boot), so jobs left behind by a crashed or redeployed process
+are retried without waiting for new work. Elsewhere, such as benches, they start on the
+first notify().
+"""
+import multiprocessing
+import os
+import threading
+
+import click
+from flask.helpers import get_debug_flag
+
+from . import db
+
+
+def starts_at_boot(app):
+    """
+    True when background threads should start with the app: under a WSGI server or
+    `flask run`, unless BACKGROUND_THREADS is off. Other CLI commands (migrations, benches,
+    one-off jobs) get no threads they did not ask for, and neither does a multiprocessing
+    child such as a thumbnail pool process that ended up creating an app.
+    """
+    if not app.config.get('BACKGROUND_THREADS', True):
+        return False
+    if multiprocessing.parent_process() is not None:
+        return False
+    ctx = click.get_current_context(silent=True)
+    if ctx is None:
+        return True # WSGI server
+    if ctx.info_name != 'run':
+        return False
+    reload = ctx.params.get('reload')
+    if reload is None:
+        reload = get_debug_flag()
+    # With the reloader, `flask run` loads the app in a watcher process too; only the child serves
+    return not reload or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
+
+class PollingWorkers:
+    def __init__(self, app, name, run_batch, threads_setting, poll_setting):
+        self.app = app
+        self.name = name
+        self.run_batch = run_batch
+        self.threads_setting = threads_setting # Config keys, read when the threads start
+        self.poll_setting = poll_setting
+        self.threads = []
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        count = self.app.config.get(self.threads_setting, 1)
+        with self._lock:
+            if self.threads or count <= 0:
+                return
+            self.stopping.clear()
+            for i in range(count):
+                thread = threading.Thread(target=self._run, name=f'{self.name}-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        print(f"Started {count} {self.name} thread(s).")
+
+    def _run(self):
+        poll = self.app.config.get(self.poll_setting, 5)
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    if self.run_batch():
+                        continue
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"{self.name} error: {e}")
+                finally:
+                    db.session.remove()
+                self.wake.wait(poll)
+                self.wake.clear()
+
+    def notify(self):
+        """ Wakes the threads (starting them on first use) after new work was committed. """
+        self.start()
+        self.wake.set()
+
+    def run_forever(self):
+        """ Runs the threads in the foreground, e.g. from a CLI command, until Ctrl+C. """
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self.threads):
+                self.stopping.wait(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def stop(self, timeout=10):
+        self.stopping.set()
+        self.wake.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
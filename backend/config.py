@@ -21,10 +21,85 @@ class Config:
 
     PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY')
     # PAYSTACK_PUBLIC_KEY = os.environ.get('PAYSTACK_PUBLIC_KEY') # Load public if needed globally, often just frontend uses it
+    # Paystack client (see app/paystack.py); point PAYSTACK_BASE_URL at `flask paystack-stub` to test offline
+    PAYSTACK_BASE_URL = os.environ.get('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+    PAYSTACK_CONNECT_TIMEOUT = float(os.environ.get('PAYSTACK_CONNECT_TIMEOUT', 3.05)) # seconds
+    PAYSTACK_READ_TIMEOUT = float(os.environ.get('PAYSTACK_READ_TIMEOUT', 10)) # seconds
+    PAYSTACK_RETRIES = int(os.environ.get('PAYSTACK_RETRIES', 2)) # extra attempts, only where safe to repeat
+    PAYSTACK_POOL_SIZE = int(os.environ.get('PAYSTACK_POOL_SIZE', 10)) # keep-alive connections kept per worker
+    PAYSTACK_BREAKER_THRESHOLD = int(os.environ.get('PAYSTACK_BREAKER_THRESHOLD', 5)) # consecutive failed calls
+    PAYSTACK_BREAKER_RESET = int(os.environ.get('PAYSTACK_BREAKER_RESET', 30)) # seconds before a trial call
+    # Webhook inbox (see app/webhooks.py)
+    WEBHOOK_WORKER_THREADS = int(os.environ.get('WEBHOOK_WORKER_THREADS', 1)) # per app process; 0 = only `flask webhooks process`
+    WEBHOOK_POLL_INTERVAL = float(os.environ.get('WEBHOOK_POLL_INTERVAL', 5)) # seconds
+    WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', 50))
+    WEBHOOK_LEASE = int(os.environ.get('WEBHOOK_LEASE', 120)) # seconds before a stuck event is retried elsewhere
+    WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 5)) # then the event is dead-lettered
+    WEBHOOK_RETRY_DELAY = int(os.environ.get('WEBHOOK_RETRY_DELAY', 30)) # seconds, doubled per attempt
 
     CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
     CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
     CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
 
+    # Password hashing (see app/passwords.py); login rehashes older hashes at the current cost
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12)) # each step doubles the work
+    PASSWORD_HASH_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', os.cpu_count() or 2)) # per worker process; more get 503
+
+    # Request rate limits (see app/ratelimit.py): endpoint or blueprint -> 'N/period', None = unlimited
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'sqlite') # shared by the workers on a host; 'memory' = per process
+    RATELIMIT_SQLITE_PATH = os.environ.get('RATELIMIT_SQLITE_PATH') # default: instance/ratelimit.sqlite
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted (Werkzeug ProxyFix); 0 = none
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    RATELIMITS = {
+        'api': os.environ.get('RATELIMIT_DEFAULT', '300/minute'),
+        'auth': os.environ.get('RATELIMIT_DEFAULT', '300/minute'),
+        'api.get_properties': os.environ.get('RATELIMIT_SEARCH', '120/minute'),
+        'api.create_property': os.environ.get('RATELIMIT_UPLOADS', '20/hour'),
+        'auth.login_user': os.environ.get('RATELIMIT_LOGIN', '10/minute'),
+        'auth.register_user': os.environ.get('RATELIMIT_REGISTER', '5/minute'),
+        'api.paystack_webhook': None, # Signed by Paystack, which sends bursts
+        'api.get_media': None, # Photo files; a results page loads many
+    }
+
+    # Per-worker cache of the logged-in user for JWT routes (see app/identity.py); TTL 0 disables it
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60)) # seconds
+
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
-    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
\ No newline at end of file
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # Logout / logout-all (see app/revocation.py): how stale another worker's revocation list may be
+    REVOCATION_SYNC_INTERVAL = float(os.environ.get('REVOCATION_SYNC_INTERVAL', 5)) # seconds
+
+    # Start background threads (availability index) with the app under a server or `flask run`
+    BACKGROUND_THREADS = os.environ.get('BACKGROUND_THREADS', 'true').lower() in ('1', 'true', 'yes')
+
+    # In-memory availability index used by date-range search (see app/availability.py)
+    AVAILABILITY_HORIZON_DAYS = int(os.environ.get('AVAILABILITY_HORIZON_DAYS', 365))
+    AVAILABILITY_INDEX_MAX_AGE = int(os.environ.get('AVAILABILITY_INDEX_MAX_AGE', 60)) # seconds between background rebuilds
+    # Above this many booked properties, date search excludes them with a SQL subquery instead of a bind list
+    AVAILABILITY_MAX_EXCLUDED = int(os.environ.get('AVAILABILITY_MAX_EXCLUDED', 500))
+
+    # Per-worker cache of GET /api/properties responses (see app/search_cache.py); TTL 0 disables it
+    SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', 1024))
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 30)) # seconds
+    # Send X-Query-Count (SQL statements run for the request) on every response (see app/query_budget.py)
+    QUERY_COUNT_HEADER = os.environ.get('QUERY_COUNT_HEADER', '').lower() in ('1', 'true', 'yes')
+
+    # Listing photo storage (see app/storage.py): 'cloudinary' or 'local'; defaults to Cloudinary when configured
+    MEDIA_STORAGE = os.environ.get('MEDIA_STORAGE')
+    MEDIA_ROOT = os.environ.get('MEDIA_ROOT') or os.path.join(basedir, 'media')
+    MEDIA_LOCAL_LATENCY = float(os.environ.get('MEDIA_LOCAL_LATENCY', 0)) # seconds; simulates a remote service
+    MEDIA_UPLOAD_WORKERS = int(os.environ.get('MEDIA_UPLOAD_WORKERS', 4)) # concurrent uploads per worker process
+    MEDIA_UPLOAD_TIMEOUT = int(os.environ.get('MEDIA_UPLOAD_TIMEOUT', 30)) # seconds per attempt
+    MEDIA_UPLOAD_RETRIES = int(os.environ.get('MEDIA_UPLOAD_RETRIES', 2))
+    MEDIA_THUMBNAIL_PROCESSES = int(os.environ.get('MEDIA_THUMBNAIL_PROCESSES', 2)) # Card thumbnail rendering (local storage)
+
+    # Background photo processing (see app/media_jobs.py)
+    MEDIA_ASYNC_UPLOADS = os.environ.get('MEDIA_ASYNC_UPLOADS', 'true').lower() in ('1', 'true', 'yes')
+    MEDIA_SPOOL_DIR = os.environ.get('MEDIA_SPOOL_DIR') or os.path.join(basedir, 'media_spool')
+    MEDIA_WORKER_THREADS = int(os.environ.get('MEDIA_WORKER_THREADS', 2)) # per app process; 0 = only `flask media-worker`
+    MEDIA_WORKER_POLL_INTERVAL = float(os.environ.get('MEDIA_WORKER_POLL_INTERVAL', 5)) # seconds
+    MEDIA_JOB_LEASE = int(os.environ.get('MEDIA_JOB_LEASE', 300)) # seconds before a stuck job is retried elsewhere
+    MEDIA_JOB_MAX_ATTEMPTS = int(os.environ.get('MEDIA_JOB_MAX_ATTEMPTS', 3))
+    MEDIA_JOB_RETRY_DELAY = int(os.environ.get('MEDIA_JOB_RETRY_DELAY', 30)) # seconds, doubled per attempt
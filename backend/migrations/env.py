@@ -45,6 +45,24 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# Search objects created with raw SQL by the "add full-text search" migration (see
+# app/search.py): FTS5 tables on SQLite, the tsvector column and its indexes on
+# PostgreSQL. They are not in the models, so autogenerate must not drop them.
+FTS_TABLES = ('property_fts', 'property_fts_data', 'property_fts_idx', 'property_fts_content',
+              'property_fts_docsize', 'property_fts_config')
+FTS_INDEXES = ('ix_property_search_vector', 'ix_property_city_trgm', 'ix_property_state_trgm')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and name in FTS_TABLES:
+        return False
+    if type_ == 'column' and name == 'search_vector' and object.table.name == 'property':
+        return False
+    if type_ == 'index' and name in FTS_INDEXES:
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -65,7 +83,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +112,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
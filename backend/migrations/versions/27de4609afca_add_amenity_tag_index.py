@@ -0,0 +1,45 @@
+"""Add amenity tag index
+
+Revision ID: 27de4609afca
+Revises: cf658d11b594
+Create Date: 2026-10-17 10:41:09.372615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '27de4609afca'
+down_revision = 'cf658d11b594'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate the new tables afterwards with: flask reindex-amenities
+    op.create_table('amenity',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('slug', sa.String(length=80), nullable=False),
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'slug', name='uq_amenity_kind_slug')
+    )
+    op.create_table('property_amenity',
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('amenity_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['amenity_id'], ['amenity.id'], ),
+    sa.ForeignKeyConstraint(['property_id'], ['property.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('property_id', 'amenity_id')
+    )
+    with op.batch_alter_table('property_amenity', schema=None) as batch_op:
+        batch_op.create_index('ix_property_amenity_amenity_id', ['amenity_id', 'property_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('property_amenity', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_amenity_amenity_id')
+
+    op.drop_table('property_amenity')
+    op.drop_table('amenity')
@@ -0,0 +1,49 @@
+"""Add property geo cell
+
+Revision ID: 2f8d6c4b9a17
+Revises: 9c4e2b7a1d63
+Create Date: 2026-10-17 21:14:52.608113
+
+"""
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8d6c4b9a17'
+down_revision = '9c4e2b7a1d63'
+branch_labels = None
+depends_on = None
+
+# Same grid as app/geo.py, copied so the migration does not depend on app code
+CELLS_PER_DEGREE = 10
+
+
+def _cell_for(lat, lng):
+    row = min(max(int(math.floor((lat + 90) * CELLS_PER_DEGREE)), 0), 180 * CELLS_PER_DEGREE - 1)
+    column = min(max(int(math.floor((lng + 180) * CELLS_PER_DEGREE)), 0), 360 * CELLS_PER_DEGREE - 1)
+    return row * 360 * CELLS_PER_DEGREE + column
+
+
+def upgrade():
+    op.add_column('property', sa.Column('geo_cell', sa.Integer(), nullable=True))
+
+    # Backfill from existing coordinates
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, latitude, longitude FROM property WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )).fetchall()
+    if rows:
+        conn.execute(sa.text("UPDATE property SET geo_cell = :cell WHERE id = :id"),
+                     [{'id': row.id, 'cell': _cell_for(row.latitude, row.longitude)} for row in rows])
+
+    op.create_index('ix_property_geo_cell', 'property', ['geo_cell'], unique=False)
+    op.drop_index('ix_property_latitude_longitude', table_name='property')
+
+
+def downgrade():
+    op.create_index('ix_property_latitude_longitude', 'property', ['latitude', 'longitude'], unique=False)
+    op.drop_index('ix_property_geo_cell', table_name='property')
+    op.drop_column('property', 'geo_cell')
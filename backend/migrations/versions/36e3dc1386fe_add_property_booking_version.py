@@ -0,0 +1,24 @@
+"""Add property booking_version
+
+Revision ID: 36e3dc1386fe
+Revises: 3995072e0794
+Create Date: 2026-10-17 12:08:15.226170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36e3dc1386fe'
+down_revision = '3995072e0794'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('property', sa.Column('booking_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('property', 'booking_version')
@@ -0,0 +1,85 @@
+"""Add full-text search
+
+Revision ID: 3995072e0794
+Revises: 27de4609afca
+Create Date: 2026-10-17 11:26:52.804417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3995072e0794'
+down_revision = '27de4609afca'
+branch_labels = None
+depends_on = None
+
+
+# The triggers below live on the property table. On SQLite, op.batch_alter_table('property')
+# rebuilds the table (copy, drop, rename) and the triggers go with it, so every later
+# migration that changes property must use plain op.add_column / op.create_index instead.
+SQLITE_UPGRADE = [
+    # External-content FTS5 table: stores only the index, reads text from property
+    """CREATE VIRTUAL TABLE property_fts USING fts5(
+        title, description, city, state,
+        content='property', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER property_fts_ai AFTER INSERT ON property BEGIN
+        INSERT INTO property_fts(rowid, title, description, city, state)
+        VALUES (new.id, new.title, new.description, new.city, new.state);
+    END""",
+    """CREATE TRIGGER property_fts_ad AFTER DELETE ON property BEGIN
+        INSERT INTO property_fts(property_fts, rowid, title, description, city, state)
+        VALUES ('delete', old.id, old.title, old.description, old.city, old.state);
+    END""",
+    """CREATE TRIGGER property_fts_au AFTER UPDATE OF title, description, city, state ON property BEGIN
+        INSERT INTO property_fts(property_fts, rowid, title, description, city, state)
+        VALUES ('delete', old.id, old.title, old.description, old.city, old.state);
+        INSERT INTO property_fts(rowid, title, description, city, state)
+        VALUES (new.id, new.title, new.description, new.city, new.state);
+    END""",
+    "INSERT INTO property_fts(property_fts) VALUES ('rebuild')", # Index existing listings
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS property_fts_au",
+    "DROP TRIGGER IF EXISTS property_fts_ad",
+    "DROP TRIGGER IF EXISTS property_fts_ai",
+    "DROP TABLE IF EXISTS property_fts",
+]
+
+POSTGRESQL_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Generated column: kept current by PostgreSQL itself on every insert/update
+    """ALTER TABLE property ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED""",
+    "CREATE INDEX ix_property_search_vector ON property USING GIN (search_vector)",
+    # Let the city/state ILIKE '%...%' filters use an index
+    "CREATE INDEX ix_property_city_trgm ON property USING GIN (city gin_trgm_ops)",
+    "CREATE INDEX ix_property_state_trgm ON property USING GIN (state gin_trgm_ops)",
+]
+
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_property_state_trgm",
+    "DROP INDEX IF EXISTS ix_property_city_trgm",
+    "DROP INDEX IF EXISTS ix_property_search_vector",
+    "ALTER TABLE property DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements_by_dialect):
+    dialect = op.get_bind().dialect.name
+    for statement in statements_by_dialect.get(dialect, []):
+        op.execute(statement)
+
+
+def upgrade():
+    _run({'sqlite': SQLITE_UPGRADE, 'postgresql': POSTGRESQL_UPGRADE})
+
+
+def downgrade():
+    _run({'sqlite': SQLITE_DOWNGRADE, 'postgresql': POSTGRESQL_DOWNGRADE})
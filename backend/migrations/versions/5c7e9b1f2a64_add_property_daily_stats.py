@@ -0,0 +1,37 @@
+"""Add property daily stats rollup
+
+Revision ID: 5c7e9b1f2a64
+Revises: 8a41c2d7e093
+Create Date: 2026-10-17 15:21:09.703318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7e9b1f2a64'
+down_revision = '8a41c2d7e093'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask rebuild-rollups` after upgrading, then kept current by the booking routes
+    op.create_table('property_daily_stats',
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('booked_nights', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('revenue', sa.Float(), server_default='0', nullable=False),
+    sa.Column('paid_revenue', sa.Float(), server_default='0', nullable=False),
+    sa.Column('pending_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('confirmed_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('cancelled_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('lead_time_days', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['property_id'], ['property.id'], ),
+    sa.PrimaryKeyConstraint('property_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('property_daily_stats')
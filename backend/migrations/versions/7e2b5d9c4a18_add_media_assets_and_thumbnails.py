@@ -0,0 +1,38 @@
+"""Add content-addressed media assets and listing thumbnails
+
+Revision ID: 7e2b5d9c4a18
+Revises: d41a7c2e9f05
+Create Date: 2026-10-17 18:03:44.915277
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2b5d9c4a18'
+down_revision = 'd41a7c2e9f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_asset',
+    sa.Column('backend', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('asset_id', sa.String(length=255), nullable=False),
+    sa.Column('thumbnail_url', sa.String(length=500), nullable=True),
+    sa.Column('thumbnail_webp_url', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('backend', 'key')
+    )
+    # Existing listings keep NULL thumbnails and serve their full-size photos on cards.
+    op.add_column('property', sa.Column('listing_thumbnails', sa.JSON(), nullable=True))
+    op.add_column('media_job', sa.Column('thumbnail', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('media_job', 'thumbnail')
+    op.drop_column('property', 'listing_thumbnails')
+    op.drop_table('media_asset')
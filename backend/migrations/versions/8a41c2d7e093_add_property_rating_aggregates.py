@@ -0,0 +1,45 @@
+"""Add property rating aggregates
+
+Revision ID: 8a41c2d7e093
+Revises: 36e3dc1386fe
+Create Date: 2026-10-17 14:02:37.514882
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41c2d7e093'
+down_revision = '36e3dc1386fe'
+branch_labels = None
+depends_on = None
+
+COUNTERS = ['rating_sum', 'rating_count', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade():
+    for name in COUNTERS:
+        op.add_column('property', sa.Column(name, sa.Integer(), server_default='0', nullable=False))
+    op.add_column('property', sa.Column('rating_avg', sa.Float(), server_default='0', nullable=False))
+    op.create_index('ix_property_rating_avg_id', 'property', ['rating_avg', 'id'], unique=False)
+
+    # Backfill from existing reviews
+    op.execute("""
+        UPDATE property SET
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM review WHERE review.property_id = property.id),
+            rating_count = (SELECT COUNT(*) FROM review WHERE review.property_id = property.id),
+            rating_1 = (SELECT COUNT(*) FROM review WHERE review.property_id = property.id AND rating = 1),
+            rating_2 = (SELECT COUNT(*) FROM review WHERE review.property_id = property.id AND rating = 2),
+            rating_3 = (SELECT COUNT(*) FROM review WHERE review.property_id = property.id AND rating = 3),
+            rating_4 = (SELECT COUNT(*) FROM review WHERE review.property_id = property.id AND rating = 4),
+            rating_5 = (SELECT COUNT(*) FROM review WHERE review.property_id = property.id AND rating = 5)
+    """)
+    op.execute("UPDATE property SET rating_avg = rating_sum * 1.0 / rating_count WHERE rating_count > 0")
+
+
+def downgrade():
+    op.drop_index('ix_property_rating_avg_id', table_name='property')
+    op.drop_column('property', 'rating_avg')
+    for name in reversed(COUNTERS):
+        op.drop_column('property', name)
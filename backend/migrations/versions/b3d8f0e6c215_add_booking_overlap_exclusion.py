@@ -0,0 +1,36 @@
+"""Add booking overlap exclusion constraint (PostgreSQL)
+
+Revision ID: b3d8f0e6c215
+Revises: 5c7e9b1f2a64
+Create Date: 2026-10-17 16:04:52.381047
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8f0e6c215'
+down_revision = '5c7e9b1f2a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Database-level guarantee that two confirmed bookings of one property never overlap.
+    # SQLite has no exclusion constraints; there the per-property lock in the routes is the guard.
+    # Fails if the table already holds overlapping confirmed bookings: resolve those first.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute("""
+        ALTER TABLE booking ADD CONSTRAINT booking_no_overlap
+        EXCLUDE USING gist (property_id WITH =, daterange(check_in_date, check_out_date) WITH &&)
+        WHERE (status = 'confirmed')
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("ALTER TABLE booking DROP CONSTRAINT IF EXISTS booking_no_overlap")
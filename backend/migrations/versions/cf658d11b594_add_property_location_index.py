@@ -0,0 +1,26 @@
+"""Add property location index
+
+Revision ID: cf658d11b594
+Revises: e5597d59dbf9
+Create Date: 2026-10-17 10:03:27.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf658d11b594'
+down_revision = 'e5597d59dbf9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.create_index('ix_property_latitude_longitude', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_latitude_longitude')
@@ -0,0 +1,46 @@
+"""Add media job queue for background photo processing
+
+Revision ID: d41a7c2e9f05
+Revises: b3d8f0e6c215
+Create Date: 2026-10-17 17:12:36.218904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a7c2e9f05'
+down_revision = 'b3d8f0e6c215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('property_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('staged_path', sa.String(length=500), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('url', sa.String(length=500), nullable=True),
+    sa.Column('asset_id', sa.String(length=255), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.ForeignKeyConstraint(['property_id'], ['property.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_media_job_status_run_after', 'media_job', ['status', 'run_after', 'id'], unique=False)
+    op.create_index('ix_media_job_property_id_position', 'media_job', ['property_id', 'position'], unique=False)
+    op.add_column('property', sa.Column('photos_status', sa.String(length=20), server_default='ready', nullable=False))
+
+
+def downgrade():
+    op.drop_column('property', 'photos_status')
+    op.drop_index('ix_media_job_property_id_position', table_name='media_job')
+    op.drop_index('ix_media_job_status_run_after', table_name='media_job')
+    op.drop_table('media_job')
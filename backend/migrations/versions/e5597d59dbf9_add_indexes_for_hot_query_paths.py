@@ -0,0 +1,53 @@
+"""Add indexes for hot query paths
+
+Revision ID: e5597d59dbf9
+Revises: 10b61cae8926
+Create Date: 2026-10-17 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5597d59dbf9'
+down_revision = '10b61cae8926'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # user.email is already covered by the index behind its unique constraint.
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.create_index('ix_property_created_at_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_property_host_id_created_at', ['host_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_property_price_per_night', ['price_per_night'], unique=False)
+        batch_op.create_index('ix_property_num_bedrooms', ['num_bedrooms'], unique=False)
+        batch_op.create_index('ix_property_max_guests', ['max_guests'], unique=False)
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_property_status_dates', ['property_id', 'status', 'check_in_date', 'check_out_date'], unique=False)
+        batch_op.create_index('ix_booking_status_dates_property', ['status', 'check_in_date', 'check_out_date', 'property_id'], unique=False)
+        batch_op.create_index('ix_booking_guest_id_check_in', ['guest_id', 'check_in_date', 'id'], unique=False)
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index('ix_review_property_id_created_at', ['property_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_review_guest_id_property_id', ['guest_id', 'property_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_guest_id_property_id')
+        batch_op.drop_index('ix_review_property_id_created_at')
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_guest_id_check_in')
+        batch_op.drop_index('ix_booking_status_dates_property')
+        batch_op.drop_index('ix_booking_property_status_dates')
+
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_max_guests')
+        batch_op.drop_index('ix_property_num_bedrooms')
+        batch_op.drop_index('ix_property_price_per_night')
+        batch_op.drop_index('ix_property_host_id_created_at')
+        batch_op.drop_index('ix_property_created_at_id')
@@ -0,0 +1,44 @@
+"""Add webhook event inbox
+
+Revision ID: f6c3a8e1b257
+Revises: 7e2b5d9c4a18
+Create Date: 2026-10-17 19:26:10.402318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c3a8e1b257'
+down_revision = '7e2b5d9c4a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('webhook_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dedup_key', sa.String(length=200), nullable=False),
+    sa.Column('event', sa.String(length=64), nullable=True),
+    sa.Column('reference', sa.String(length=100), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('lease_token', sa.String(length=32), nullable=True),
+    sa.Column('outcome', sa.String(length=500), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dedup_key')
+    )
+    op.create_index('ix_webhook_event_status_run_after', 'webhook_event', ['status', 'run_after', 'id'], unique=False)
+    op.create_index(op.f('ix_webhook_event_reference'), 'webhook_event', ['reference'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_webhook_event_reference'), table_name='webhook_event')
+    op.drop_index('ix_webhook_event_status_run_after', table_name='webhook_event')
+    op.drop_table('webhook_event')
@@ -1,7 +1,8 @@
 from app import create_app
 
-app = create_app()
-
+# `flask run` (FLASK_APP=run.py) finds the create_app factory by name. WSGI servers load
+# wsgi:app. The app is only built here when run directly: spawned child processes import
+# this module as __mp_main__, and must not start an app of their own.
 if __name__ == '__main__':
     # Use debug=True from .flaskenv or environment variable if preferred
-    app.run()
\ No newline at end of file
+    create_app().run()
@@ -0,0 +1,20 @@
+import pytest
+
+from app.amenities import power_backup_sources
+
+
+@pytest.mark.parametrize('details, expected', [
+    ('Generator (6pm-7am)', ['generator']),
+    ('Solar Inverter (24/7)', ['inverter', 'solar', '24/7']),
+    ('NEPA + Genset', ['generator', 'phcn']),
+    ('No generator', []),
+    ('without an inverter', []),
+    ('no backup generator, solar only', ['solar']),
+    ('Generator but no inverter', ['generator']),
+    ('off-grid solar', ['solar']),
+    ('gridlock area', []),
+    ('None', []),
+    (None, []),
+])
+def test_power_backup_sources(details, expected):
+    assert power_backup_sources(details) == expected
@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+from sqlalchemy import event, text
+
+from app import db
+from app.availability import get_availability_index
+
+
+def test_reload_does_not_erase_a_confirm_that_lands_during_it(migrated_app, factory):
+    """ Cancel A reloads the property; booking B is confirmed between that reload's query and its write. """
+    host, guest = factory.user('host'), factory.user('guest')
+    listing = factory.listing(host)
+    start = date.today() + timedelta(days=10)
+    a = factory.booking(guest, listing, start, status='confirmed')
+    b = factory.booking(guest, listing, start + timedelta(days=5))
+    b_nights = (start + timedelta(days=5), start + timedelta(days=7))
+
+    with migrated_app.app_context():
+        index = get_availability_index()
+        index.rebuild()
+        assert index.booked_property_ids(start, start + timedelta(days=2)) == [listing]
+
+        engine = db.engine
+        interleaved = []
+
+        def confirm_b(conn, cursor, statement, parameters, context, executemany):
+            # Runs after the reload's SELECT has read its rows, before it takes the lock
+            if interleaved or 'FROM booking' not in statement:
+                return
+            interleaved.append(statement)
+            with engine.begin() as other:
+                other.execute(text("UPDATE booking SET status = 'confirmed' WHERE id = :id"), {'id': b})
+            index.mark_booked(listing, *b_nights)
+
+        db.session.execute(text("UPDATE booking SET status = 'cancelled' WHERE id = :id"), {'id': a})
+        db.session.commit()
+        event.listen(engine, 'after_cursor_execute', confirm_b)
+        try:
+            index.refresh_property(listing)
+        finally:
+            event.remove(engine, 'after_cursor_execute', confirm_b)
+
+        assert interleaved
+        assert index.booked_property_ids(*b_nights) == [listing]
+        assert index.booked_property_ids(start, start + timedelta(days=2)) == []
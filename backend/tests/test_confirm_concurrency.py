@@ -0,0 +1,54 @@
+import threading
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Booking
+
+
+def test_overlapping_confirms_from_two_threads(migrated_app, factory):
+    """ The host confirms two overlapping bookings at the same moment: one wins, the other gets 409. """
+    host, guest = factory.user('host'), factory.user('guest')
+    listing = factory.listing(host)
+    headers = factory.auth(host)
+
+    for round_number in range(5):
+        check_in = date.today() + timedelta(days=10 * (round_number + 1))
+        ids = [factory.booking(guest, listing, check_in, nights=3),
+               factory.booking(guest, listing, check_in + timedelta(days=1), nights=3)]
+        start = threading.Barrier(len(ids))
+        statuses = {}
+
+        def confirm(booking_id):
+            client = migrated_app.test_client()
+            start.wait()
+            statuses[booking_id] = client.patch(f'/api/host/bookings/{booking_id}/confirm', headers=headers).status_code
+
+        threads = [threading.Thread(target=confirm, args=(booking_id,)) for booking_id in ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        assert sorted(statuses.values()) == [200, 409], statuses
+        with migrated_app.app_context():
+            confirmed = [booking_id for booking_id in ids if db.session.get(Booking, booking_id).status == 'confirmed']
+        assert confirmed == [booking_id for booking_id, status in statuses.items() if status == 200]
+
+
+def test_exclusion_constraint_rejects_overlapping_confirmed_bookings(migrated_app, factory):
+    """ booking_no_overlap is the last line of defence on PostgreSQL, whatever the route does. """
+    with migrated_app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            pytest.skip("booking_no_overlap is PostgreSQL-only; set TEST_DATABASE_URL to a PostgreSQL database")
+    host, guest = factory.user('host'), factory.user('guest')
+    listing = factory.listing(host)
+    check_in = date.today() + timedelta(days=10)
+    factory.booking(guest, listing, check_in, nights=3, status='confirmed')
+    factory.booking(guest, listing, check_in + timedelta(days=3), nights=2, status='confirmed') # Back to back is fine
+    factory.booking(guest, listing, check_in + timedelta(days=1), nights=3, status='pending') # Pending may overlap
+
+    with pytest.raises(IntegrityError, match='booking_no_overlap'):
+        factory.booking(guest, listing, check_in + timedelta(days=1), nights=3, status='confirmed')
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def listing_with_bookings(factory):
+    host, guest = factory.user('host'), factory.user('guest')
+    listing = factory.listing(host)
+    factory.booking(guest, listing, date.today() - timedelta(days=10), status='confirmed') # Lets the guest review
+    pending = factory.booking(guest, listing, date.today() + timedelta(days=20))
+    return factory.auth(host), factory.auth(guest), listing, pending
+
+
+def _etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, url
+    assert response.headers.get('ETag'), url
+    return response.headers['ETag']
+
+
+@pytest.mark.parametrize('path', ['', '/reviews', '/booked-dates'])
+def test_matching_etag_gets_304(client, listing_with_bookings, path):
+    listing = listing_with_bookings[2]
+    url = f'/api/properties/{listing}{path}'
+    etag = _etag(client, url)
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_batch_booked_dates_gets_304(client, listing_with_bookings):
+    url = f'/api/properties/booked-dates?ids={listing_with_bookings[2]}'
+    etag = _etag(client, url)
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_review_changes_the_reviews_etag(client, listing_with_bookings):
+    _, as_guest, listing, _ = listing_with_bookings
+    url = f'/api/properties/{listing}/reviews'
+    before = _etag(client, url)
+
+    response = client.post(url, headers=as_guest, json={'rating': 4, 'comment': 'Quiet street'})
+    assert response.status_code == 201, response.get_json()
+
+    assert client.get(url, headers={'If-None-Match': before}).status_code == 200
+    assert _etag(client, url) != before
+
+
+def test_booking_status_change_changes_the_booked_dates_etags(client, listing_with_bookings):
+    as_host, _, listing, pending = listing_with_bookings
+    urls = [f'/api/properties/{listing}/booked-dates', f'/api/properties/booked-dates?ids={listing}']
+    before = [_etag(client, url) for url in urls]
+
+    assert client.patch(f'/api/host/bookings/{pending}/confirm', headers=as_host).status_code == 200
+    confirmed = [_etag(client, url) for url in urls]
+    for url, old, new in zip(urls, before, confirmed):
+        assert new != old, url
+        assert client.get(url, headers={'If-None-Match': old}).status_code == 200
+
+    assert client.patch(f'/api/host/bookings/{pending}/cancel', headers=as_host).status_code == 200
+    for url, old in zip(urls, confirmed):
+        assert _etag(client, url) != old, url
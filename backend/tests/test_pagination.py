@@ -0,0 +1,45 @@
+import base64
+import json
+
+import pytest
+
+
+def _page_through(client, url):
+    ids, cursor, pages = [], None, 0
+    while True:
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        ids += [item['id'] for item in body['items']]
+        pages += 1
+        cursor = body['next_cursor']
+        if not cursor:
+            return ids, pages
+
+
+@pytest.mark.parametrize('sort', ['newest', 'rating'])
+def test_cursor_pages_have_no_duplicates_or_gaps_under_ties(client, factory, sort):
+    host = factory.user('host')
+    # Created within the same second (SQLite stores whole seconds) and all unrated: every sort value ties
+    listing_ids = [factory.listing(host) for _ in range(23)]
+
+    ids, pages = _page_through(client, f'/api/properties?sort={sort}&limit=5')
+
+    assert sorted(ids) == sorted(listing_ids)
+    assert len(ids) == len(set(ids))
+    assert pages == 5
+
+
+def _cursor(packed):
+    return base64.urlsafe_b64encode(json.dumps(packed).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-a-cursor',
+    _cursor([{'v': 1}]), # Wrong number of keys
+    _cursor([{'t': 'dt', 'v': '2026-01-01T00:00:00'}, {'v': [1, 2]}]),
+    _cursor([{'t': 'dt', 'v': '2026-01-01T00:00:00'}, {'v': {'id': 1}}]),
+])
+def test_bad_cursor_is_a_400(client, factory, cursor):
+    factory.listing(factory.user('host'))
+    assert client.get(f'/api/properties?cursor={cursor}').status_code == 400
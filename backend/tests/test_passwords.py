@@ -0,0 +1,51 @@
+import threading
+
+from app import bcrypt, db, passwords
+from app.models import User
+
+
+def _login(client, email, password='secret123'):
+    return client.post('/api/auth/login', json={'email': email, 'password': password})
+
+
+def test_login_rehashes_a_password_made_at_another_cost(migrated_app, client, factory):
+    user_id = factory.user()
+    with migrated_app.app_context():
+        user = db.session.get(User, user_id)
+        user.password_hash = bcrypt.generate_password_hash('secret123', 5).decode('utf-8') # Tests hash at cost 4
+        db.session.commit()
+        email = user.email
+
+    assert _login(client, email).status_code == 200
+    with migrated_app.app_context():
+        assert passwords.hash_rounds(db.session.get(User, user_id).password_hash) == 4
+    assert _login(client, email).status_code == 200
+    assert _login(client, email, 'wrong').status_code == 401
+
+
+def test_login_gets_503_while_every_hashing_slot_is_taken(migrated_app, client, factory):
+    migrated_app.extensions['password_hashing'] = limiter = passwords.HashingLimiter(concurrency=1)
+    with migrated_app.app_context():
+        email = db.session.get(User, factory.user(password='secret123')).email
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(10)
+    holder = threading.Thread(target=limiter.run, args=(slow_hash,))
+    holder.start()
+    try:
+        assert started.wait(10)
+        response = _login(client, email)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+        assert client.post('/api/auth/register', json={
+            'email': 'new@example.com', 'password': 'secret123', 'first_name': 'New', 'last_name': 'User',
+        }).status_code == 503
+        assert limiter.rejected == 2
+    finally:
+        release.set()
+        holder.join(10)
+
+    assert _login(client, email).status_code == 200
@@ -0,0 +1,8 @@
+def test_gateway_stats_are_for_hosts_only(client, factory):
+    url = '/api/payments/gateway/stats'
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers=factory.auth(factory.user('guest'))).status_code == 403
+
+    response = client.get(url, headers=factory.auth(factory.user('host')))
+    assert response.status_code == 200
+    assert isinstance(response.get_json(), dict)
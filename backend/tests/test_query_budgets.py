@@ -0,0 +1,70 @@
+"""
+Query budgets of the list endpoints.
+
+Calls every @query_budget endpoint at two data sizes and fails if its query count grows
+with the number of rows returned, which is what an N+1 lazy load looks like. A view that
+goes over its budget raises QueryBudgetExceeded under TESTING, which fails the request.
+"""
+from datetime import date, timedelta
+
+from app.query_budget import BUDGETS
+
+
+class Listings:
+    """
+    One host and `size` guests and properties. Guest 0 books every property; every other
+    guest books property 0, and every guest reviews property 0. So each listing below returns
+    `size` rows that all point at different related rows.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.host = factory.user('host')
+        self.guests, self.properties = [], []
+        self.booked_by_first = set()
+        self.next_stay = date.today() - timedelta(days=300)
+
+    def _stay(self, guest, prop):
+        self.factory.booking(guest, prop, self.next_stay, nights=1, status='confirmed', payment_status='paid')
+        self.next_stay += timedelta(days=1) # Never overlapping, so PostgreSQL's exclusion constraint is happy
+
+    def grow(self, size):
+        while len(self.guests) < size:
+            guest = self.factory.user('guest')
+            self.guests.append(guest)
+            if not self.properties:
+                self.properties.append(self.factory.listing(self.host))
+            if len(self.guests) > 1:
+                self._stay(guest, self.properties[0])
+            self.factory.review(guest, self.properties[0])
+        while len(self.properties) < size:
+            self.properties.append(self.factory.listing(self.host))
+        for prop in set(self.properties) - self.booked_by_first:
+            self._stay(self.guests[0], prop)
+            self.booked_by_first.add(prop)
+
+
+def test_budgeted_endpoints_run_constant_queries(migrated_app, client, factory):
+    migrated_app.config['QUERY_COUNT_HEADER'] = True
+    listings = Listings(factory)
+    counts = {} # endpoint -> [query count per size]
+    for size in (2, 15):
+        listings.grow(size)
+        as_host, as_guest = factory.auth(listings.host), factory.auth(listings.guests[0])
+        requests_to_make = [
+            ('get_my_bookings', '/api/my-bookings', as_guest),
+            ('get_host_bookings', '/api/host/bookings', as_host),
+            ('get_reviews', f'/api/properties/{listings.properties[0]}/reviews', {}),
+        ]
+        for headers in (as_host, as_guest):
+            client.get('/api/auth/profile', headers=headers) # Warm the current-user cache, as in steady state
+        for endpoint, url, headers in requests_to_make:
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, (url, response.get_json())
+            assert len(response.get_json()['items'] if endpoint != 'get_reviews' else response.get_json()) >= size
+            counts.setdefault(endpoint, []).append(int(response.headers['X-Query-Count']))
+
+    assert set(counts) <= set(BUDGETS)
+    for endpoint, by_size in counts.items():
+        assert len(set(by_size)) == 1, f"{endpoint}: query count grows with the number of rows {by_size}"
+        assert by_size[0] <= BUDGETS[endpoint], f"{endpoint}: over budget of {BUDGETS[endpoint]}"
@@ -0,0 +1,93 @@
+import pytest
+
+from app import create_app
+from app.ratelimit import MemoryBackend, RateLimiter, Rule, SQLiteBackend, _take
+
+
+def _enable(app, rules):
+    limiter = app.extensions['rate_limiter']
+    limiter.enabled = True
+    limiter.rules = {scope: Rule(text) if text else None for scope, text in rules.items()}
+    limiter.backend.reset()
+    return limiter
+
+
+def _login(client, **kwargs):
+    return client.post('/api/auth/login', json={'email': 'nobody@example.com', 'password': 'wrong'}, **kwargs)
+
+
+def test_rule_parsing():
+    rule = Rule('100/5minutes')
+    assert (rule.limit, rule.period) == (100, 300)
+    assert Rule('10 / minute').rate == pytest.approx(10 / 60)
+    with pytest.raises(ValueError):
+        Rule('10 per minute')
+
+
+def test_token_bucket_spends_then_refills():
+    rule = Rule('3/30seconds') # Refills one token every 10 seconds
+    tokens, updated = rule.limit, 0.0
+    for _ in range(3):
+        tokens, allowed, _ = _take(tokens, updated, 0.0, rule)
+        assert allowed
+    tokens, allowed, retry_after = _take(tokens, updated, 0.0, rule)
+    assert not allowed
+    assert retry_after == pytest.approx(10)
+
+    tokens, allowed, _ = _take(tokens, 0.0, 10.0, rule) # One token back after 10 seconds
+    assert allowed
+    assert _take(tokens, 10.0, 10.0, rule)[1] is False
+    assert _take(0.0, 0.0, 1000.0, rule)[0] == pytest.approx(rule.limit - 1) # Never above the limit
+
+
+def test_most_specific_rule_wins():
+    limiter = RateLimiter(MemoryBackend(), {'api': '300/minute', 'api.get_properties': '120/minute',
+                                            'api.get_media': None, 'auth': '300/minute'})
+    scope, rule = limiter.rule_for('api.get_properties')
+    assert (scope, rule.limit) == ('api.get_properties', 120)
+    scope, rule = limiter.rule_for('api.get_property')
+    assert (scope, rule.limit) == ('api', 300)
+    assert limiter.rule_for('api.get_media') == ('api.get_media', None) # Exempt
+    assert limiter.rule_for('static') == (None, None)
+
+
+def test_over_the_limit_gets_429_with_retry_after(migrated_app, client):
+    limiter = _enable(migrated_app, {'auth': '100/minute', 'auth.login_user': '2/minute'})
+    assert [_login(client).status_code for _ in range(2)] == [401, 401]
+
+    response = _login(client)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 30
+    assert limiter.rejected == 1
+
+    assert _login(client, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code == 401 # Another client
+    assert client.get('/api/auth/profile').status_code == 401 # Another rule: the view ran
+
+
+def test_requests_with_a_jwt_are_counted_per_user(migrated_app, client, factory):
+    _enable(migrated_app, {'auth': '2/minute'})
+    first, second = factory.auth(factory.user()), factory.auth(factory.user())
+    assert [client.get('/api/auth/profile', headers=first).status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get('/api/auth/profile', headers=second).status_code == 200 # Same address, other user
+
+
+def test_sqlite_backend_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'buckets.sqlite')
+    worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path) # Two processes on one host
+    rule = Rule('3/minute')
+    assert [worker_a.hit('ip:1', rule)[0], worker_b.hit('ip:1', rule)[0], worker_a.hit('ip:1', rule)[0]] == [True] * 3
+    allowed, retry_after = worker_b.hit('ip:1', rule)
+    assert not allowed and 0 < retry_after <= 20
+    assert worker_a.hit('ip:2', rule)[0]
+
+
+def test_proxy_fix_setting_limits_by_forwarded_address(migrated_app):
+    proxied = create_app(type('BehindProxy', (), dict(migrated_app.config, PROXY_FIX_X_FOR=1)))
+    try:
+        _enable(proxied, {'auth.login_user': '1/minute'})
+        client = proxied.test_client()
+        assert _login(client, headers={'X-Forwarded-For': '203.0.113.1'}).status_code == 401
+        assert _login(client, headers={'X-Forwarded-For': '203.0.113.1'}).status_code == 429
+        assert _login(client, headers={'X-Forwarded-For': '203.0.113.2'}).status_code == 401 # Same proxy, other client
+    finally:
+        proxied.extensions['media_storage'].shutdown()
@@ -0,0 +1,70 @@
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import db, paystack, reconcile
+from app.models import Booking, Property
+from app.paystack_stub import run_stub
+
+
+@pytest.fixture
+def stub(migrated_app):
+    with run_stub() as server:
+        migrated_app.config['PAYSTACK_BASE_URL'] = server.url
+        paystack.init_app(migrated_app) # A client pointed at the stub
+        yield server
+
+
+def test_interrupted_run_resumes_and_verifies_each_reference_once(migrated_app, factory, stub, tmp_path, monkeypatch):
+    host, guest = factory.user('host'), factory.user('guest')
+    listing = factory.listing(host)
+    first_night = date.today() + timedelta(days=5)
+    references = [f'ref_{i}' for i in range(10)]
+    bookings = {reference: factory.booking(guest, listing, first_night + timedelta(days=i), nights=1,
+                                           status='confirmed', payment_status='unpaid', paystack_reference=reference)
+                for i, reference in enumerate(references)}
+    for reference in references[:6]:
+        stub.set_transaction(reference, 'success', 10000) # 100.0 a night, in kobo
+    for reference in references[6:8]:
+        stub.set_transaction(reference, 'abandoned', 10000) # ref_8 and ref_9 were never seen by Paystack
+
+    with migrated_app.app_context():
+        engine = db.engine
+        client = paystack.get_paystack()
+        version_before = db.session.get(Property, listing).booking_version
+    verified = Counter()
+    verify = client.verify_transaction
+
+    def recording_verify(reference):
+        verified[reference] += 1
+        if reference == 'ref_4': # Its webhook lands while the batch is being verified
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE booking SET payment_status = 'paid' WHERE id = :id"), {'id': bookings[reference]})
+        return verify(reference)
+    monkeypatch.setattr(client, 'verify_transaction', recording_verify)
+
+    applied = []
+    apply_charge_success = reconcile.apply_charge_success
+    monkeypatch.setattr(reconcile, 'apply_charge_success', lambda data: applied.append(data['reference'])
+                        or apply_charge_success(data))
+
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    with migrated_app.app_context():
+        first = reconcile.reconcile_payments(checkpoint, batch_size=3, concurrency=2, rate=0, max_batches=2)
+        assert (first['batches'], first['last_id']) == (2, bookings['ref_5'])
+        assert not first.get('finished')
+
+        totals = reconcile.reconcile_payments(checkpoint, batch_size=3, concurrency=2, rate=0)
+        paid = sorted(reference for reference, in db.session.query(Booking.paystack_reference)
+                      .filter_by(payment_status='paid'))
+        version_after = db.session.get(Property, listing).booking_version
+
+    assert verified == Counter(references) # Every reference once, none again after the resume
+    assert totals['finished']
+    assert {name: totals[name] for name in reconcile.COUNTERS} == {
+        'checked': 10, 'paid': 5, 'already_paid': 1, 'not_paid': 2, 'not_found': 2, 'mismatched': 0, 'errors': 0}
+    assert paid == references[:6]
+    assert 'ref_4' not in applied # Skipped before taking the property lock
+    assert version_after == version_before + 5 # One bump per booking actually applied
@@ -0,0 +1,96 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app import create_app, db
+from app.models import RevokedToken, User
+from app.revocation import _utcnow
+
+
+def _profile(client, headers):
+    return client.get('/api/auth/profile', headers=headers).status_code
+
+
+@pytest.fixture
+def user(factory):
+    return factory.user(password='secret123')
+
+
+def _login(client, user_id, migrated_app):
+    with migrated_app.app_context():
+        email = db.session.get(User, user_id).email
+    tokens = client.post('/api/auth/login', json={'email': email, 'password': 'secret123'}).get_json()
+    return {'Authorization': 'Bearer ' + tokens['access_token']}, {'Authorization': 'Bearer ' + tokens['refresh_token']}
+
+
+def test_revoked_refresh_token_cannot_refresh(migrated_app, client, user):
+    access, refresh = _login(client, user, migrated_app)
+    assert client.post('/api/auth/refresh', headers=refresh).status_code == 200
+
+    assert client.post('/api/auth/logout', headers=refresh).status_code == 200
+    response = client.post('/api/auth/refresh', headers=refresh)
+    assert response.status_code == 401
+    assert response.get_json()['message'].startswith('Token has been revoked')
+    assert _profile(client, access) == 200 # Only the presented token is revoked
+
+    _, new_refresh = _login(client, user, migrated_app)
+    assert client.post('/api/auth/refresh', headers=new_refresh).status_code == 200
+
+
+def test_logout_all_revokes_tokens_issued_before_it_only(migrated_app, client, user, factory):
+    access, refresh = _login(client, user, migrated_app)
+    other_device = factory.auth(user)
+
+    assert client.post('/api/auth/logout-all', headers=access).status_code == 200
+    time.sleep(0.002) # Watermarks have millisecond resolution
+    after = factory.auth(user)
+
+    assert _profile(client, access) == 401
+    assert _profile(client, other_device) == 401
+    assert client.post('/api/auth/refresh', headers=refresh).status_code == 401
+    assert _profile(client, after) == 200
+    _, new_refresh = _login(client, user, migrated_app)
+    assert client.post('/api/auth/refresh', headers=new_refresh).status_code == 200
+
+
+def test_other_instances_see_a_revocation_after_the_sync_interval(migrated_app, client, user, factory):
+    migrated_app.config['REVOCATION_SYNC_INTERVAL'] = 1.0
+    other_app = create_app(type('OtherWorker', (), dict(migrated_app.config))) # Same database and secrets
+    other_client = other_app.test_client()
+    headers = factory.auth(user)
+    try:
+        assert _profile(other_client, headers) == 200 # Loads its revocation list
+
+        assert client.post('/api/auth/logout', headers=headers).status_code == 200
+        assert _profile(client, headers) == 401 # At once where it was revoked
+        assert _profile(other_client, headers) == 200 # Not synced yet
+
+        time.sleep(1.1)
+        assert _profile(other_client, headers) == 401
+    finally:
+        other_app.extensions['media_storage'].shutdown()
+
+
+def test_prune_deletes_only_expired_revocations(migrated_app, factory):
+    recent, stale = factory.user(), factory.user()
+    now = _utcnow()
+    with migrated_app.app_context():
+        db.session.add_all([
+            RevokedToken(jti='expired', user_id=recent, token_type='refresh', expires_at=now - timedelta(minutes=1),
+                         revoked_at=now - timedelta(days=2)),
+            RevokedToken(jti='live', user_id=recent, token_type='refresh', expires_at=now + timedelta(days=1),
+                         revoked_at=now - timedelta(days=2)),
+        ])
+        db.session.get(User, recent).tokens_valid_after = now - timedelta(days=1)
+        db.session.get(User, stale).tokens_valid_after = now - timedelta(days=60) # Older than any refresh token
+        db.session.commit()
+
+    result = migrated_app.test_cli_runner().invoke(args=['prune-revoked-tokens'])
+    assert result.exit_code == 0, result.output
+    assert 'Pruned 1 expired revoked token(s) and 1 stale logout-all marker(s).' in result.output
+
+    with migrated_app.app_context():
+        assert [jti for jti, in db.session.query(RevokedToken.jti)] == ['live']
+        assert db.session.get(User, recent).tokens_valid_after is not None
+        assert db.session.get(User, stale).tokens_valid_after is None
@@ -0,0 +1,114 @@
+import json
+from datetime import timedelta
+
+import pytest
+
+from app import db, webhooks
+from app.models import WebhookEvent
+
+
+def _charge(reference, event='charge.success'):
+    return {'event': event, 'data': {'reference': reference, 'status': 'success', 'amount': 20000}}
+
+
+@pytest.fixture
+def stored_event(migrated_app):
+    """ One pending charge.success event for an unknown reference; returns its id. """
+    with migrated_app.app_context():
+        payload = _charge('ref_1')
+        assert webhooks.record(json.dumps(payload).encode(), payload)
+        return WebhookEvent.query.one().id
+
+
+@pytest.fixture
+def failing_handler(monkeypatch):
+    def fail(data):
+        raise RuntimeError('gateway exploded')
+    monkeypatch.setitem(webhooks.HANDLERS, 'charge.success', fail)
+
+
+def _event(event_id):
+    db.session.expire_all()
+    return db.session.get(WebhookEvent, event_id)
+
+
+def _make_due(event_id):
+    WebhookEvent.query.filter_by(id=event_id).update({WebhookEvent.run_after: webhooks._utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+
+def test_resent_event_is_stored_once(migrated_app, client, signed_webhook):
+    for payload in (_charge('ref_1'), _charge('ref_1'), _charge('ref_2'), _charge('ref_1', event='refund.processed')):
+        response = client.post('/api/payment/webhook', **signed_webhook(payload))
+        assert response.status_code == 200
+
+    with migrated_app.app_context():
+        keys = sorted(key for key, in db.session.query(WebhookEvent.dedup_key))
+    assert keys == ['charge.success:ref_1', 'charge.success:ref_2', 'refund.processed:ref_1']
+
+
+def test_unsigned_event_is_not_stored(migrated_app, client):
+    response = client.post('/api/payment/webhook', json=_charge('ref_1'), headers={'x-paystack-signature': 'forged'})
+    assert response.status_code == 400
+    with migrated_app.app_context():
+        assert WebhookEvent.query.count() == 0
+
+
+def test_expired_lease_is_reclaimed_and_the_old_holder_cannot_finish(migrated_app, stored_event):
+    with migrated_app.app_context():
+        old_token, claimed = webhooks.claim_batch(10)
+        assert claimed == [stored_event]
+        assert webhooks.claim_batch(10)[1] == [] # Leased to the first processor
+
+        WebhookEvent.query.filter_by(id=stored_event).update(
+            {WebhookEvent.locked_until: webhooks._utcnow() - timedelta(seconds=1)}) # That processor died
+        db.session.commit()
+        new_token, reclaimed = webhooks.claim_batch(10)
+        assert reclaimed == [stored_event]
+        assert new_token != old_token
+        assert _event(stored_event).attempts == 2
+
+        webhooks.process(stored_event, old_token) # The first processor wakes up late
+        assert _event(stored_event).status == 'processing'
+        webhooks.process(stored_event, new_token)
+        event = _event(stored_event)
+        assert (event.status, event.outcome) == ('ignored', 'Unknown reference')
+
+
+def test_failures_back_off_then_go_dead(migrated_app, stored_event, failing_handler):
+    migrated_app.config.update(WEBHOOK_MAX_ATTEMPTS=3, WEBHOOK_RETRY_DELAY=30)
+    with migrated_app.app_context():
+        for attempt, delay in ((1, 30), (2, 60)):
+            before = webhooks._utcnow()
+            assert webhooks.run_pending() == 1
+            event = _event(stored_event)
+            assert (event.status, event.attempts) == ('pending', attempt)
+            assert event.outcome == 'RuntimeError: gateway exploded'
+            assert timedelta(seconds=delay - 1) <= event.run_after - before <= timedelta(seconds=delay + 1)
+            assert webhooks.run_pending() == 0 # Not due again until the backoff has passed
+            _make_due(stored_event)
+
+        assert webhooks.run_pending() == 1
+        event = _event(stored_event)
+        assert (event.status, event.attempts) == ('dead', 3)
+        _make_due(stored_event)
+        assert webhooks.run_pending() == 0
+        assert [dead.id for dead in webhooks.dead_letters()] == [stored_event]
+
+
+def test_retry_all_dead_requeues_dead_events(migrated_app, stored_event):
+    with migrated_app.app_context():
+        WebhookEvent.query.filter_by(id=stored_event).update({WebhookEvent.status: 'dead', WebhookEvent.attempts: 5})
+        db.session.commit()
+
+    runner = migrated_app.test_cli_runner()
+    assert runner.invoke(args=['webhooks', 'retry']).exit_code != 0 # Needs ids or --all-dead
+    result = runner.invoke(args=['webhooks', 'retry', '--all-dead'])
+    assert result.exit_code == 0, result.output
+    assert 'Requeued 1 event(s).' in result.output
+
+    with migrated_app.app_context():
+        event = _event(stored_event)
+        assert (event.status, event.attempts, event.lease_token) == ('pending', 0, None)
+        assert webhooks.run_pending() == 1
+        assert _event(stored_event).status == 'ignored'
@@ -0,0 +1,17 @@
+import multiprocessing
+
+from app.workers import starts_at_boot
+
+
+def test_starts_at_boot_under_a_wsgi_server_only_in_the_serving_process(migrated_app, monkeypatch):
+    migrated_app.config['BACKGROUND_THREADS'] = True
+    assert starts_at_boot(migrated_app) # No click context: a WSGI server imported the app
+
+    # A spawned pool process that re-imports the entry module must not start threads of its own
+    monkeypatch.setattr(multiprocessing, 'parent_process', lambda: object())
+    assert not starts_at_boot(migrated_app)
+
+
+def test_background_threads_setting_turns_boot_start_off(migrated_app):
+    migrated_app.config['BACKGROUND_THREADS'] = False
+    assert not starts_at_boot(migrated_app)
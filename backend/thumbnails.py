@@ -0,0 +1,37 @@
+"""
+Card thumbnail rendering for LocalStorage's process pool.
+
+Deliberately outside the app package and free of Flask and database imports: pool
+processes are spawned, and a spawned child imports whatever module the submitted function
+lives in. Keeping it here means a child loads Pillow and nothing else, never the app.
+"""
+import os
+
+CARD_SIZE = (640, 480) # Thumbnails fit inside this box, keeping the aspect ratio
+
+
+def render_thumbnails(path):
+    """
+    Writes the card thumbnails (JPEG and WebP) next to the image at path and returns their
+    paths, or None if the image could not be read. Runs in the thumbnail process pool.
+    """
+    from PIL import Image, ImageOps
+
+    base = path.rsplit('.', 1)[0]
+    targets = [(base + '.card.jpg', 'JPEG'), (base + '.card.webp', 'WEBP')]
+    if all(os.path.exists(target) for target, _ in targets):
+        return [target for target, _ in targets] # Rendered by an earlier attempt at this upload
+    try:
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image) # Phone photos carry their rotation in EXIF
+            image.thumbnail(CARD_SIZE)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            for target, image_format in targets:
+                partial = f'{target}.{os.getpid()}.part'
+                image.save(partial, image_format, quality=80)
+                os.replace(partial, target)
+    except (OSError, ValueError) as e: # Not an image Pillow can read
+        print(f"Could not render thumbnails for {path}: {e}")
+        return None
+    return [target for target, _ in targets]
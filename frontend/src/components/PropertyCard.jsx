@@ -11,25 +11,37 @@ function PropertyCard({ property }) {
       city: 'Placeholder City',
       state: 'State',
       price_per_night: 0,
-      listing_photos: [] // Use an empty array for photos initially
+      listing_thumbnails: [] // Use an empty array for photos initially
   };
 
-  // Use a placeholder image if no photos are available
-  const imageUrl = displayData.listing_photos && displayData.listing_photos.length > 0
-      ? displayData.listing_photos[0] // Use the first photo URL
+  // Cards use the card-size thumbnail of the first photo (WebP when the browser supports it)
+  const thumbnail = displayData.listing_thumbnails && displayData.listing_thumbnails.length > 0
+      ? displayData.listing_thumbnails[0]
+      : null;
+  const imageUrl = thumbnail
+      ? thumbnail.url
       : 'https://via.placeholder.com/300x200.png?text=Shortlet+Image'; // Placeholder
 
   return (
     <div className="border rounded-lg overflow-hidden shadow-lg hover:shadow-xl transition-shadow duration-300">
       <Link to={`/properties/${displayData.id}`}>
-        <img
-          src={imageUrl}
-          alt={`View of ${displayData.title}`}
-          className="w-full h-48 object-cover" // Fixed height, cover scaling
-        />
+        <picture>
+          {thumbnail?.webp && <source srcSet={thumbnail.webp} type="image/webp" />}
+          <img
+            src={imageUrl}
+            alt={`View of ${displayData.title}`}
+            loading="lazy"
+            className="w-full h-48 object-cover" // Fixed height, cover scaling
+          />
+        </picture>
         <div className="p-4">
           <h3 className="font-semibold text-lg truncate">{displayData.title}</h3>
           <p className="text-sm text-gray-600">{displayData.city}, {displayData.state}</p>
+          {displayData.rating_count > 0 && (
+            <p className="text-sm text-gray-700">
+              {displayData.rating_avg.toFixed(1)} ★ <span className="text-gray-500">({displayData.rating_count})</span>
+            </p>
+          )}
           <p className="mt-2 font-bold">
             ₦{displayData.price_per_night.toLocaleString()} <span className="font-normal text-sm text-gray-500">/ night</span>
           </p>
@@ -1,6 +1,6 @@
 import React, { createContext, useState, useContext, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import apiClient, { getProfile } from '../services/apiService';
+import apiClient, { getProfile, logoutSession } from '../services/apiService';
 import eventEmitter from '../utils/eventEmitter';
 
 const AuthContext = createContext(null);
@@ -96,6 +96,10 @@ export const AuthProvider = ({ children }) => {
 
   // --- Logout Function ---
   const logout = () => {
+    // Revoke the refresh token server-side; clear local state whether or not that succeeds
+    if (refreshToken) {
+      logoutSession(refreshToken).catch(err => console.error("Logout request failed:", err.response?.data || err.message));
+    }
     // Clear state, which triggers useEffect to clear storage/headers
     setUser(null);
     setToken(null);
@@ -147,7 +147,10 @@ function CreateListingPage() {
     try {
       // Pass FormData to API service - ensure apiService handles multipart/form-data header
       const response = await createProperty(formData);
-      setSuccessMessage('Property created successfully!');
+      // 202 means the photos were accepted and are still being processed in the background
+      setSuccessMessage(response.status === 202
+        ? 'Property created! Your photos are processing and will appear shortly.'
+        : 'Property created successfully!');
 
       // Clear form state on success
       setTitle('');
@@ -1,13 +1,14 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext'; // Use auth context directly
-import { getProfile } from '../services/apiService'; // Use API service if context doesn't have all info
+import { getProfile, getHostAnalytics } from '../services/apiService'; // Use API service if context doesn't have all info
 
 function DashboardPage() {
   const { user } = useAuth(); // Get basic user info from context first
   const [profileData, setProfileData] = useState(null); // More detailed profile if needed
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [analytics, setAnalytics] = useState(null); // Host stats for the last 30 nights
 
   useEffect(() => {
     // Fetch detailed profile info if needed, or just use context user
@@ -26,6 +27,11 @@ function DashboardPage() {
     };
 
     fetchProfile();
+
+    // Host analytics are optional; the dashboard still works without them
+    getHostAnalytics()
+      .then((response) => setAnalytics(response.data))
+      .catch((err) => console.error("Error fetching host analytics:", err));
     // Alternatively, if context 'user' has everything:
     // setProfileData(user);
     // setIsLoading(false);
@@ -64,6 +70,42 @@ function DashboardPage() {
         </Link>
       </div>
 
+      {/* Host Analytics Section (last 30 nights) */}
+      {analytics && analytics.properties.length > 0 && (
+        <div className="bg-white p-6 rounded-lg shadow mb-6 border">
+          <h2 className="text-xl font-semibold mb-1">Your Listings: Last 30 Nights</h2>
+          <p className="text-sm text-gray-600 mb-4">
+            Occupancy {(analytics.totals.occupancy_rate * 100).toFixed(0)}% · Revenue ₦{analytics.totals.revenue.toLocaleString()}
+          </p>
+          <div className="overflow-x-auto">
+            <table className="min-w-full text-sm">
+              <thead>
+                <tr className="text-left text-gray-500 border-b">
+                  <th className="py-2 pr-4">Listing</th>
+                  <th className="py-2 pr-4">Occupancy</th>
+                  <th className="py-2 pr-4">Revenue</th>
+                  <th className="py-2 pr-4">Avg. Nightly Rate</th>
+                  <th className="py-2 pr-4">Avg. Lead Time</th>
+                  <th className="py-2">Bookings</th>
+                </tr>
+              </thead>
+              <tbody>
+                {analytics.properties.map((row) => (
+                  <tr key={row.property_id} className="border-b last:border-0">
+                    <td className="py-2 pr-4">{row.title}</td>
+                    <td className="py-2 pr-4">{(row.occupancy_rate * 100).toFixed(0)}%</td>
+                    <td className="py-2 pr-4">₦{row.revenue.toLocaleString()}</td>
+                    <td className="py-2 pr-4">{row.average_daily_rate != null ? `₦${row.average_daily_rate.toLocaleString()}` : '-'}</td>
+                    <td className="py-2 pr-4">{row.average_lead_time_days != null ? `${row.average_lead_time_days} days` : '-'}</td>
+                    <td className="py-2">{row.bookings.confirmed} confirmed, {row.bookings.pending} pending, {row.bookings.cancelled} cancelled</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
+
       {/* Quick Links Section */}
       <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-4">
         {/* My Trips Card */}
@@ -10,6 +10,8 @@ function HostBookingsPage() {
   // Add state to track which booking action is loading
   const [actionLoading, setActionLoading] = useState(null); // Store the ID of booking being actioned
   const [actionError, setActionError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // Function to fetch bookings
   const fetchHostBookings = useCallback(async () => {
@@ -17,7 +19,8 @@ function HostBookingsPage() {
     setError(null);
     try {
       const response = await getHostBookings();
-      setBookings(response.data);
+      setBookings(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       console.error("Error fetching host bookings:", err);
       setError(err.response?.data?.message || "Could not load your property bookings.");
@@ -26,6 +29,21 @@ function HostBookingsPage() {
     }
   }, []);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await getHostBookings({ cursor: nextCursor });
+      setBookings(prev => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error("Error fetching host bookings:", err);
+      setError(err.response?.data?.message || "Could not load your property bookings.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Fetch bookings on component mount
   useEffect(() => {
     fetchHostBookings();
@@ -151,6 +169,18 @@ function HostBookingsPage() {
           ))}
         </div>
       )}
+      {nextCursor && !isLoading && (
+        <div className="text-center mt-6">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-4 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -9,6 +9,8 @@ function MyListingsPage() {
   const [error, setError] = useState(null);
   const [deleteError, setDeleteError] = useState(null);
   const [deletingId, setDeletingId] = useState(null); // Track which listing is being deleted
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   const navigate = useNavigate();
 
@@ -17,7 +19,8 @@ function MyListingsPage() {
     setError(null);
     try {
       const response = await getMyListings();
-      setListings(response.data);
+      setListings(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       setError("Failed to load your listings.");
       console.error("Fetch listings error:", err);
@@ -30,6 +33,21 @@ function MyListingsPage() {
     fetchListings();
   }, [fetchListings]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await getMyListings({ cursor: nextCursor });
+      setListings(prev => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      setError("Failed to load your listings.");
+      console.error("Fetch listings error:", err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (propertyId) => {
     // Confirmation dialog
     if (!window.confirm("Are you sure you want to delete this property listing? This action cannot be undone.")) {
@@ -94,6 +112,18 @@ function MyListingsPage() {
           ))}
         </div>
       )}
+      {nextCursor && !isLoading && (
+        <div className="text-center mt-6">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-4 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -19,6 +19,8 @@ function MyTripsPage() {
   const [reviewError, setReviewError] = useState('');
   // Track submitted reviews in this session to hide button
   const [reviewsSubmitted, setReviewsSubmitted] = useState({}); // { propertyId: true }
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // Define fetchBookings OUTSIDE useEffect, wrapped in useCallback
   // useCallback ensures the function reference doesn't change unless its dependencies do (none here)
@@ -31,7 +33,8 @@ function MyTripsPage() {
       console.log("MyTripsPage: Calling getMyBookings API...");
       const response = await getMyBookings();
       console.log("MyTripsPage: API call successful, response data:", response.data);
-      setBookings(response.data);
+      setBookings(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       console.error("MyTripsPage: Error fetching bookings (inside catch):", err);
        if (err.response) {
@@ -49,6 +52,21 @@ function MyTripsPage() {
     }
   }, []); // Empty dependency array for useCallback - fetchBookings doesn't depend on changing props/state
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await getMyBookings({ cursor: nextCursor });
+      setBookings(prev => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error("MyTripsPage: Error fetching more bookings:", err);
+      setError(err.response?.data?.message || "Could not load your trips.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   // Call fetchBookings ONCE on mount using ONE useEffect
   useEffect(() => {
     fetchBookings();
@@ -199,6 +217,18 @@ function MyTripsPage() {
           })}
         </div>
       )}
+      {nextCursor && !isLoading && (
+        <div className="text-center mt-6">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-4 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
 
       <ReviewModal
         show={showReviewModal}
@@ -9,8 +9,12 @@ function PropertiesListPage() {
   const [properties, setProperties] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
+  // Cursor for the next page (null when there are no more results)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   // --- State for Filter Inputs ---
+  const [searchFilter, setSearchFilter] = useState(''); // Free-text search over title/description
   const [cityFilter, setCityFilter] = useState('');
   const [stateFilter, setStateFilter] = useState('');
   const [minPriceFilter, setMinPriceFilter] = useState('');
@@ -27,27 +31,48 @@ function PropertiesListPage() {
 
   // --- Function to Fetch Properties ---
   // Use useCallback to memoize the function, preventing unnecessary runs if dependencies don't change
-   const fetchProperties = useCallback(async () => {
+   // Pass only non-empty applied filters to the API service
+  const getActiveFilters = useCallback(() => {
+    const activeFilters = {};
+    for (const key in appliedFilters) {
+      if (appliedFilters[key] !== '' && appliedFilters[key] !== null && appliedFilters[key] !== undefined) {
+          activeFilters[key] = appliedFilters[key];
+      }
+    }
+    return activeFilters;
+  }, [appliedFilters]);
+
+  const fetchProperties = useCallback(async () => {
     console.log("Fetching properties with filters:", appliedFilters); // Debug log
     setIsLoading(true);
     setError(null);
     try {
-      // Pass only non-empty applied filters to the API service
-      const activeFilters = {};
-      for (const key in appliedFilters) {
-        if (appliedFilters[key] !== '' && appliedFilters[key] !== null && appliedFilters[key] !== undefined) {
-            activeFilters[key] = appliedFilters[key];
-        }
-      }
-      const response = await getProperties(activeFilters); // Pass active filters
-      setProperties(response.data);
+      const response = await getProperties(getActiveFilters()); // Pass active filters
+      setProperties(response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       console.error("Error fetching properties:", err);
       setError(err.response?.data?.description || err.message || 'Failed to fetch properties.');
     } finally {
       setIsLoading(false);
     }
-  }, [appliedFilters]); // Depend on appliedFilters state
+  }, [appliedFilters, getActiveFilters]); // Depend on appliedFilters state
+
+  // --- Fetch the next page and append it ---
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setIsLoadingMore(true);
+    try {
+      const response = await getProperties({ ...getActiveFilters(), cursor: nextCursor });
+      setProperties(prev => [...prev, ...response.data.items]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error("Error fetching more properties:", err);
+      setError(err.response?.data?.description || err.message || 'Failed to fetch properties.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
 
   // --- Effect to fetch data when appliedFilters change ---
   useEffect(() => {
@@ -65,6 +90,7 @@ function PropertiesListPage() {
      setError(null); // Clear previous errors
 
     const newFilters = {
+        q: searchFilter,
         city: cityFilter,
         state: stateFilter,
         min_price: minPriceFilter,
@@ -81,6 +107,7 @@ function PropertiesListPage() {
   };
 
   const clearFilters = () => {
+        setSearchFilter('');
         setCityFilter('');
         setStateFilter('');
         setMinPriceFilter('');
@@ -101,6 +128,11 @@ function PropertiesListPage() {
 
       {/* --- Filter Form --- */}
       <form onSubmit={handleSearch} className="bg-gray-100 p-4 rounded-lg mb-6 grid grid-cols-1 md:grid-cols-3 lg:grid-cols-4 gap-4 items-end">
+        {/* Keyword Search Input */}
+        <div>
+          <label htmlFor="searchFilter" className="block text-sm font-medium text-gray-700">Search</label>
+          <input type="text" id="searchFilter" value={searchFilter} onChange={(e) => setSearchFilter(e.target.value)} placeholder="e.g. beach, duplex" className="mt-1 block w-full rounded-md border-gray-300 shadow-sm p-2 border sm:text-sm" />
+        </div>
         {/* City Input */}
         <div>
           <label htmlFor="cityFilter" className="block text-sm font-medium text-gray-700">City</label>
@@ -190,6 +222,18 @@ function PropertiesListPage() {
           ))}
         </div>
       )}
+      {nextCursor && !isLoading && (
+        <div className="text-center mt-6">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={isLoadingMore}
+            className="py-2 px-4 border border-gray-300 shadow-sm text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+          >
+            {isLoadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
       {/* --- End Property List Display --- */}
 
     </div>
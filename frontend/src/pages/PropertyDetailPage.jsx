@@ -238,7 +238,9 @@ function PropertyDetailPage() {
                         className="w-full h-80 md:h-96 object-cover rounded-lg mb-4 shadow bg-gray-200" // Added bg color for loading phase
                     />
                  ) : (
-                     <div className="w-full h-80 md:h-96 bg-gray-200 rounded-lg mb-4 shadow flex items-center justify-center text-gray-500">No Image Available</div>
+                     <div className="w-full h-80 md:h-96 bg-gray-200 rounded-lg mb-4 shadow flex items-center justify-center text-gray-500">
+                        {property.photos_status === 'processing' ? 'Photos are processing...' : 'No Image Available'}
+                     </div>
                  )}
 
                 {/* Description */}
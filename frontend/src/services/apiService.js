@@ -115,9 +115,10 @@ apiClient.interceptors.response.use(
 // --- API Functions ---
 
 /**
- * Fetches properties, optionally filtered by params
+ * Fetches a page of properties, optionally filtered by params
  * @param {object} [params] - Optional object containing query parameters (e.g., { city: 'Lagos', min_price: 50000 })
- * @returns {Promise<AxiosResponse<any>>}
+ *   Pass { cursor: next_cursor } from the previous response to fetch the next page.
+ * @returns {Promise<AxiosResponse<any>>} Response data is { items, next_cursor }
  */
 export const getProperties = (params) => { // Accept params object
   return apiClient.get('/properties', { params }); // Pass params to axios config
@@ -148,6 +149,15 @@ export const createProperty = (formData) => {
   });
 };
 
+/**
+ * Fetches background processing progress of a listing's photos (Host action)
+ * @param {number|string} propertyId
+ * @returns {Promise<AxiosResponse<any>>} Response data is { photos_status, total, done, failed, pending, listing_photos, jobs }
+ */
+export const getPhotoStatus = (propertyId) => {
+  return apiClient.get(`/properties/${propertyId}/photos`);
+};
+
 /**
  * Creates a booking request for a property
  * @param {number|string} propertyId
@@ -159,19 +169,30 @@ export const createBooking = (propertyId, bookingData) => {
 };
 
 /**
- * Fetches bookings made by the current logged-in user
- * @returns {Promise<AxiosResponse<any>>}
+ * Fetches a page of bookings made by the current logged-in user
+ * @param {object} [params] - Optional { cursor, limit }
+ * @returns {Promise<AxiosResponse<any>>} Response data is { items, next_cursor }
  */
-export const getMyBookings = () => {
-  return apiClient.get('/my-bookings');
+export const getMyBookings = (params) => {
+  return apiClient.get('/my-bookings', { params });
 };
 
 /**
- * Fetches bookings for properties hosted by the current logged-in user
- * @returns {Promise<AxiosResponse<any>>}
+ * Fetches a page of bookings for properties hosted by the current logged-in user
+ * @param {object} [params] - Optional { cursor, limit }
+ * @returns {Promise<AxiosResponse<any>>} Response data is { items, next_cursor }
  */
-export const getHostBookings = () => {
-  return apiClient.get('/host/bookings');
+export const getHostBookings = (params) => {
+  return apiClient.get('/host/bookings', { params });
+};
+
+/**
+ * Fetches occupancy, revenue and booking stats for the current host's listings
+ * @param {object} [params] - Optional { start, end } as YYYY-MM-DD (default: last 30 nights)
+ * @returns {Promise<AxiosResponse<any>>} Response data is { start, end, properties, totals }
+ */
+export const getHostAnalytics = (params) => {
+  return apiClient.get('/host/analytics', { params });
 };
 
 /**
@@ -240,6 +261,26 @@ export const updateProfile = (profileData) => {
   return apiClient.patch('/auth/profile', profileData); // Using PATCH
 };
 
+/**
+ * Revokes a token on the server (send the refresh token so it can no longer be used)
+ * @param {string} token
+ * @returns {Promise<AxiosResponse<any>>}
+ */
+export const logoutSession = (token) => {
+  // Raw axios, like the refresh call: a 401 here must not trigger the refresh interceptor
+  return axios.post(`${API_BASE_URL}/auth/logout`, {}, {
+    headers: { 'Authorization': `Bearer ${token}` }
+  });
+};
+
+/**
+ * Revokes every token issued to the current user, on all devices
+ * @returns {Promise<AxiosResponse<any>>}
+ */
+export const logoutAllDevices = () => {
+  return apiClient.post('/auth/logout-all');
+};
+
 /**
  * Fetches booked date ranges for a specific property
  * @param {number|string} propertyId
@@ -250,12 +291,23 @@ export const getBookedDates = (propertyId) => {
 };
 
 /**
- * Fetches listings created by the currently logged-in user
- * @returns {Promise<AxiosResponse<any>>}
+ * Fetches booked nights for many properties in one request (max 100 ids)
+ * @param {Array<number|string>} propertyIds
+ * @param {object} [params] - Optional { start, end, format: 'ranges' | 'bitmap' }
+ * @returns {Promise<AxiosResponse<any>>} Response data is { start, end, format, properties: { [id]: ranges or bitmap }, not_found }
+ */
+export const getBookedDatesBatch = (propertyIds, params) => {
+  return apiClient.get('/properties/booked-dates', { params: { ...params, ids: propertyIds.join(',') } });
+};
+
+/**
+ * Fetches a page of listings created by the currently logged-in user
+ * @param {object} [params] - Optional { cursor, limit }
+ * @returns {Promise<AxiosResponse<any>>} Response data is { items, next_cursor }
  */
-export const getMyListings = () => {
+export const getMyListings = (params) => {
   // Assumes JWT token is set in default headers
-  return apiClient.get('/my-listings');
+  return apiClient.get('/my-listings', { params });
 };
 
 /**